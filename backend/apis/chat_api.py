@@ -1,13 +1,19 @@
 # devspace/backend/apis/chat_api.py
-from flask import Blueprint, request, jsonify
+import json
+from flask import Blueprint, request, jsonify, Response, stream_with_context
 from services.llm_interaction_service import LLMInteractionService
 from services.chat_session_service import ChatSessionService # <--- IMPORT ChatSessionService
-from database.db_session import SessionLocal # <--- IMPORT SessionLocal
+from database.db_session import get_db_session, release_db_connection
 
 chat_bp = Blueprint('chat_api', __name__)
 llm_service = LLMInteractionService()
 chat_session_service = ChatSessionService() # <--- INSTANTIATE ChatSessionService
 
+
+def format_sse(event: dict) -> str:
+    return f"event: {event['event']}\ndata: {json.dumps(event['data'], default=str)}\n\n"
+
+
 @chat_bp.route('/', methods=['POST']) # Assuming chat is mounted at /api/chat/ (note trailing slash)
 def handle_chat_api():
     data = request.json
@@ -22,43 +28,30 @@ def handle_chat_api():
     if not space_id_from_request or not space_type:
         return jsonify({"error": "Missing 'spaceId' or 'spaceType'"}), 400
 
-    db = SessionLocal() # <--- GET DATABASE SESSION
-    active_session_id = None # Initialize
     try:
-        if session_id_from_request:
-            # Verify session exists and belongs to space, or refresh its last_accessed_at
-            session_obj = chat_session_service.get_session_by_id(db, session_id_from_request)
-            if session_obj and str(session_obj.space_id) == str(space_id_from_request): # Ensure space_id matches if it's string/int
-                active_session_id = session_obj.id
-            else:
-                # Session ID provided but invalid or doesn't match space, create/get default
-                print(f"Warning: Provided sessionId '{session_id_from_request}' invalid or mismatched for space '{space_id_from_request}'. Getting default.")
-                default_session = chat_session_service.get_or_create_default_session(db, space_id_from_request)
-                if default_session:
-                    active_session_id = default_session.id
-        else:
-            # No session_id from frontend, get or create default for the space
-            default_session = chat_session_service.get_or_create_default_session(db, space_id_from_request)
-            if default_session:
-                active_session_id = default_session.id
-        
-        if not active_session_id:
-            # This should ideally not happen if get_or_create_default_session works
-            return jsonify({"error": f"Could not establish a chat session for space {space_id_from_request}."}), 500
-
-        # chat_history = data.get('chat_history', []) # Frontend doesn't need to send history anymore
+        with get_db_session() as db: # The request's scoped session, shared with the turn below
+            active_session_id = chat_session_service.resolve_active_session_id(db, space_id_from_request, session_id_from_request)
+    except Exception as e:
+        print(f"API CHAT ERROR: Failed to resolve session: {e}")
+        return jsonify({"error": "An unexpected error occurred in the chat API.", "details": str(e)}), 500
+    finally:
+        release_db_connection() # Release the connection before the LLM round trip
 
+    if not active_session_id:
+        # This should ideally not happen if get_or_create_default_session works
+        return jsonify({"error": f"Could not establish a chat session for space {space_id_from_request}."}), 500
+
+    try:
         response_data = llm_service.process_message_with_llm_and_tools(
             user_message=user_message,
             space_id=space_id_from_request, # Pass the original spaceId from request
             space_type=space_type,
             session_id=active_session_id # Pass the determined active_session_id
-            # chat_history_from_frontend=chat_history # Not needed if LLM service loads from DB
         )
-        
+
         if response_data.get("error"):
             return jsonify(response_data), 500
-        
+
         # Ensure session_id is part of the response if it was newly created or confirmed
         response_data_with_session = {**response_data, "session_id": active_session_id}
         return jsonify(response_data_with_session), 200
@@ -68,7 +61,57 @@ def handle_chat_api():
         import traceback
         traceback.print_exc()
         return jsonify({"error": "An unexpected error occurred in the chat API.", "details": str(e)}), 500
+
+
+@chat_bp.route('/stream', methods=['POST'])
+def handle_chat_stream_api():
+    """
+    Same request body as POST /api/chat/, but answers with a text/event-stream.
+    Events: start, token, tool_start, tool_end, tool_error, ping, then done (final payload) or error.
+    """
+    data = request.json
+    if not data or 'message' not in data:
+        return jsonify({"error": "Missing 'message' in request body"}), 400
+
+    user_message = data.get('message')
+    space_id_from_request = data.get('spaceId')
+    space_type = data.get('spaceType')
+    session_id_from_request = data.get('sessionId')
+
+    if not space_id_from_request or not space_type:
+        return jsonify({"error": "Missing 'spaceId' or 'spaceType'"}), 400
+
+    # Resolve the session up front and release the DB connection before streaming starts
+    try:
+        with get_db_session() as db:
+            active_session_id = chat_session_service.resolve_active_session_id(db, space_id_from_request, session_id_from_request)
+    except Exception as e:
+        print(f"API CHAT ERROR: Failed to resolve session for streaming: {e}")
+        return jsonify({"error": "An unexpected error occurred in the chat API.", "details": str(e)}), 500
     finally:
-        if db: # Ensure db was assigned
-            db.close() # <--- CLOSE DATABASE SESSION
+        release_db_connection() # The turn runs on its own thread with its own scope
+
+    if not active_session_id:
+        return jsonify({"error": f"Could not establish a chat session for space {space_id_from_request}."}), 500
+
+    def generate():
+        for event in llm_service.stream_message_with_llm_and_tools(
+            user_message=user_message,
+            space_id=space_id_from_request,
+            space_type=space_type,
+            session_id=active_session_id,
+        ):
+            yield format_sse(event)
+
+    headers = {
+        "Cache-Control": "no-cache",
+        "X-Accel-Buffering": "no", # Disable nginx response buffering so events flush immediately
+    }
+    return Response(stream_with_context(generate()), mimetype="text/event-stream", headers=headers)
+
+
+@chat_bp.route('/agent-cache/stats', methods=['GET'])
+def get_agent_cache_stats_api():
+    """Hit/miss/eviction counters for the per-space agent and per-session executor caches."""
+    return jsonify(llm_service.get_agent_cache_stats()), 200
 
@@ -1,13 +1,17 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, make_response, Response, stream_with_context
 # TODO: Import GitService, K8sService
 from services.git_service import GitService
-# from services.k8s_service import k8s_service
+from services.k8s_service import K8sService
+from services.k8s_log_streamer import format_entry
 from services.space_service import SpaceService # Assuming you instantiate SpaceService
+from config import config as app_config
+from database.db_session import release_db_connection
 
 
 dev_space_bp = Blueprint('dev_space_api', __name__)
 space_service = SpaceService() # Instantiate or use DI
 git_service = GitService() # Instantiate or use DI
+k8s_service = K8sService()
 
 
 
@@ -24,13 +28,55 @@ def get_git_file_tree_api():
         return jsonify({"error": "Missing 'branch' query parameter"}), 400
     
     # The service now handles getting git_repo_url from space_id's config
-    result = git_service.get_file_tree(space_id, branch, force_refresh=False) # Default no refresh
+    # The ETag is the branch's commit SHA: if the client's copy is still current, answer 304
+    known_commit_sha = next(iter(request.if_none_match.as_set()), None) if request.if_none_match else None
+    result = git_service.get_file_tree(space_id, branch, force_refresh=False, known_commit_sha=known_commit_sha) # Default no refresh
 
     if result.get("success"):
-        return jsonify({"tree": result.get("tree", []), "from_cache": result.get("from_cache", False)})
+        if result.get("not_modified"):
+            response = make_response("", 304)
+        else:
+            response = jsonify({"tree": result.get("tree", []), "from_cache": result.get("from_cache", False), "commit_sha": result.get("commit_sha")})
+        if result.get("commit_sha"):
+            response.set_etag(result["commit_sha"])
+            response.headers["Cache-Control"] = "no-cache" # Always revalidate; unchanged trees cost a 304
+        return response
     else:
         return jsonify({"error": result.get("error", "Failed to retrieve file tree"), "details": result.get("details")}), 500
 
+@dev_space_bp.route('/git/subtree', methods=['GET'])
+def get_git_subtree_api():
+    """
+    Lazily lists one folder of the repo: ?spaceId=&branch=&path=src&depth=1&limit=200&offset=0[&sha=].
+    Folders on the last level come back with "children_loaded": false; expand them with another call.
+    Pass the returned 'commit_sha' as 'sha' when paging so all pages come from the same commit.
+    """
+    space_id = request.args.get('spaceId')
+    branch = request.args.get('branch')
+    if not space_id:
+        return jsonify({"error": "Missing 'spaceId' query parameter"}), 400
+    if not branch:
+        return jsonify({"error": "Missing 'branch' query parameter"}), 400
+    try:
+        depth = int(request.args.get('depth', 1))
+        limit = int(request.args.get('limit', 200))
+        offset = int(request.args.get('offset', 0))
+    except ValueError:
+        return jsonify({"error": "'depth', 'limit' and 'offset' must be integers"}), 400
+    if depth < 1 or depth > app_config.GIT_SUBTREE_MAX_DEPTH:
+        return jsonify({"error": f"'depth' must be between 1 and {app_config.GIT_SUBTREE_MAX_DEPTH}"}), 400
+    if limit < 1 or offset < 0:
+        return jsonify({"error": "'limit' must be positive and 'offset' non-negative"}), 400
+    limit = min(limit, app_config.GIT_SUBTREE_MAX_LIMIT)
+
+    result = git_service.get_subtree(space_id, branch, path=request.args.get('path', ''), depth=depth,
+                                     offset=offset, limit=limit, commit_sha=request.args.get('sha'))
+    if result.get("success"):
+        result.pop("success")
+        return jsonify(result)
+    status = 404 if result.get("not_found") else 500
+    return jsonify({"error": result.get("error", "Failed to retrieve subtree"), "details": result.get("details")}), status
+
 @dev_space_bp.route('/git/refresh-tree', methods=['POST']) # Changed to POST as it's an action
 def refresh_git_file_tree_api():
     data = request.json
@@ -45,7 +91,7 @@ def refresh_git_file_tree_api():
     result = git_service.get_file_tree(space_id, branch, force_refresh=True)
 
     if result.get("success"):
-        return jsonify({"message": "File tree refreshed successfully.", "tree": result.get("tree", [])})
+        return jsonify({"message": "File tree refreshed successfully.", "tree": result.get("tree", []), "commit_sha": result.get("commit_sha")})
     else:
         return jsonify({"error": result.get("error", "Failed to refresh file tree"), "details": result.get("details")}), 500
 
@@ -57,12 +103,14 @@ def get_git_branches_api(): # Renamed
     if not git_repo_url:
         return jsonify({"error": "Missing 'repoUrl' query parameter"}), 400
 
-    result = git_service.list_branches(git_repo_url)
+    force_refresh = request.args.get('refresh', 'false').lower() == 'true'
+    result = git_service.list_branches(git_repo_url, force_refresh=force_refresh)
 
     if result.get("success"):
-        return jsonify({"branches": result.get("branches", [])})
+        return jsonify({"branches": result.get("branches", []), "tags": result.get("tags", []), "default_branch": result.get("default_branch")})
     else:
-        return jsonify({"error": result.get("error", "Failed to retrieve branches")}), 500
+        status_code = 400 if result.get("error", "").startswith("Invalid repository URL") else 500
+        return jsonify({"error": result.get("error", "Failed to retrieve branches")}), status_code
 
 
 @dev_space_bp.route('/<string:space_id>/git-config', methods=['POST'])
@@ -84,6 +132,58 @@ def configure_git_repo(space_id):
         return jsonify(result), status_code
 
 
+@dev_space_bp.route('/k8s/logs', methods=['GET'])
+def stream_k8s_pod_logs_api():
+    """
+    Streams pod logs as chunked text/plain, one "<timestamp> [pod/container] message" line at a time:
+    ?spaceId=&env=&namespace=&pods=a,b (or &labelSelector=)&container=&tailLines=&sinceSeconds=
+    &grep=<regex>&level=warn&follow=true. Lines of several pods/containers are merged by timestamp
+    (in arrival order when following).
+    """
+    space_id = request.args.get('spaceId')
+    environment_key = request.args.get('env')
+    pods = [p.strip() for p in request.args.get('pods', '').split(',') if p.strip()]
+    label_selector = request.args.get('labelSelector')
+    if not space_id or not environment_key:
+        return jsonify({"error": "Missing 'spaceId' or 'env' query parameter"}), 400
+    if not pods and not label_selector:
+        return jsonify({"error": "Provide 'pods' or 'labelSelector'"}), 400
+    try:
+        tail_lines = int(request.args['tailLines']) if request.args.get('tailLines') else None
+        since_seconds = int(request.args['sinceSeconds']) if request.args.get('sinceSeconds') else None
+    except ValueError:
+        return jsonify({"error": "'tailLines' and 'sinceSeconds' must be integers"}), 400
+    try:
+        environment = k8s_service.get_environment(space_id, environment_key)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 404
+    except ConnectionError as e:
+        return jsonify({"error": str(e)}), 502
+    namespace = request.args.get('namespace') or environment["namespace"]
+    if not namespace:
+        return jsonify({"error": "Missing 'namespace' and none is configured for the environment"}), 400
+
+    result = k8s_service.stream_pod_logs(
+        environment["clients"], namespace, pod_names=pods or None, label_selector=label_selector,
+        container=request.args.get('container'), since_seconds=since_seconds, tail_lines=tail_lines,
+        pattern=request.args.get('grep'), min_level=request.args.get('level'),
+        follow=request.args.get('follow', 'false').lower() == 'true',
+    )
+    if not result["success"]:
+        return jsonify({"error": result["error"], "details": result.get("errors")}), 400
+
+    def generate():
+        for error in result["errors"]:
+            yield f"[could not read {error['pod']}/{error['container']}: {error['error']}]\n"
+        for entry in result["entries"]:
+            yield format_entry(entry) + "\n"
+
+    # The stream only talks to the K8s API; don't hold a pool connection while it runs (follow=true may never end)
+    release_db_connection()
+    headers = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"} # Let proxies pass lines through as they come
+    return Response(stream_with_context(generate()), mimetype="text/plain", headers=headers)
+
+
 @dev_space_bp.route('/k8s/environments/<string:app_id>/deployments', methods=['GET'])
 def get_k8s_deployments_for_dev_space(app_id):
     # This app_id should map to a DevSpaceConfig which has k8s_environments_json
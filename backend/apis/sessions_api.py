@@ -1,12 +1,15 @@
 # devspace/backend/apis/sessions_api.py
+import json
 from flask import Blueprint, request, jsonify
 from database.db_session import get_db_session # Using the generator context manager
 import contextlib
-from services.chat_session_service import ChatSessionService
+from services.chat_session_service import ChatSessionService, MESSAGE_USAGE_FIELDS
+from services.usage_accounting_service import UsageAccountingService
 from database.db_session import SessionLocal # <--- Import SessionLocal
 
 sessions_bp = Blueprint('sessions_api', __name__)
 chat_session_service = ChatSessionService()
+usage_service = UsageAccountingService()
 
 
 @sessions_bp.route('/space/<string:space_id>/active-chat', methods=['GET'])
@@ -93,22 +96,45 @@ def create_new_session_api(space_id: str):
         return jsonify({"error": "Server error creating session"}), 500
 
 
+MESSAGES_PAGE_MAX_LIMIT = 200
+
+def _serialize_message(msg):
+    usage = {field: getattr(msg, field) for field in MESSAGE_USAGE_FIELDS if getattr(msg, field) is not None}
+    return {"id": msg.id, "role": msg.role.value, "content": msg.content, "timestamp": msg.timestamp.isoformat() if msg.timestamp else None, "metadata": json.loads(msg.metadata_json) if msg.metadata_json else None, "usage": usage or None}
+
 @sessions_bp.route('/<string:session_id>/messages', methods=['GET'])
 def get_session_messages_api(session_id):
-    """Gets all messages for a specific session."""
-    # TODO: Add pagination query params (limit, offset)
+    """
+    Gets messages for a specific session.
+    Default: limit/offset paging (OFFSET, slow on deep pages), returns a bare list as before.
+    Keyset paging is opt-in: pass cursor (the 'next_cursor' of the previous page) or paginate=cursor
+    for the first page, plus optional order ('asc' = oldest first (default), 'desc' = newest first,
+    for scrolling back). Returns {"messages": [...], "next_cursor": "<opaque>" | null}.
+    limit defaults to 50 (max 200 with keyset paging).
+    """
     limit = request.args.get('limit', default=50, type=int)
     offset = request.args.get('offset', default=0, type=int)
+    cursor = request.args.get('cursor')
+    use_cursor = bool(cursor) or request.args.get('paginate', '').lower() == 'cursor'
+    newest_first = request.args.get('order', 'asc').lower() == 'desc'
     db = SessionLocal() # Create a new session
     try:
-        #with contextlib.contextmanager(get_db_session)() as db:
-        messages = chat_session_service.get_messages_for_session(db, session_id, limit=limit, offset=offset)
-        return jsonify([
-            {"id": msg.id, "role": msg.role.value, "content": msg.content, "timestamp": msg.timestamp.isoformat(),"metadata": json.loads(msg.metadata_json) if msg.metadata_json else None} for msg in messages
-            ])
+        if not use_cursor:
+            messages = chat_session_service.get_messages_for_session(db, session_id, limit=limit, offset=offset)
+            return jsonify([_serialize_message(msg) for msg in messages])
+
+        limit = max(1, min(limit, MESSAGES_PAGE_MAX_LIMIT))
+        messages, next_cursor = chat_session_service.get_messages_page(
+            db, session_id, limit=limit, cursor=cursor, newest_first=newest_first
+        )
+        return jsonify({"messages": [_serialize_message(msg) for msg in messages], "next_cursor": next_cursor})
+    except ValueError as ve: # Malformed or mismatched cursor
+        return jsonify({"error": str(ve)}), 400
     except Exception as e:
         print(f"API SESSIONS ERROR: get_session_messages_api: {e}")
         return jsonify({"error": "Failed to retrieve messages for session"}), 500
+    finally:
+        db.close()
 
 @sessions_bp.route('/<string:session_id>', methods=['DELETE'])
 def delete_session_api(session_id):
@@ -123,4 +149,19 @@ def delete_session_api(session_id):
         print(f"API SESSIONS ERROR: delete_session_api: {e}")
         return jsonify({"error": "Server error deleting session"}), 500
 
-
+@sessions_bp.route('/<string:session_id>/usage', methods=['GET'])
+def get_session_usage_api(session_id):
+    """
+    Token and latency rollup of a session: {"session_id", "totals": {...}, "tools": [per-tool latency]}.
+    Query param: since_days (optional) limits it to recent messages.
+    """
+    since_days = request.args.get('since_days', type=float)
+    try:
+        with get_db_session() as db:
+            usage = usage_service.get_session_usage(db, session_id, since_days=since_days)
+        if usage is None:
+            return jsonify({"error": f"Session {session_id} not found."}), 404
+        return jsonify(usage)
+    except Exception as e:
+        print(f"API SESSIONS ERROR: get_session_usage_api: {e}")
+        return jsonify({"error": "Failed to retrieve session usage"}), 500
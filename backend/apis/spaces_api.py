@@ -1,9 +1,12 @@
 from flask import Blueprint, request, jsonify
 from services.space_service import SpaceService, SpaceServiceError
+from services.usage_accounting_service import UsageAccountingService
+from database.db_session import get_db_session
 from database.models import SpaceTypeEnum # For serializing icon/color based on type
 
 spaces_bp = Blueprint('spaces_api', __name__)
 space_service = SpaceService() # Instantiate the service
+usage_service = UsageAccountingService()
 
 def serialize_space(space_model_instance):
     """Helper to convert Space SQLAlchemy object to a dict for JSON response."""
@@ -153,3 +156,30 @@ def set_space_backend_settings_api(space_id):
         print(f"API ERROR setting backend_settings for {space_id}: {str(e)}")
         return jsonify({"error": "An unexpected error occurred."}), 500
 
+@spaces_bp.route('/usage', methods=['GET'])
+def get_spaces_usage_api():
+    """Spaces ranked by total LLM tokens. Query params: since_days (optional), limit (default 50)."""
+    since_days = request.args.get('since_days', type=float)
+    limit = max(1, min(request.args.get('limit', default=50, type=int), 500))
+    try:
+        with get_db_session() as db:
+            return jsonify({"spaces": usage_service.get_spaces_usage(db, since_days=since_days, limit=limit)})
+    except Exception as e:
+        print(f"API ERROR getting spaces usage: {str(e)}")
+        return jsonify({"error": "An unexpected error occurred."}), 500
+
+@spaces_bp.route('/<string:space_id>/usage', methods=['GET'])
+def get_space_usage_api(space_id):
+    """Token and latency rollup of a space: totals, per-tool latency and its most expensive sessions."""
+    since_days = request.args.get('since_days', type=float)
+    try:
+        with get_db_session() as db:
+            usage = usage_service.get_space_usage(db, space_id, since_days=since_days)
+        if usage is None:
+            return jsonify({"error": "Space not found"}), 404
+        return jsonify(usage)
+    except ValueError:
+        return jsonify({"error": "Invalid space ID format."}), 400
+    except Exception as e:
+        print(f"API ERROR getting usage for {space_id}: {str(e)}")
+        return jsonify({"error": "An unexpected error occurred."}), 500
@@ -1,9 +1,9 @@
 import os # <--- ADD THIS LINE
-from flask import Flask, jsonify
+from flask import Flask, jsonify, g
 from flask_cors import CORS
 
 from config import config as app_config # Use a distinct name
-from database.db_session import init_db_tables # Correct import path
+from database.db_session import init_db_tables, open_db_scope, close_db_scope # Correct import path
 from apis.plugins_api import plugins_bp
 
 
@@ -40,8 +40,7 @@ CORS(app, resources={r"/api/*": {"origins": cors_origins }})
 
 # --- Database Initialization ---
 # This should be called once when the app starts to create tables.
-# In a production setup with Flask, you might use Flask-Migrate (Alembic)
-# and run migrations separately. For now, we create tables directly.
+# init_db_tables() runs the Alembic migrations (migrations/) up to head.
 with app.app_context():
     # Important: Import all your models from database.models here BEFORE calling init_db_tables
     # so that SQLAlchemy's Base metadata knows about them.
@@ -50,6 +49,18 @@ with app.app_context():
     print("INFO: Database initialization process completed from app.py.")
 
 
+# --- Request-scoped DB session ---
+# Services and tools called while handling one request share a single Session (and identity map)
+# instead of each helper opening its own; see database.db_session.db_session_scope.
+@app.before_request
+def _open_request_db_scope():
+    g.db_scope_token = open_db_scope()
+
+@app.teardown_request
+def _close_request_db_scope(_exc):
+    close_db_scope(g.pop("db_scope_token", None))
+
+
 # --- Import and Register API Blueprints/Routers ---
 # We will create these files in the next script.
 # For Flask Blueprints:
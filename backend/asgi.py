@@ -0,0 +1,131 @@
+# devspace/backend/asgi.py
+# ASGI entry point. Chat turns are served natively on the event loop (AgentExecutor.ainvoke),
+# everything else is delegated to the existing Flask app through asgiref's WSGI adapter.
+#
+# Run with e.g.: uvicorn asgi:application --host 0.0.0.0 --port 5001 --workers 2
+import asyncio
+import json
+
+from asgiref.wsgi import WsgiToAsgi
+
+from app import app as flask_app, cors_origins
+from apis.chat_api import llm_service, chat_session_service, format_sse
+from database.db_session import get_db_session, db_session_scope
+
+
+def _resolve_session_blocking(space_id: str, session_id: str):
+    with get_db_session() as db:
+        return chat_session_service.resolve_active_session_id(db, space_id, session_id)
+
+
+class DevSpaceASGIApp:
+    def __init__(self, wsgi_app):
+        self.wsgi_app = WsgiToAsgi(wsgi_app)
+        self.routes = {
+            ("POST", "/api/chat/"): self.handle_chat,
+            ("POST", "/api/chat/stream"): self.handle_chat_stream,
+        }
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            return await self._handle_lifespan(receive, send)
+        if scope["type"] == "http":
+            handler = self.routes.get((scope["method"], scope["path"]))
+            if handler:
+                return await handler(scope, receive, send)
+        # CORS preflights, all other routes and their errors stay with Flask
+        return await self.wsgi_app(scope, receive, send)
+
+    async def _handle_lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    # --- helpers ---
+    async def _read_json_body(self, receive):
+        body = b""
+        while True:
+            message = await receive()
+            body += message.get("body", b"")
+            if not message.get("more_body"):
+                break
+        try:
+            return json.loads(body or b"null")
+        except ValueError:
+            return None
+
+    def _cors_headers(self, scope):
+        # Mirrors the Flask-CORS policy configured in app.py for /api/*
+        origin = dict(scope.get("headers") or []).get(b"origin")
+        if not origin:
+            return []
+        if cors_origins == "*":
+            return [(b"access-control-allow-origin", b"*")]
+        if origin.decode("latin-1") == cors_origins:
+            return [(b"access-control-allow-origin", origin), (b"vary", b"Origin")]
+        return []
+
+    async def _send_json(self, scope, send, payload, status=200):
+        body = json.dumps(payload, default=str).encode("utf-8")
+        await send({
+            "type": "http.response.start",
+            "status": status,
+            "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())] + self._cors_headers(scope),
+        })
+        await send({"type": "http.response.body", "body": body})
+
+    async def _parse_chat_request(self, scope, receive, send):
+        """Validates the chat body and resolves the session. Returns the turn kwargs, or None after sending an error."""
+        data = await self._read_json_body(receive)
+        if not data or 'message' not in data:
+            await self._send_json(scope, send, {"error": "Missing 'message' in request body"}, 400)
+            return None
+        space_id = data.get('spaceId')
+        space_type = data.get('spaceType')
+        if not space_id or not space_type:
+            await self._send_json(scope, send, {"error": "Missing 'spaceId' or 'spaceType'"}, 400)
+            return None
+        try:
+            active_session_id = await asyncio.to_thread(_resolve_session_blocking, space_id, data.get('sessionId'))
+        except Exception as e:
+            print(f"ASGI CHAT ERROR: Failed to resolve session: {e}")
+            await self._send_json(scope, send, {"error": "An unexpected error occurred in the chat API.", "details": str(e)}, 500)
+            return None
+        if not active_session_id:
+            await self._send_json(scope, send, {"error": f"Could not establish a chat session for space {space_id}."}, 500)
+            return None
+        return {"user_message": data['message'], "space_id": space_id, "space_type": space_type, "session_id": active_session_id}
+
+    # --- native async routes ---
+    async def handle_chat(self, scope, receive, send):
+        with db_session_scope(): # Session resolution and the turn share one DB session
+            turn = await self._parse_chat_request(scope, receive, send)
+            if turn is None:
+                return
+            response_data = await llm_service.aprocess_message_with_llm_and_tools(**turn)
+        status = 500 if response_data.get("error") else 200
+        await self._send_json(scope, send, {**response_data, "session_id": turn["session_id"]}, status)
+
+    async def handle_chat_stream(self, scope, receive, send):
+        turn = await self._parse_chat_request(scope, receive, send)
+        if turn is None:
+            return
+        await send({
+            "type": "http.response.start",
+            "status": 200,
+            "headers": [
+                (b"content-type", b"text/event-stream; charset=utf-8"),
+                (b"cache-control", b"no-cache"),
+                (b"x-accel-buffering", b"no"),
+            ] + self._cors_headers(scope),
+        })
+        async for event in llm_service.astream_message_with_llm_and_tools(**turn):
+            await send({"type": "http.response.body", "body": format_sse(event).encode("utf-8"), "more_body": True})
+        await send({"type": "http.response.body", "body": b""})
+
+
+application = DevSpaceASGIApp(flask_app)
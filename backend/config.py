@@ -13,6 +13,11 @@ class Config:
     # --- API Keys ---
     # IMPORTANT: Load API keys securely from environment variables for production!
     GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY", "YOUR_GOOGLE_API_KEY_HERE_IF_NO_ENV_VAR") # Placeholder
+    OPENAI_API_KEY = os.getenv("OPENAI_API_KEY", None)
+    OPENAI_BASE_URL = os.getenv("OPENAI_BASE_URL", None) # Optional proxy/gateway for the 'chatgpt' source
+    # The 'other' LLM source: any OpenAI-compatible server (vLLM, Ollama, llama.cpp, LiteLLM, a test stub)
+    OPENAI_COMPATIBLE_BASE_URL = os.getenv("OPENAI_COMPATIBLE_BASE_URL", None) # e.g. http://localhost:11434/v1
+    OPENAI_COMPATIBLE_API_KEY = os.getenv("OPENAI_COMPATIBLE_API_KEY", "not-needed")
 
     # --- Database Configuration (SQLite) ---
     # Database file will be created in the 'backend' directory.
@@ -27,6 +32,19 @@ class Config:
 
     SQLALCHEMY_ECHO = False # Set to True for debugging SQL queries (can be noisy)
     SQLALCHEMY_TRACK_MODIFICATIONS = False # SQLAlchemy specific, generally set to False
+    # Connection pool (file SQLite and server databases; in-memory SQLite always shares one connection)
+    DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+    DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "20"))
+    DB_POOL_TIMEOUT_SECONDS = float(os.getenv("DB_POOL_TIMEOUT_SECONDS", "30"))
+    DB_POOL_RECYCLE_SECONDS = int(os.getenv("DB_POOL_RECYCLE_SECONDS", "1800")) # Server databases only
+    DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "True").lower() in ("true", "1", "t")
+    # SQLite pragmas applied to every new connection. WAL lets readers run while one writer commits;
+    # busy_timeout makes writers wait for the lock instead of failing with "database is locked".
+    SQLITE_JOURNAL_MODE = os.getenv("SQLITE_JOURNAL_MODE", "WAL")
+    SQLITE_SYNCHRONOUS = os.getenv("SQLITE_SYNCHRONOUS", "NORMAL")
+    SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+    SQLITE_MMAP_SIZE_MB = int(os.getenv("SQLITE_MMAP_SIZE_MB", "256"))
+    SQLITE_CACHE_SIZE_MB = int(os.getenv("SQLITE_CACHE_SIZE_MB", "64"))
 
     # --- Git Configuration (Placeholders - to be filled by user/application logic) ---
     # Example: A dictionary mapping allowed repo IDs to their secured base paths.
@@ -34,6 +52,28 @@ class Config:
     # For now, define a base path from where relative paths could be constructed or absolute paths.
     # IMPORTANT: Paths MUST be validated to prevent directory traversal.
     SECURE_BASE_GIT_PATH = os.getenv("SECURE_BASE_GIT_PATH", "/srv/git_repos") # Example base path
+    # Bare mirrors (one per repo URL) that serve trees, branches and file reads; refreshed with
+    # 'git fetch' at most every GIT_MIRROR_FETCH_INTERVAL_SECONDS unless a refresh is forced.
+    GIT_MIRROR_MAX_DISK_MB = int(os.getenv("GIT_MIRROR_MAX_DISK_MB", "10240"))
+    GIT_MIRROR_FETCH_INTERVAL_SECONDS = float(os.getenv("GIT_MIRROR_FETCH_INTERVAL_SECONDS", "60"))
+    GIT_MIRROR_CLONE_TIMEOUT_SECONDS = int(os.getenv("GIT_MIRROR_CLONE_TIMEOUT_SECONDS", "600"))
+    # File trees are cached per (space, branch) and reused while the branch's commit SHA is unchanged
+    GIT_TREE_CACHE_MAX_BRANCHES = int(os.getenv("GIT_TREE_CACHE_MAX_BRANCHES", "10"))
+    # 'git ls-remote' results (branches/tags + SHAs) are shared by branch listing, tree freshness checks
+    # and repo URL validation; failures are remembered for a shorter time
+    GIT_REF_CACHE_TTL_SECONDS = float(os.getenv("GIT_REF_CACHE_TTL_SECONDS", "15"))
+    GIT_REF_CACHE_ERROR_TTL_SECONDS = float(os.getenv("GIT_REF_CACHE_ERROR_TTL_SECONDS", "5"))
+    # Lazy subtree listings (/api/dev/git/subtree and the get_repository_subtree tool)
+    GIT_SUBTREE_CACHE_MAX_ENTRIES = int(os.getenv("GIT_SUBTREE_CACHE_MAX_ENTRIES", "512"))
+    GIT_SUBTREE_MAX_DEPTH = int(os.getenv("GIT_SUBTREE_MAX_DEPTH", "5"))
+    GIT_SUBTREE_MAX_LIMIT = int(os.getenv("GIT_SUBTREE_MAX_LIMIT", "1000"))
+    # File reads: long-lived 'git cat-file' per mirror plus a blob-SHA keyed cache in memory and on disk.
+    # Blobs larger than GIT_BLOB_CACHE_MAX_BLOB_MB are streamed and never cached.
+    GIT_FILE_READ_MAX_BYTES = int(os.getenv("GIT_FILE_READ_MAX_BYTES", str(100 * 1024)))
+    GIT_BLOB_CACHE_MAX_BLOB_MB = float(os.getenv("GIT_BLOB_CACHE_MAX_BLOB_MB", "2"))
+    GIT_BLOB_MEMORY_CACHE_MB = int(os.getenv("GIT_BLOB_MEMORY_CACHE_MB", "128"))
+    GIT_BLOB_DISK_CACHE_MB = int(os.getenv("GIT_BLOB_DISK_CACHE_MB", "1024"))
+    GIT_CAT_FILE_MAX_PROCESSES = int(os.getenv("GIT_CAT_FILE_MAX_PROCESSES", "16"))
     ALLOWED_REPO_CONFIGS = {
         # "repoId_from_frontend": {
         #     "path_relative_to_secure_base": "my-k8s-fullstack-app",
@@ -50,11 +90,84 @@ class Config:
     # This section is for app-specific K8s settings if any, not client setup itself.
     # Example: Mapping appId to namespace or label selector (will be per-space in DB)
     K8S_APP_DEFAULT_NAMESPACE = os.getenv("K8S_APP_DEFAULT_NAMESPACE", "default")
+    # One pooled ApiClient per cluster context named in a space's k8s_environments_json; rebuilt after the
+    # credential TTL (or a 401) so rotated kubeconfig/exec credentials are picked up
+    K8S_CLIENT_POOL_MAX_CLIENTS = int(os.getenv("K8S_CLIENT_POOL_MAX_CLIENTS", "32"))
+    K8S_CLIENT_POOL_IDLE_TTL_SECONDS = float(os.getenv("K8S_CLIENT_POOL_IDLE_TTL_SECONDS", "1800"))
+    K8S_CLIENT_CONNECTION_POOL_MAXSIZE = int(os.getenv("K8S_CLIENT_CONNECTION_POOL_MAXSIZE", "32"))
+    K8S_CLIENT_CREDENTIAL_TTL_SECONDS = float(os.getenv("K8S_CLIENT_CREDENTIAL_TTL_SECONDS", "3600"))
+    # Workload status/list queries are served from watch-based informers, one per (context, kind, namespace).
+    # Informers unused for the idle TTL are stopped; one holding more than K8S_INFORMER_MAX_OBJECTS is
+    # disabled and its queries fall back to direct list calls.
+    K8S_INFORMER_MAX_INFORMERS = int(os.getenv("K8S_INFORMER_MAX_INFORMERS", "64"))
+    K8S_INFORMER_IDLE_TTL_SECONDS = float(os.getenv("K8S_INFORMER_IDLE_TTL_SECONDS", "900"))
+    K8S_INFORMER_RESYNC_SECONDS = float(os.getenv("K8S_INFORMER_RESYNC_SECONDS", "600"))
+    K8S_INFORMER_WATCH_TIMEOUT_SECONDS = int(os.getenv("K8S_INFORMER_WATCH_TIMEOUT_SECONDS", "300"))
+    K8S_INFORMER_SYNC_TIMEOUT_SECONDS = float(os.getenv("K8S_INFORMER_SYNC_TIMEOUT_SECONDS", "10"))
+    K8S_INFORMER_MAX_OBJECTS = int(os.getenv("K8S_INFORMER_MAX_OBJECTS", "20000"))
+    # Direct (non-informer) lists are paged with continue tokens; unpaged callers get at most K8S_LIST_MAX_OBJECTS
+    K8S_LIST_MAX_LIMIT = int(os.getenv("K8S_LIST_MAX_LIMIT", "500"))
+    K8S_LIST_MAX_OBJECTS = int(os.getenv("K8S_LIST_MAX_OBJECTS", "20000"))
+    # Pod logs are streamed (never buffered whole) and filtered while read; K8S_LOG_LIMIT_BYTES is the
+    # per-container cap sent to the kubelet, K8S_LOG_TOOL_MAX_BYTES the default budget of agent tool output
+    K8S_LOG_LIMIT_BYTES = int(os.getenv("K8S_LOG_LIMIT_BYTES", str(5 * 1024 * 1024)))
+    K8S_LOG_TOOL_MAX_BYTES = int(os.getenv("K8S_LOG_TOOL_MAX_BYTES", str(16 * 1024)))
+    K8S_LOG_MAX_STREAMS = int(os.getenv("K8S_LOG_MAX_STREAMS", "20"))
+    # Manifests are server-side applied through the dynamic client (no kubectl); CRDs and namespaces first,
+    # then the rest concurrently. Discovery results are cached per cluster for K8S_APPLY_DISCOVERY_TTL_SECONDS.
+    K8S_APPLY_FIELD_MANAGER = os.getenv("K8S_APPLY_FIELD_MANAGER", "devspace")
+    K8S_APPLY_DISCOVERY_TTL_SECONDS = float(os.getenv("K8S_APPLY_DISCOVERY_TTL_SECONDS", "600"))
+    K8S_APPLY_CRD_WAIT_SECONDS = float(os.getenv("K8S_APPLY_CRD_WAIT_SECONDS", "30"))
+    K8S_APPLY_TIMEOUT_SECONDS = float(os.getenv("K8S_APPLY_TIMEOUT_SECONDS", "120"))
+    # Status queries fan out (kinds x namespaces x apps) on a shared pool; the whole fan-out is capped by
+    # K8S_STATUS_TIMEOUT_SECONDS and calls still running then are reported as per-resource errors
+    K8S_FANOUT_MAX_WORKERS = int(os.getenv("K8S_FANOUT_MAX_WORKERS", "16"))
+    K8S_STATUS_TIMEOUT_SECONDS = float(os.getenv("K8S_STATUS_TIMEOUT_SECONDS", "15"))
 
 
     # --- LangChain/Agent Configuration ---
     DEFAULT_LLM_MODEL = os.getenv("DEFAULT_LLM_MODEL", "gemini-2.0-flash")
+    # LLM routing (services/llm_router.py). Model specs are "source" or "source:model", source being
+    # gemini | chatgpt | other. Spaces without llm_source use DEFAULT_LLM_SOURCE; LLM_SOURCE_OVERRIDE
+    # sends every space to one source (e.g. 'other' with a local OpenAI-compatible stand-in for tests).
+    DEFAULT_LLM_SOURCE = os.getenv("DEFAULT_LLM_SOURCE", "gemini")
+    LLM_SOURCE_OVERRIDE = os.getenv("LLM_SOURCE_OVERRIDE", None)
+    OPENAI_DEFAULT_MODEL = os.getenv("OPENAI_DEFAULT_MODEL", "gpt-4o-mini")
+    OPENAI_COMPATIBLE_MODEL = os.getenv("OPENAI_COMPATIBLE_MODEL", "local-model")
+    # Tried in order when the space's model times out or is rate limited (unconfigured sources are skipped)
+    LLM_FALLBACK_MODELS = os.getenv("LLM_FALLBACK_MODELS", "")
+    # Cheap/fast model for tool-selection steps; the space's model then only writes final answers. Empty = off.
+    # Spaces can override both with agent_config_json {"llm_routing": {"tool_step_model": ..., "fallbacks": [...]}}
+    LLM_TOOL_STEP_MODEL = os.getenv("LLM_TOOL_STEP_MODEL", "")
+    LLM_REQUEST_TIMEOUT_SECONDS = float(os.getenv("LLM_REQUEST_TIMEOUT_SECONDS", "60"))
+    LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "1")) # Per client, before falling back
+    LLM_CLIENT_POOL_MAX = int(os.getenv("LLM_CLIENT_POOL_MAX", "16")) # Warm clients, shared by all spaces
     AGENT_MAX_ITERATIONS = int(os.getenv("AGENT_MAX_ITERATIONS", "10"))
+    # Agent executor cache: LLM client + tools + agent are shared per space, memory is per chat session.
+    # Both layers are LRU-bounded and entries idle longer than the TTL are dropped.
+    AGENT_CACHE_MAX_SPACES = int(os.getenv("AGENT_CACHE_MAX_SPACES", "64"))
+    AGENT_CACHE_MAX_SESSIONS = int(os.getenv("AGENT_CACHE_MAX_SESSIONS", "256"))
+    AGENT_CACHE_IDLE_TTL_SECONDS = int(os.getenv("AGENT_CACHE_IDLE_TTL_SECONDS", "1800"))
+    # Pre-parsed space config snapshots (services/space_config_cache.py), invalidated on every config write.
+    # With several worker processes, set SPACE_CONFIG_SYNC_INTERVAL_SECONDS > 0 so each worker re-checks
+    # Space.config_version of its cached snapshots that often and drops ones changed by another worker.
+    SPACE_CONFIG_CACHE_MAX_SPACES = int(os.getenv("SPACE_CONFIG_CACHE_MAX_SPACES", "1024"))
+    SPACE_CONFIG_CACHE_IDLE_TTL_SECONDS = float(os.getenv("SPACE_CONFIG_CACHE_IDLE_TTL_SECONDS", "3600"))
+    SPACE_CONFIG_SYNC_INTERVAL_SECONDS = float(os.getenv("SPACE_CONFIG_SYNC_INTERVAL_SECONDS", "0"))
+    # Streaming chat (SSE): a 'ping' event is sent when nothing else happened for this long,
+    # which keeps proxies from closing the connection during slow tool calls.
+    CHAT_STREAM_HEARTBEAT_SECONDS = float(os.getenv("CHAT_STREAM_HEARTBEAT_SECONDS", "15"))
+    # Chat history fed to the agent is packed newest-first up to HISTORY_MAX_TOKENS (estimated);
+    # older turns are folded into ChatSession.summary once HISTORY_SUMMARY_MIN_FOLD_TOKENS have overflowed
+    # (until then they stay in the history, past the budget).
+    HISTORY_MAX_TOKENS = int(os.getenv("HISTORY_MAX_TOKENS", "6000"))
+    HISTORY_MAX_TOKENS_PER_MESSAGE = int(os.getenv("HISTORY_MAX_TOKENS_PER_MESSAGE", "1500"))
+    HISTORY_SUMMARY_MAX_TOKENS = int(os.getenv("HISTORY_SUMMARY_MAX_TOKENS", "800"))
+    HISTORY_SUMMARY_MIN_FOLD_TOKENS = int(os.getenv("HISTORY_SUMMARY_MIN_FOLD_TOKENS", "1000"))
+    HISTORY_SUMMARY_MAX_FOLD_MESSAGES = int(os.getenv("HISTORY_SUMMARY_MAX_FOLD_MESSAGES", "200"))
+    HISTORY_CHARS_PER_TOKEN = float(os.getenv("HISTORY_CHARS_PER_TOKEN", "4"))
+    # Async (ASGI) chat path: blocking tool bodies run on a dedicated pool of this size
+    ASYNC_TOOL_MAX_WORKERS = int(os.getenv("ASYNC_TOOL_MAX_WORKERS", "64"))
 
     # --- Other Application Specific Configs ---
     # E.g., MCP Server URLs/Keys if globally configured, though per-space is better.
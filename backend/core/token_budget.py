@@ -0,0 +1,32 @@
+# devspace/backend/core/token_budget.py
+# Cheap, provider-agnostic token estimates for budgeting prompt sections.
+# Exact counts would need a tokenizer call per message (for Gemini: a network round trip),
+# so history windowing works on a chars-per-token heuristic instead.
+from config import config as app_config
+
+MESSAGE_OVERHEAD_TOKENS = 4 # Role markers / separators the provider adds per message
+TRUNCATION_MARKER = "\n...[truncated {omitted} chars]...\n"
+
+
+def estimate_tokens(text: str) -> int:
+    if not text:
+        return 0
+    return int(len(text) / app_config.HISTORY_CHARS_PER_TOKEN) + 1
+
+
+def estimate_message_tokens(content: str) -> int:
+    return estimate_tokens(content) + MESSAGE_OVERHEAD_TOKENS
+
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    """
+    Shortens 'text' to roughly 'max_tokens', keeping its head and tail (where the interesting
+    parts of logs and stack traces usually are) and marking what was cut.
+    """
+    if not text or estimate_tokens(text) <= max_tokens:
+        return text
+    max_chars = max(int(max_tokens * app_config.HISTORY_CHARS_PER_TOKEN), 2)
+    head = max_chars // 2
+    tail = max_chars - head
+    omitted = len(text) - max_chars
+    return text[:head] + TRUNCATION_MARKER.format(omitted=omitted) + text[-tail:]
@@ -0,0 +1,205 @@
+# devspace/backend/core/ttl_lru_cache.py
+import threading
+import time
+from collections import OrderedDict
+
+
+class TTLLRUCache:
+    """
+    Thread-safe, size-bounded mapping with LRU eviction plus an idle TTL.
+    An entry that has not been read or written for 'idle_ttl_seconds' is dropped the next
+    time it is touched (or on sweep()). 'on_evict(key, value, reason)' is called outside
+    the lock for every entry that leaves the cache, so callers can release resources.
+    With 'max_weight' and 'weigher(value)' (e.g. len for bytes), the cache is additionally
+    bounded by the summed weight of its values.
+    """
+
+    def __init__(self, name: str, max_entries: int = 128, idle_ttl_seconds: float = None, on_evict=None,
+                 max_weight: int = None, weigher=None):
+        if max_entries < 1:
+            raise ValueError("max_entries must be >= 1")
+        if max_weight is not None and weigher is None:
+            raise ValueError("max_weight requires a weigher")
+        self.name = name
+        self.max_entries = max_entries
+        self.idle_ttl_seconds = idle_ttl_seconds
+        self.on_evict = on_evict
+        self.max_weight = max_weight
+        self.weigher = weigher
+        self._weight = 0
+        self._entries = OrderedDict()  # key -> [value, last_access_monotonic, weight]
+        self._lock = threading.RLock()
+        self._stats = {"hits": 0, "misses": 0, "evictions_lru": 0, "evictions_ttl": 0, "invalidations": 0}
+
+    def _is_expired(self, last_access: float, now: float) -> bool:
+        return self.idle_ttl_seconds is not None and (now - last_access) > self.idle_ttl_seconds
+
+    def _notify(self, evicted):
+        if not self.on_evict:
+            return
+        for key, value, reason in evicted:
+            try:
+                self.on_evict(key, value, reason)
+            except Exception as e:
+                print(f"CACHE[{self.name}] WARN: on_evict failed for {key!r}: {e}")
+
+    def _lookup_locked(self, key, now, evicted):
+        entry = self._entries.get(key)
+        if entry is None:
+            return False, None
+        if self._is_expired(entry[1], now):
+            self._remove_locked(key)
+            self._stats["evictions_ttl"] += 1
+            evicted.append((key, entry[0], "ttl"))
+            return False, None
+        entry[1] = now
+        self._entries.move_to_end(key)
+        return True, entry[0]
+
+    def _remove_locked(self, key):
+        entry = self._entries.pop(key)
+        self._weight -= entry[2]
+        return entry[0]
+
+    def _over_capacity(self) -> bool:
+        if len(self._entries) > self.max_entries:
+            return True
+        # A single value heavier than max_weight is still kept (alone) rather than dropped on insert
+        return self.max_weight is not None and self._weight > self.max_weight and len(self._entries) > 1
+
+    def _insert_locked(self, key, value, now, evicted):
+        if key in self._entries:
+            self._remove_locked(key)
+        weight = self.weigher(value) if self.weigher else 0
+        self._entries[key] = [value, now, weight]
+        self._weight += weight
+        while self._over_capacity():
+            old_key = next(iter(self._entries))
+            old_value = self._remove_locked(old_key)
+            self._stats["evictions_lru"] += 1
+            evicted.append((old_key, old_value, "lru"))
+
+    def get(self, key, default=None):
+        evicted = []
+        with self._lock:
+            found, value = self._lookup_locked(key, time.monotonic(), evicted)
+            self._stats["hits" if found else "misses"] += 1
+        self._notify(evicted)
+        return value if found else default
+
+    def peek(self, key, default=None):
+        """Value for 'key' without counting a lookup or refreshing its LRU position / idle timer."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or self._is_expired(entry[1], time.monotonic()):
+                return default
+            return entry[0]
+
+    def put(self, key, value):
+        evicted = []
+        with self._lock:
+            previous = self._entries.get(key)
+            if previous is not None and previous[0] is not value:
+                evicted.append((key, previous[0], "replaced"))
+            self._insert_locked(key, value, time.monotonic(), evicted)
+        self._notify(evicted)
+
+    def get_or_create(self, key, factory):
+        """
+        Returns the cached value for 'key', building it with 'factory()' on a miss.
+        The factory runs outside the lock; if two threads race, the first insert wins and
+        the loser's value is discarded (and passed to on_evict as 'duplicate').
+        """
+        evicted = []
+        with self._lock:
+            found, value = self._lookup_locked(key, time.monotonic(), evicted)
+            self._stats["hits" if found else "misses"] += 1
+        self._notify(evicted)
+        if found:
+            return value
+
+        new_value = factory()
+        evicted = []
+        with self._lock:
+            found, existing = self._lookup_locked(key, time.monotonic(), evicted)
+            if found:
+                evicted.append((key, new_value, "duplicate"))
+                result = existing
+            else:
+                self._insert_locked(key, new_value, time.monotonic(), evicted)
+                result = new_value
+        self._notify(evicted)
+        return result
+
+    def pop(self, key, default=None):
+        evicted = []
+        with self._lock:
+            found = key in self._entries
+            if found:
+                value = self._remove_locked(key)
+                self._stats["invalidations"] += 1
+                evicted.append((key, value, "invalidated"))
+        self._notify(evicted)
+        return value if found else default
+
+    def pop_where(self, predicate) -> int:
+        """Invalidates every entry for which predicate(key, value) is true. Returns the count."""
+        evicted = []
+        with self._lock:
+            for key in [k for k, entry in self._entries.items() if predicate(k, entry[0])]:
+                value = self._remove_locked(key)
+                self._stats["invalidations"] += 1
+                evicted.append((key, value, "invalidated"))
+        self._notify(evicted)
+        return len(evicted)
+
+    def sweep(self) -> int:
+        """Drops all idle-expired entries. Returns how many were evicted."""
+        evicted = []
+        now = time.monotonic()
+        with self._lock:
+            for key in [k for k, entry in self._entries.items() if self._is_expired(entry[1], now)]:
+                value = self._remove_locked(key)
+                self._stats["evictions_ttl"] += 1
+                evicted.append((key, value, "ttl"))
+        self._notify(evicted)
+        return len(evicted)
+
+    def clear(self):
+        with self._lock:
+            evicted = [(k, entry[0], "invalidated") for k, entry in self._entries.items()]
+            self._entries.clear()
+            self._weight = 0
+            self._stats["invalidations"] += len(evicted)
+        self._notify(evicted)
+
+    def keys(self):
+        with self._lock:
+            return list(self._entries.keys())
+
+    def items(self):
+        """Snapshot of (key, value) pairs; does not count as access."""
+        with self._lock:
+            return [(k, entry[0]) for k, entry in self._entries.items()]
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self._stats["hits"] + self._stats["misses"]
+            return {
+                "name": self.name,
+                "size": len(self._entries),
+                "max_entries": self.max_entries,
+                "idle_ttl_seconds": self.idle_ttl_seconds,
+                **({"weight": self._weight, "max_weight": self.max_weight} if self.max_weight is not None else {}),
+                **self._stats,
+                "hit_rate": round(self._stats["hits"] / lookups, 4) if lookups else None,
+            }
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
+
+    def __contains__(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            return entry is not None and not self._is_expired(entry[1], time.monotonic())
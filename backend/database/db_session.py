@@ -1,19 +1,67 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event, inspect
+from sqlalchemy.engine import make_url
+from sqlalchemy.pool import QueuePool, StaticPool
 from sqlalchemy.orm import sessionmaker, scoped_session
 from sqlalchemy.ext.declarative import declarative_base
 from contextlib import contextmanager # <--- ADD THIS IMPORT
+import contextvars
+import os
+import threading
 
 # Import the URI from the central config
 from config import config as app_config # Renamed to avoid conflict with 'config' in K8s client
 
 print(f"DEBUG: db_session.py - Loaded SQLALCHEMY_DATABASE_URI: {app_config.SQLALCHEMY_DATABASE_URI}")
 
-# Add connect_args for SQLite to allow multiple threads (e.g. Flask dev server)
-engine_args = {"echo": app_config.SQLALCHEMY_ECHO}
-if "sqlite" in app_config.SQLALCHEMY_DATABASE_URI:
-    engine_args["connect_args"] = {"check_same_thread": False}
+def _is_memory_sqlite(url) -> bool:
+    return url.database in (None, "", ":memory:") or "mode=memory" in str(url)
 
-engine = create_engine(app_config.SQLALCHEMY_DATABASE_URI, **engine_args)
+
+def _apply_sqlite_pragmas(dbapi_connection, _connection_record):
+    cursor = dbapi_connection.cursor()
+    try:
+        cursor.execute(f"PRAGMA journal_mode={app_config.SQLITE_JOURNAL_MODE}") # Persistent; effectively once per file
+        cursor.execute(f"PRAGMA synchronous={app_config.SQLITE_SYNCHRONOUS}") # NORMAL is durable enough with WAL
+        cursor.execute(f"PRAGMA busy_timeout={app_config.SQLITE_BUSY_TIMEOUT_MS}")
+        cursor.execute(f"PRAGMA mmap_size={app_config.SQLITE_MMAP_SIZE_MB * 1024 * 1024}")
+        cursor.execute(f"PRAGMA cache_size=-{app_config.SQLITE_CACHE_SIZE_MB * 1024}") # Negative: KiB, not pages
+        cursor.execute("PRAGMA temp_store=MEMORY")
+    finally:
+        cursor.close()
+
+
+def create_db_engine(database_uri: str = None):
+    """
+    Builds the engine for 'database_uri' (default: Config.SQLALCHEMY_DATABASE_URI).
+    SQLite: pragmas on connect (see Config.SQLITE_*), a QueuePool of long-lived connections for a file
+    database (keeps their page cache and mmap warm) or one shared connection for an in-memory one.
+    Server databases: QueuePool sized by Config.DB_POOL_*, with pre-ping and recycling.
+    """
+    url = make_url(database_uri or app_config.SQLALCHEMY_DATABASE_URI)
+    engine_args = {"echo": app_config.SQLALCHEMY_ECHO, "pool_pre_ping": app_config.DB_POOL_PRE_PING}
+    if url.get_backend_name() == "sqlite":
+        # Allow use from multiple threads (e.g. Flask dev server, background summaries); the driver's own
+        # timeout is the busy timeout for the initial lock as well
+        engine_args["connect_args"] = {"check_same_thread": False, "timeout": app_config.SQLITE_BUSY_TIMEOUT_MS / 1000}
+        if _is_memory_sqlite(url):
+            engine_args["poolclass"] = StaticPool
+        else:
+            engine_args.update(poolclass=QueuePool, pool_size=app_config.DB_POOL_SIZE,
+                               max_overflow=app_config.DB_MAX_OVERFLOW, pool_timeout=app_config.DB_POOL_TIMEOUT_SECONDS)
+        new_engine = create_engine(url, **engine_args)
+        event.listen(new_engine, "connect", _apply_sqlite_pragmas)
+        return new_engine
+
+    engine_args.update(pool_size=app_config.DB_POOL_SIZE, max_overflow=app_config.DB_MAX_OVERFLOW,
+                       pool_timeout=app_config.DB_POOL_TIMEOUT_SECONDS, pool_recycle=app_config.DB_POOL_RECYCLE_SECONDS)
+    return create_engine(url, **engine_args)
+
+
+engine = create_db_engine()
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "migrations")
+# Revision matching the tables create_all() built before migrations existed
+LEGACY_BASELINE_REVISION = "0001_initial_schema"
 
 # SessionLocal will be the factory for new sessions
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
@@ -21,12 +69,85 @@ SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 # Base class for declarative models
 Base = declarative_base()
 
+class _DbScope:
+    __slots__ = ("session", "lock", "loaded")
+
+    def __init__(self):
+        # Objects stay readable after commits, so one turn's identity map survives its write phases
+        self.session = SessionLocal(expire_on_commit=False)
+        self.lock = threading.RLock() # Sessions are not thread-safe; parallel tool calls take turns
+        # The identity map only holds weak references; keep every object loaded in the scope alive
+        # until it ends, so a second lookup of the same row is a hit even if the caller dropped it
+        self.loaded = set()
+        event.listen(self.session, "loaded_as_persistent", lambda _s, obj: self.loaded.add(obj))
+        event.listen(self.session, "pending_to_persistent", lambda _s, obj: self.loaded.add(obj))
+
+
+# The request/turn scope of the current context. Tool calls on worker threads inherit it
+# (asyncio.to_thread and LangChain's executors copy the context); plain threading.Thread does not.
+_current_db_scope = contextvars.ContextVar("current_db_scope", default=None)
+
+
+def open_db_scope():
+    """Starts a request/turn scope; returns the token for close_db_scope(), or None when already inside one."""
+    if _current_db_scope.get() is not None:
+        return None
+    return _current_db_scope.set(_DbScope())
+
+
+def close_db_scope(token):
+    if token is None:
+        return
+    scope = token.var.get()
+    try:
+        _current_db_scope.reset(token)
+    except ValueError: # Closed from a copied context (e.g. a streamed response); the copy dies with it
+        pass
+    with scope.lock:
+        scope.session.close()
+        scope.loaded.clear()
+
+
+@contextmanager
+def db_session_scope():
+    """
+    Request/turn scope: every get_db_session() inside it, in any service or tool, uses the same
+    Session, so repeated lookups of the same rows are identity-map hits instead of new sessions,
+    connections and queries. Nested scopes join the outer one.
+    """
+    token = open_db_scope()
+    try:
+        yield
+    finally:
+        close_db_scope(token)
+
+
+def release_db_connection():
+    """
+    Ends the scope's current transaction so its connection goes back to the pool (e.g. while the
+    LLM is thinking); the next query checks one out again. Loaded objects stay usable.
+    """
+    scope = _current_db_scope.get()
+    if scope is None:
+        return
+    with scope.lock:
+        try:
+            scope.session.commit()
+        except Exception:
+            scope.session.rollback()
+
+
 @contextmanager
 def get_db_session():
     """
-    Provides a database session. Call db.close() when done.
-    Recommended to use with a context manager or dependency injector.
+    Provides a database session: the request/turn scope's shared session when inside
+    db_session_scope() (left open for the rest of the scope), otherwise a new one closed on exit.
     """
+    scope = _current_db_scope.get()
+    if scope is not None:
+        with scope.lock:
+            yield scope.session
+        return
     db = SessionLocal()
     try:
         yield db
@@ -35,16 +156,22 @@ def get_db_session():
 
 def init_db_tables(app_instance_for_context=None):
     """
-    Initializes the database and creates tables if they don't exist.
-    Call this once at application startup.
-    Requires all model modules to be imported before calling.
+    Brings the schema up to date by running the Alembic migrations (migrations/), which own it.
+    Call this once at application startup. A database that create_all() built before migrations
+    existed (tables but no alembic_version) is stamped at LEGACY_BASELINE_REVISION first, so
+    only the later revisions run on it.
     """
-    # Import all model modules here so Base knows about them.
-    # This is crucial for create_all to work.
-    from . import models # Relative import assuming models.py is in the same 'database' package
-    # Add imports for any other files where you define models, if separated.
-
-    print(f"Initializing database tables at {engine.url}...")
-    Base.metadata.create_all(bind=engine)
-    print("Database tables process complete (created if they didn't exist).")
+    from alembic import command
+    from alembic.config import Config as AlembicConfig
 
+    alembic_cfg = AlembicConfig() # No ini file, so the app's logging configuration is left alone
+    alembic_cfg.set_main_option("script_location", MIGRATIONS_DIR)
+    print(f"Migrating database at {engine.url}...")
+    with engine.begin() as connection:
+        alembic_cfg.attributes["connection"] = connection # The app's engine: same pragmas, same in-memory DB
+        tables = set(inspect(connection).get_table_names())
+        if "alembic_version" not in tables and "spaces" in tables:
+            print(f"Database predates migrations, stamping it at {LEGACY_BASELINE_REVISION}")
+            command.stamp(alembic_cfg, LEGACY_BASELINE_REVISION)
+        command.upgrade(alembic_cfg, "head")
+    print("Database schema is up to date.")
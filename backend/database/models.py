@@ -1,8 +1,9 @@
-from sqlalchemy import Column, Integer, String, Text, DateTime, Enum as SQLAlchemyEnum, ForeignKey, JSON, Boolean, UniqueConstraint, Table 
+from sqlalchemy import Column, Integer, String, Text, DateTime, Enum as SQLAlchemyEnum, ForeignKey, JSON, Boolean, UniqueConstraint, Table, Index 
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func # For server_default=func.now()
 from sqlalchemy.dialects.postgresql import UUID # Or use sqlalchemy_utils for cross-db UUID
 from sqlalchemy_utils import UUIDType # <--- ADD THIS IMPORT
+from .types import JSONText # JSONB on PostgreSQL, Text elsewhere
 import uuid
 from .db_session import Base # Import Base from db_session.py
 import enum
@@ -33,7 +34,7 @@ user_installed_plugins_table = Table("user_installed_plugins", Base.metadata,
     Column("installed_at", DateTime(timezone=True), server_default=func.now()),
     # Optional: Store user-specific GLOBAL configuration for this plugin here
     # This is NOT per-space config, but rather user's general settings for an installed plugin.
-    Column("user_specific_plugin_config_json", Text, nullable=True)
+    Column("user_specific_plugin_config_json", JSONText, nullable=True)
 )
 
 
@@ -50,8 +51,8 @@ class Plugin(Base):
     sub_category = Column(String(100), nullable=True)
     target_space_type = Column(SQLAlchemyEnum(SpaceTypeEnum), nullable=True) # Use the existing SpaceTypeEnum
 
-    entry_point_config_json = Column(Text, nullable=True)
-    default_config_schema_json = Column(Text, nullable=True)
+    entry_point_config_json = Column(JSONText, nullable=True)
+    default_config_schema_json = Column(JSONText, nullable=True)
     icon_url_or_emoji = Column(String(255), nullable=True)
     is_core_plugin = Column(Boolean, default=False)
     
@@ -110,7 +111,7 @@ class OAuthAccount(Base):
     __tablename__ = "oauth_accounts"
 
     id = Column(Integer, primary_key=True, index=True, autoincrement=True)
-    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    user_id = Column(UUIDType(binary=False), ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
     
     provider_name = Column(String(50), nullable=False)  # e.g., "google", "github"
     provider_user_id = Column(String(255), nullable=False) # ID from the OAuth provider
@@ -135,12 +136,13 @@ class OAuthAccount(Base):
 class ChatSession(Base):
     __tablename__ = "chat_sessions"
     id = Column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()), index=True) # Auto-generate UUID
-    space_id = Column(Integer, ForeignKey("spaces.id", ondelete="CASCADE"), nullable=False, index=True)
+    space_id = Column(UUIDType(binary=False), ForeignKey("spaces.id", ondelete="CASCADE"), nullable=False, index=True)
     name = Column(String(255), nullable=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     last_accessed_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
-    summary = Column(Text, nullable=True)
-    llm_agent_config_snapshot_json = Column(Text, nullable=True)
+    summary = Column(Text, nullable=True) # Rolling summary of turns that no longer fit the history token budget
+    summary_through_message_id = Column(Integer, nullable=True) # Last ChatMessage.id folded into 'summary'
+    llm_agent_config_snapshot_json = Column(JSONText, nullable=True)
     
     space = relationship("Space", back_populates="chat_sessions")
     messages = relationship("ChatMessage", back_populates="session", cascade="all, delete-orphan", order_by="ChatMessage.timestamp")
@@ -155,11 +157,20 @@ class ChatMessage(Base):
     session_id = Column(String(36), ForeignKey("chat_sessions.id", ondelete="CASCADE"), nullable=False, index=True)
     role = Column(SQLAlchemyEnum(ChatMessageRoleEnum), nullable=False)
     content = Column(Text, nullable=False)
-    metadata_json = Column(Text, nullable=True) # For tool calls/results details
+    metadata_json = Column(JSONText, nullable=True) # For tool calls/results details
     timestamp = Column(DateTime(timezone=True), server_default=func.now())
+    # Usage accounting: the turn's LLM tokens and LLM time sit on its final assistant row,
+    # tool run time on each tool_result row (per-call details are in metadata_json)
+    prompt_tokens = Column(Integer, nullable=True)
+    completion_tokens = Column(Integer, nullable=True)
+    cached_tokens = Column(Integer, nullable=True) # Prompt tokens served from the provider's context cache
+    latency_ms = Column(Integer, nullable=True)
     
     session = relationship("ChatSession", back_populates="messages")
 
+    # Serves history reads (newest-N per session) and keyset pagination ordered by (timestamp, id)
+    __table_args__ = (Index("ix_chat_messages_session_ts_id", "session_id", "timestamp", "id"),)
+
     def __repr__(self):
         return f"<ChatMessage(id={self.id}, role='{self.role.value}')>"
 
@@ -174,7 +185,7 @@ class Space(Base):
     from sqlalchemy.dialects.postgresql import UUID
     #id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     id = Column(UUIDType(binary=False), primary_key=True, default=uuid.uuid4, index=True, unique=True)
-    owner_id = Column(Integer, ForeignKey("users.id"), nullable=True) # Or False if a space MUST have an owner
+    owner_id = Column(UUIDType(binary=False), ForeignKey("users.id"), nullable=True, index=True) # Or False if a space MUST have an owner
     owner = relationship("User", back_populates="spaces")
 
     name = Column(String(255), nullable=False, index=True)
@@ -187,7 +198,9 @@ class Space(Base):
     # This is a placeholder; actual key storage needs a secure vault or env vars referenced by ID
     llm_api_key_placeholder = Column(String(255), nullable=True) # e.g., "GOOGLE_API_KEY_FOR_SPACE_XYZ"
     llm_model_name = Column(String(100), nullable=True)
-    agent_config_json = Column(Text, nullable=True) # Store agent specific config as JSON string
+    agent_config_json = Column(JSONText, nullable=True) # Store agent specific config as JSON string
+    # Bumped by SpaceService on every change to this space or its dev/ops config; identifies cached snapshots
+    config_version = Column(Integer, nullable=True, default=1)
 
     mcp_server_url = Column(String(512), nullable=True)
     mcp_server_api_key_placeholder = Column(String(255), nullable=True) # Placeholder
@@ -214,17 +227,36 @@ class DevSpaceConfig(Base):
     git_repo_url = Column(String(512), nullable=True) # This field is key
     default_branch = Column(String(100), nullable=True, default="main")
     # --- NEW FIELDS FOR CACHING ---
-    cached_file_tree_json = Column(Text, nullable=True) # Store the tree as a JSON string
+    # Legacy single-branch tree cache, superseded by GitTreeCache (kept so existing DBs still load)
+    cached_file_tree_json = Column(JSONText, nullable=True) # Store the tree as a JSON string
     cached_tree_branch = Column(String(255), nullable=True) # Which branch this cache is for
     tree_last_fetched_at = Column(DateTime(timezone=True), nullable=True)
     # --- END NEW FIELDS ---
-    k8s_environments_json = Column(Text, nullable=True)
+    k8s_environments_json = Column(JSONText, nullable=True)
     space = relationship("Space", back_populates="dev_config")
+    tree_caches = relationship("GitTreeCache", back_populates="dev_config", cascade="all, delete-orphan", lazy="dynamic")
 
     def __repr__(self):
         return f"<DevSpaceConfig(space_id={self.space_id}, git_repo_url='{self.git_repo_url}')>"
 
 
+class GitTreeCache(Base):
+    """File tree of one branch of a dev space's repo, valid for exactly one commit SHA."""
+    __tablename__ = "git_tree_caches"
+    id = Column(Integer, primary_key=True, index=True)
+    dev_config_id = Column(Integer, ForeignKey("dev_space_configs.id", ondelete="CASCADE"), nullable=False, index=True)
+    branch = Column(String(255), nullable=False)
+    commit_sha = Column(String(64), nullable=False, index=True)
+    tree_json = Column(JSONText, nullable=False)
+    fetched_at = Column(DateTime(timezone=True), server_default=func.now())
+    dev_config = relationship("DevSpaceConfig", back_populates="tree_caches")
+
+    __table_args__ = (UniqueConstraint("dev_config_id", "branch", name="_git_tree_cache_branch_uc"),)
+
+    def __repr__(self):
+        return f"<GitTreeCache(dev_config_id={self.dev_config_id}, branch='{self.branch}', commit_sha='{self.commit_sha}')>"
+
+
 # --- Ops Space Specific Configuration ---
 class OpsSpaceConfig(Base):
     __tablename__ = "ops_space_configs"
@@ -232,19 +264,19 @@ class OpsSpaceConfig(Base):
     id = Column(Integer, primary_key=True, index=True)
     space_id = Column(UUIDType(binary=False), ForeignKey("spaces.id", ondelete="CASCADE"), nullable=False, unique=True)
     # CMDB connection details or API endpoint for fetching workloads
-    cmdb_config_json = Column(Text, nullable=True) # e.g., {"api_url": "...", "auth_token_ref": "..."}
+    cmdb_config_json = Column(JSONText, nullable=True) # e.g., {"api_url": "...", "auth_token_ref": "..."}
 
     # List of K8s clusters/contexts to monitor for workloads
     # e.g., [{"name": "Prod Cluster A", "context": "prod-a-ctx", "namespaces": ["ns1", "ns2"]}, ...]
-    k8s_cluster_configs_json = Column(Text, nullable=True)
+    k8s_cluster_configs_json = Column(JSONText, nullable=True)
 
     # Metadata to help identify specific workloads of interest (e.g., labels, names)
     # e.g., [{"type": "deployment", "name_pattern": "frontend-*", "namespace": "prod"}]
-    monitored_workloads_metadata_json = Column(Text, nullable=True)
+    monitored_workloads_metadata_json = Column(JSONText, nullable=True)
 
     # Enabled AIOps skills and their configurations for this space
     # e.g., {"anomaly_detection": {"sensitivity": "high"}, "root_cause_analysis_v2": {"enabled": true}}
-    aiops_skills_config_json = Column(Text, nullable=True)
+    aiops_skills_config_json = Column(JSONText, nullable=True)
 
     space = relationship("Space", back_populates="ops_config")
 
@@ -259,7 +291,7 @@ class ChatSessionNote(Base):
     id = Column(Integer, primary_key=True, index=True)
     space_id = Column(UUIDType(binary=False), ForeignKey("spaces.id", ondelete="CASCADE"), nullable=False, unique=True)
     title = Column(String(255), nullable=False)
-    content_json = Column(Text, nullable=False) # Store conversation history or prompt itself as JSON string
+    content_json = Column(JSONText, nullable=False) # Store conversation history or prompt itself as JSON string
     # Example content: {"type": "prompt_template", "template": "Analyze logs for pod {{pod_name}} in {{namespace}} for errors related to 'CrashLoopBackOff'."}
     # Or {"type": "chat_log", "messages": [{"role": "user", "content": "..."}, {"role": "assistant", "content": "..."}]}
     created_at = Column(DateTime(timezone=True), server_default=func.now())
@@ -283,7 +315,7 @@ class ScheduledTask(Base):
     
     # What action this task performs
     task_type = Column(String(100), nullable=False) # e.g., "RUN_AIOPS_SKILL", "CALL_MCP_JOB", "K8S_ACTION"
-    task_parameters_json = Column(Text, nullable=True) # JSON string for parameters
+    task_parameters_json = Column(JSONText, nullable=True) # JSON string for parameters
 
     is_enabled = Column(Boolean, default=True, nullable=False)
     last_run_at = Column(DateTime(timezone=True), nullable=True)
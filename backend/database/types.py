@@ -0,0 +1,44 @@
+# devspace/backend/database/types.py
+# Column types that are native on PostgreSQL and degrade to portable storage elsewhere (SQLite).
+import json
+
+import sqlalchemy as sa
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.types import TypeDecorator
+
+
+class JSONText(TypeDecorator):
+    """
+    A JSON document column: JSONB on PostgreSQL (queryable, GIN-indexable), TEXT elsewhere.
+    Python values stay JSON *strings*, exactly as with the plain Text columns it replaces, so
+    existing json.dumps/json.loads callers are unaffected. Dicts/lists are accepted on write too.
+    """
+    impl = sa.Text
+    cache_ok = True
+
+    def load_dialect_impl(self, dialect):
+        if dialect.name == "postgresql":
+            return dialect.type_descriptor(JSONB(none_as_null=True))
+        return dialect.type_descriptor(sa.Text())
+
+    def process_bind_param(self, value, dialect):
+        if value is None:
+            return None
+        if dialect.name == "postgresql":
+            return json.loads(value) if isinstance(value, str) else value # JSONB serializes it again
+        return value if isinstance(value, str) else json.dumps(value)
+
+    def process_result_value(self, value, dialect):
+        if value is None or isinstance(value, str):
+            return value
+        return json.dumps(value) # psycopg2 already decoded the jsonb value
+
+
+def json_path_text(column, *path):
+    """
+    SQL expression for the text value at 'path' inside a JSONText column, e.g.
+    json_path_text(DevSpaceConfig.k8s_environments_json, "prod", "namespace") == "shop".
+    Renders as #>> on PostgreSQL and JSON_EXTRACT on SQLite, so the filter runs in the database.
+    """
+    return sa.type_coerce(column, sa.JSON)[path].as_string()
+
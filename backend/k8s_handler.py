@@ -1,7 +1,12 @@
 from kubernetes import client, config, watch
-from config import K8S_APP_CONFIG
+from config import config as app_config
+from services.k8s_fanout import fan_out
+from services.k8s_informer_cache import k8s_informer_cache
 import time
 
+K8S_APP_CONFIG = getattr(app_config, "K8S_APP_CONFIG", {}) # app_id -> {"namespace", "label_selector"}
+INFORMER_CONTEXT_KEY = "default" # The clients below use the default kubeconfig context
+
 # --- Load K8s Config ---
 try:
     # Try loading default config (from ~/.kube/config or KUBECONFIG env var)
@@ -30,102 +35,66 @@ if config: # Check if config loading was attempted/successful
         APPS_V1_API = None
 
 
-def get_k8s_status(app_id: str) -> dict:
+def _list_from_informer(kind: str, namespace: str, label_selector: str) -> list:
+    # Served from the shared informer cache: the first call per namespace lists and starts watching,
+    # later calls read the in-memory copy.
+    apis = {"core_v1": CORE_V1_API, "apps_v1": APPS_V1_API}
+    cached = k8s_informer_cache.list(INFORMER_CONTEXT_KEY, kind, namespace, apis, label_selector)
+    if not cached["success"]:
+        raise RuntimeError(cached["error"])
+    return cached["items"]
+
+
+def get_k8s_status_multi(app_ids: list) -> dict:
     """
-    Fetches the status of Deployments, Pods, and Services related to the app_id.
-    Uses label selectors defined in config.py.
+    Fetches Deployments, Pods and Services for several apps at once. Every (app, namespace, kind) list
+    runs concurrently, so the wall time is that of the slowest call. An app config may name several
+    namespaces ("namespaces": [...]). Returns {"apps": {app_id: status}}, where each status has the
+    per-kind lists, "errors" ([{"namespace", "resource", "error"}]) and "error" (set only when nothing
+    could be fetched for the app).
     """
-    print(f"Attempting to get K8s status for app_id: {app_id}")
+    print(f"Attempting to get K8s status for app_ids: {app_ids}")
     if not CORE_V1_API or not APPS_V1_API:
-        return {"error": "Kubernetes client not initialized."}
+        return {"apps": {app_id: {"error": "Kubernetes client not initialized."} for app_id in app_ids}}
+
+    kinds = ("deployments", "pods", "services")
+    statuses, calls = {}, {}
+    for app_id in app_ids:
+        app_conf = K8S_APP_CONFIG.get(app_id)
+        if not app_conf:
+            statuses[app_id] = {"error": f"Configuration not found for app_id: {app_id}"}
+            continue
+        namespaces = app_conf.get("namespaces") or [app_conf.get("namespace", "default")]
+        label_selector = app_conf.get("label_selector", "") # Use empty string if not defined
+        print(f"App '{app_id}': namespaces={namespaces}, label_selector='{label_selector}'")
+        statuses[app_id] = {**{kind: [] for kind in kinds}, "errors": [], "error": None}
+        for namespace in namespaces:
+            for kind in kinds:
+                calls[(app_id, namespace, kind)] = (
+                    lambda kind=kind, namespace=namespace, label_selector=label_selector: _list_from_informer(kind, namespace, label_selector)
+                )
 
-    app_conf = K8S_APP_CONFIG.get(app_id)
-    if not app_conf:
-        return {"error": f"Configuration not found for app_id: {app_id}"}
-
-    namespace = app_conf.get("namespace", "default")
-    label_selector = app_conf.get("label_selector", "") # Use empty string if not defined
-    print(f"Using namespace='{namespace}', label_selector='{label_selector}'")
-
-    results = {
-        "deployments": [],
-        "pods": [],
-        "services": [],
-        "error": None
-    }
     start_time = time.time()
-
-    try:
-        # Get Deployments
-        print(f"Fetching deployments...")
-        api_response_dep = APPS_V1_API.list_namespaced_deployment(namespace, label_selector=label_selector, timeout_seconds=10)
-        for dep in api_response_dep.items:
-            status = dep.status
-            results["deployments"].append({
-                "name": dep.metadata.name,
-                "replicas": dep.spec.replicas or 0,
-                "readyReplicas": status.ready_replicas or 0,
-                "availableReplicas": status.available_replicas or 0,
-                "updatedReplicas": status.updated_replicas or 0,
-                "status": "Running" if (status.ready_replicas or 0) == (dep.spec.replicas or 0) and (status.ready_replicas or 0) > 0 else "Updating/Pending", # Simplified status
-                "conditions": [cond.type + "=" + cond.status for cond in status.conditions] if status.conditions else []
-            })
-        print(f"Found {len(results['deployments'])} deployments.")
-
-        # Get Pods
-        print(f"Fetching pods...")
-        api_response_pod = CORE_V1_API.list_namespaced_pod(namespace, label_selector=label_selector, timeout_seconds=10)
-        for pod in api_response_pod.items:
-            ready_containers = 0
-            total_containers = len(pod.spec.containers)
-            restarts = 0
-            if pod.status.container_statuses:
-                for cs in pod.status.container_statuses:
-                    if cs.ready:
-                        ready_containers += 1
-                    restarts += cs.restart_count # Sum restarts across containers
-
-            results["pods"].append({
-                "name": pod.metadata.name,
-                "ready": f"{ready_containers}/{total_containers}",
-                "status": pod.status.phase, # e.g., Pending, Running, Succeeded, Failed, Unknown
-                "restarts": restarts,
-                "nodeName": pod.spec.node_name,
-                "podIP": pod.status.pod_ip,
-            })
-        print(f"Found {len(results['pods'])} pods.")
-
-
-        # Get Services
-        print(f"Fetching services...")
-        api_response_svc = CORE_V1_API.list_namespaced_service(namespace, label_selector=label_selector, timeout_seconds=10)
-        for svc in api_response_svc.items:
-            external_ip = "<none>"
-            if svc.spec.type == "LoadBalancer" and svc.status.load_balancer.ingress:
-                 # Use hostname if available, else IP
-                 ingress = svc.status.load_balancer.ingress[0]
-                 external_ip = ingress.hostname or ingress.ip or "<pending>"
-            elif svc.spec.external_i_ps: # Handle ExternalName, etc. if needed
-                 external_ip = ",".join(svc.spec.external_i_ps)
-
-
-            results["services"].append({
-                "name": svc.metadata.name,
-                "type": svc.spec.type,
-                "clusterIP": svc.spec.cluster_ip or "<none>",
-                "externalIP": external_ip,
-                "ports": ", ".join([f"{p.port}/{p.protocol}" + (f"->{p.node_port}" if p.node_port else "") for p in svc.spec.ports]) if svc.spec.ports else "<none>"
-            })
-        print(f"Found {len(results['services'])} services.")
-
-    except client.ApiException as e:
-        print(f"Kubernetes API Error fetching status for app '{app_id}': {e.reason} (Status: {e.status})")
-        results["error"] = f"Kubernetes API Error: {e.reason}"
-    except Exception as e:
-        print(f"Unexpected error fetching K8s status for app '{app_id}': {e}")
-        results["error"] = "An unexpected error occurred while fetching Kubernetes status."
+    outcomes = fan_out(calls) if calls else {}
+    for (app_id, namespace, kind), outcome in outcomes.items():
+        if outcome["success"]:
+            statuses[app_id][kind].extend(outcome["result"])
+        else:
+            print(f"Error fetching {kind} in '{namespace}' for app '{app_id}': {outcome['error']}")
+            statuses[app_id]["errors"].append({"namespace": namespace, "resource": kind, "error": outcome["error"]})
+    for app_id, status in statuses.items():
+        attempted = sum(1 for key in calls if key[0] == app_id)
+        if attempted and len(status["errors"]) == attempted:
+            status["error"] = status["errors"][0]["error"]
 
     end_time = time.time()
-    print(f"K8s status fetch for '{app_id}' took {end_time - start_time:.2f} seconds.")
-    return results
+    print(f"K8s status fetch for {len(app_ids)} app(s) took {end_time - start_time:.2f} seconds.")
+    return {"apps": statuses}
 
+
+def get_k8s_status(app_id: str) -> dict:
+    """
+    Fetches the status of Deployments, Pods, and Services related to the app_id.
+    Uses label selectors defined in config.py.
+    """
+    return get_k8s_status_multi([app_id])["apps"][app_id]
@@ -0,0 +1,64 @@
+# devspace/backend/migrations/env.py
+from logging.config import fileConfig
+
+from alembic import context
+
+from config import config as app_config
+from database.db_session import Base, create_db_engine
+from database import models # noqa: F401  Registers every table on Base.metadata
+from database.types import JSONText
+
+if context.config.config_file_name is not None:
+    fileConfig(context.config.config_file_name)
+
+target_metadata = Base.metadata
+
+
+def render_item(type_, obj, autogen_context):
+    """Renders the project's column types so autogenerated revisions import them correctly."""
+    if type_ == "type" and isinstance(obj, JSONText):
+        autogen_context.imports.add("from database.types import JSONText")
+        return "JSONText()"
+    if type_ == "type" and type(obj).__name__ == "UUIDType":
+        autogen_context.imports.add("import sqlalchemy_utils")
+        return "sqlalchemy_utils.UUIDType(binary=False)"
+    return False
+
+
+def _configure(**kwargs):
+    context.configure(
+        target_metadata=target_metadata,
+        render_item=render_item,
+        compare_type=True,
+        render_as_batch=app_config.SQLALCHEMY_DATABASE_URI.startswith("sqlite"), # SQLite cannot ALTER most things
+        **kwargs,
+    )
+
+
+def run_migrations_offline():
+    _configure(url=app_config.SQLALCHEMY_DATABASE_URI, literal_binds=True, dialect_opts={"paramstyle": "named"})
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+def run_migrations_online():
+    connection = context.config.attributes.get("connection") # Passed in by init_db_tables() at app startup
+    if connection is not None:
+        _configure(connection=connection)
+        with context.begin_transaction():
+            context.run_migrations()
+        return
+    engine = create_db_engine()
+    try:
+        with engine.connect() as connection:
+            _configure(connection=connection)
+            with context.begin_transaction():
+                context.run_migrations()
+    finally:
+        engine.dispose()
+
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    run_migrations_online()
@@ -0,0 +1,207 @@
+"""initial schema: the tables as create_all() built them before migrations existed
+
+Foreign keys to UUID primary keys are UUID columns here (PostgreSQL needs matching types);
+databases created by the old create_all() get theirs converted in 0004_uuid_foreign_keys.
+
+Revision ID: 0001_initial_schema
+Revises:
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+import sqlalchemy_utils
+from sqlalchemy.dialects import postgresql
+
+from database.types import JSONText
+
+revision = "0001_initial_schema"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+# Enum columns store the Python enum member *names*, as SQLAlchemyEnum(SomeEnum) does in models.py
+ENUMS = {
+    "spacetypeenum": ("DEV", "OPS"),
+    "llmsourceenum": ("GEMINI", "CHATGPT", "OTHER"),
+    "chatmessageroleenum": ("USER", "ASSISTANT", "SYSTEM", "TOOL_CALL", "TOOL_RESULT"),
+}
+
+
+def _enum(name):
+    # PostgreSQL types are created once up front; spacetypeenum is shared by two tables
+    return sa.Enum(*ENUMS[name], name=name).with_variant(
+        postgresql.ENUM(*ENUMS[name], name=name, create_type=False), "postgresql")
+
+
+def _uuid():
+    return sqlalchemy_utils.UUIDType(binary=False) # Native UUID on PostgreSQL, CHAR(32) elsewhere
+
+
+def upgrade():
+    bind = op.get_bind()
+    if bind.dialect.name == "postgresql":
+        for name, values in ENUMS.items():
+            postgresql.ENUM(*values, name=name).create(bind, checkfirst=True)
+
+    op.create_table(
+        "plugins",
+        sa.Column("id", sa.String(255), primary_key=True),
+        sa.Column("name", sa.String(255), nullable=False),
+        sa.Column("description", sa.Text(), nullable=True),
+        sa.Column("version", sa.String(50), nullable=False),
+        sa.Column("author", sa.String(255), nullable=True),
+        sa.Column("category", sa.String(100), nullable=False),
+        sa.Column("sub_category", sa.String(100), nullable=True),
+        sa.Column("target_space_type", _enum("spacetypeenum"), nullable=True),
+        sa.Column("entry_point_config_json", JSONText(), nullable=True),
+        sa.Column("default_config_schema_json", JSONText(), nullable=True),
+        sa.Column("icon_url_or_emoji", sa.String(255), nullable=True),
+        sa.Column("is_core_plugin", sa.Boolean(), nullable=True),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+        sa.Column("updated_at", sa.DateTime(timezone=True), nullable=True),
+    )
+    op.create_index("ix_plugins_id", "plugins", ["id"])
+
+    op.create_table(
+        "users",
+        sa.Column("id", _uuid(), primary_key=True),
+        sa.Column("username", sa.String(100), nullable=True),
+        sa.Column("email", sa.String(255), nullable=False),
+        sa.Column("hashed_password", sa.String(512), nullable=True),
+        sa.Column("full_name", sa.String(255), nullable=True),
+        sa.Column("is_active", sa.Boolean(), nullable=False),
+        sa.Column("is_superuser", sa.Boolean(), nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+        sa.Column("last_login_at", sa.DateTime(timezone=True), nullable=True),
+    )
+    op.create_index("ix_users_id", "users", ["id"], unique=True)
+    op.create_index("ix_users_username", "users", ["username"], unique=True)
+    op.create_index("ix_users_email", "users", ["email"], unique=True)
+
+    op.create_table(
+        "oauth_accounts",
+        sa.Column("id", sa.Integer(), primary_key=True, autoincrement=True),
+        sa.Column("user_id", _uuid(), sa.ForeignKey("users.id", ondelete="CASCADE"), nullable=False),
+        sa.Column("provider_name", sa.String(50), nullable=False),
+        sa.Column("provider_user_id", sa.String(255), nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+        sa.UniqueConstraint("provider_name", "provider_user_id", name="_oauth_provider_user_uc"),
+    )
+    op.create_index("ix_oauth_accounts_id", "oauth_accounts", ["id"])
+
+    op.create_table(
+        "spaces",
+        sa.Column("id", _uuid(), primary_key=True),
+        sa.Column("owner_id", _uuid(), sa.ForeignKey("users.id"), nullable=True),
+        sa.Column("name", sa.String(255), nullable=False),
+        sa.Column("type", _enum("spacetypeenum"), nullable=False),
+        sa.Column("description", sa.Text(), nullable=True),
+        sa.Column("llm_source", _enum("llmsourceenum"), nullable=True),
+        sa.Column("llm_api_key_placeholder", sa.String(255), nullable=True),
+        sa.Column("llm_model_name", sa.String(100), nullable=True),
+        sa.Column("agent_config_json", JSONText(), nullable=True),
+        sa.Column("mcp_server_url", sa.String(512), nullable=True),
+        sa.Column("mcp_server_api_key_placeholder", sa.String(255), nullable=True),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+        sa.Column("updated_at", sa.DateTime(timezone=True), nullable=True),
+    )
+    op.create_index("ix_spaces_id", "spaces", ["id"], unique=True)
+    op.create_index("ix_spaces_name", "spaces", ["name"])
+    op.create_index("ix_spaces_type", "spaces", ["type"])
+
+    op.create_table(
+        "user_installed_plugins",
+        sa.Column("user_id", _uuid(), sa.ForeignKey("users.id", ondelete="CASCADE"), primary_key=True),
+        sa.Column("plugin_id", sa.String(255), sa.ForeignKey("plugins.id", ondelete="CASCADE"), primary_key=True),
+        sa.Column("installed_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+        sa.Column("user_specific_plugin_config_json", JSONText(), nullable=True),
+    )
+
+    op.create_table(
+        "chat_session_notes",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("space_id", _uuid(), sa.ForeignKey("spaces.id", ondelete="CASCADE"), nullable=False, unique=True),
+        sa.Column("title", sa.String(255), nullable=False),
+        sa.Column("content_json", JSONText(), nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+        sa.Column("updated_at", sa.DateTime(timezone=True), nullable=True),
+    )
+    op.create_index("ix_chat_session_notes_id", "chat_session_notes", ["id"])
+
+    op.create_table(
+        "chat_sessions",
+        sa.Column("id", sa.String(36), primary_key=True),
+        sa.Column("space_id", _uuid(), sa.ForeignKey("spaces.id", ondelete="CASCADE"), nullable=False),
+        sa.Column("name", sa.String(255), nullable=True),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+        sa.Column("last_accessed_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+        sa.Column("summary", sa.Text(), nullable=True),
+        sa.Column("llm_agent_config_snapshot_json", JSONText(), nullable=True),
+    )
+    op.create_index("ix_chat_sessions_id", "chat_sessions", ["id"])
+    op.create_index("ix_chat_sessions_space_id", "chat_sessions", ["space_id"])
+
+    op.create_table(
+        "dev_space_configs",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("space_id", _uuid(), sa.ForeignKey("spaces.id", ondelete="CASCADE"), nullable=False, unique=True),
+        sa.Column("git_repo_url", sa.String(512), nullable=True),
+        sa.Column("default_branch", sa.String(100), nullable=True),
+        sa.Column("cached_file_tree_json", JSONText(), nullable=True),
+        sa.Column("cached_tree_branch", sa.String(255), nullable=True),
+        sa.Column("tree_last_fetched_at", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("k8s_environments_json", JSONText(), nullable=True),
+    )
+    op.create_index("ix_dev_space_configs_id", "dev_space_configs", ["id"])
+
+    op.create_table(
+        "ops_space_configs",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("space_id", _uuid(), sa.ForeignKey("spaces.id", ondelete="CASCADE"), nullable=False, unique=True),
+        sa.Column("cmdb_config_json", JSONText(), nullable=True),
+        sa.Column("k8s_cluster_configs_json", JSONText(), nullable=True),
+        sa.Column("monitored_workloads_metadata_json", JSONText(), nullable=True),
+        sa.Column("aiops_skills_config_json", JSONText(), nullable=True),
+    )
+    op.create_index("ix_ops_space_configs_id", "ops_space_configs", ["id"])
+
+    op.create_table(
+        "scheduled_tasks",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("space_id", _uuid(), sa.ForeignKey("spaces.id", ondelete="CASCADE"), nullable=False, unique=True),
+        sa.Column("name", sa.String(255), nullable=False),
+        sa.Column("description", sa.Text(), nullable=True),
+        sa.Column("cron_schedule", sa.String(100), nullable=False),
+        sa.Column("task_type", sa.String(100), nullable=False),
+        sa.Column("task_parameters_json", JSONText(), nullable=True),
+        sa.Column("is_enabled", sa.Boolean(), nullable=False),
+        sa.Column("last_run_at", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("last_run_status", sa.String(50), nullable=True),
+        sa.Column("last_run_log", sa.Text(), nullable=True),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+        sa.Column("updated_at", sa.DateTime(timezone=True), nullable=True),
+    )
+    op.create_index("ix_scheduled_tasks_id", "scheduled_tasks", ["id"])
+
+    op.create_table(
+        "chat_messages",
+        sa.Column("id", sa.Integer(), primary_key=True, autoincrement=True),
+        sa.Column("session_id", sa.String(36), sa.ForeignKey("chat_sessions.id", ondelete="CASCADE"), nullable=False),
+        sa.Column("role", _enum("chatmessageroleenum"), nullable=False),
+        sa.Column("content", sa.Text(), nullable=False),
+        sa.Column("metadata_json", JSONText(), nullable=True),
+        sa.Column("timestamp", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+    )
+    op.create_index("ix_chat_messages_id", "chat_messages", ["id"])
+    op.create_index("ix_chat_messages_session_id", "chat_messages", ["session_id"])
+
+
+def downgrade():
+    for table in ("chat_messages", "scheduled_tasks", "ops_space_configs", "dev_space_configs",
+                  "chat_sessions", "chat_session_notes", "user_installed_plugins", "spaces", "oauth_accounts",
+                  "users", "plugins"):
+        op.drop_table(table) # Drops the table's indexes with it
+    bind = op.get_bind()
+    if bind.dialect.name == "postgresql":
+        for name, values in ENUMS.items():
+            postgresql.ENUM(*values, name=name).drop(bind, checkfirst=True)
@@ -0,0 +1,20 @@
+"""composite index for chat history reads and keyset pagination
+
+Revision ID: 0002_chat_messages_keyset_index
+Revises: 0001_initial_schema
+Create Date: 2026-10-18
+"""
+from alembic import op
+
+revision = "0002_chat_messages_keyset_index"
+down_revision = "0001_initial_schema"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index("ix_chat_messages_session_ts_id", "chat_messages", ["session_id", "timestamp", "id"])
+
+
+def downgrade():
+    op.drop_index("ix_chat_messages_session_ts_id", table_name="chat_messages")
@@ -0,0 +1,35 @@
+"""per-branch git file tree cache keyed by commit SHA
+
+Revision ID: 0003_git_tree_caches
+Revises: 0002_chat_messages_keyset_index
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+from database.types import JSONText
+
+revision = "0003_git_tree_caches"
+down_revision = "0002_chat_messages_keyset_index"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "git_tree_caches",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("dev_config_id", sa.Integer(), sa.ForeignKey("dev_space_configs.id", ondelete="CASCADE"), nullable=False),
+        sa.Column("branch", sa.String(255), nullable=False),
+        sa.Column("commit_sha", sa.String(64), nullable=False),
+        sa.Column("tree_json", JSONText(), nullable=False),
+        sa.Column("fetched_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+        sa.UniqueConstraint("dev_config_id", "branch", name="_git_tree_cache_branch_uc"),
+    )
+    op.create_index("ix_git_tree_caches_id", "git_tree_caches", ["id"])
+    op.create_index("ix_git_tree_caches_dev_config_id", "git_tree_caches", ["dev_config_id"])
+    op.create_index("ix_git_tree_caches_commit_sha", "git_tree_caches", ["commit_sha"])
+
+
+def downgrade():
+    op.drop_table("git_tree_caches")
@@ -0,0 +1,46 @@
+"""UUID foreign keys on databases created before migrations, plus their indexes
+
+create_all() used to declare chat_sessions.space_id, spaces.owner_id and oauth_accounts.user_id
+as INTEGER although they point at UUID keys; chat_sessions.space_id rows hold the dashed UUID
+string. On such (SQLite) databases the columns are rebuilt as UUID columns and dashed values are
+rewritten to the 32-char hex form UUIDType stores, once. Databases built by 0001 already match.
+
+Revision ID: 0004_uuid_foreign_keys
+Revises: 0003_git_tree_caches
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+import sqlalchemy_utils
+
+revision = "0004_uuid_foreign_keys"
+down_revision = "0003_git_tree_caches"
+branch_labels = None
+depends_on = None
+
+UUID_FOREIGN_KEYS = (("chat_sessions", "space_id"), ("spaces", "owner_id"), ("oauth_accounts", "user_id"))
+
+
+def upgrade():
+    bind = op.get_bind()
+    # Only SQLite databases can predate migrations (and offline --sql runs cannot inspect anything)
+    legacy_candidate = bind.dialect.name == "sqlite" and not op.get_context().as_sql
+    inspector = sa.inspect(bind) if legacy_candidate else None
+    for table, column in UUID_FOREIGN_KEYS if legacy_candidate else ():
+        declared = next(c["type"] for c in inspector.get_columns(table) if c["name"] == column)
+        if not isinstance(declared, sa.Integer):
+            continue
+        with op.batch_alter_table(table) as batch_op:
+            batch_op.alter_column(column, type_=sqlalchemy_utils.UUIDType(binary=False), existing_type=declared)
+        updated = bind.execute(sa.text(
+            f"UPDATE {table} SET {column} = lower(replace({column}, '-', '')) WHERE {column} LIKE '%-%'"
+        )).rowcount
+        print(f"Converted {table}.{column} to a UUID column ({updated} dashed values rewritten)")
+
+    op.create_index("ix_spaces_owner_id", "spaces", ["owner_id"])
+    op.create_index("ix_oauth_accounts_user_id", "oauth_accounts", ["user_id"])
+
+
+def downgrade():
+    op.drop_index("ix_oauth_accounts_user_id", table_name="oauth_accounts")
+    op.drop_index("ix_spaces_owner_id", table_name="spaces")
@@ -0,0 +1,23 @@
+"""space config version for snapshot caching
+
+Revision ID: 0005_space_config_version
+Revises: 0004_uuid_foreign_keys
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0005_space_config_version"
+down_revision = "0004_uuid_foreign_keys"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table("spaces") as batch_op:
+        batch_op.add_column(sa.Column("config_version", sa.Integer(), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table("spaces") as batch_op:
+        batch_op.drop_column("config_version")
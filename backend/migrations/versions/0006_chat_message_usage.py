@@ -0,0 +1,27 @@
+"""token and latency accounting on chat messages
+
+Revision ID: 0006_chat_message_usage
+Revises: 0005_space_config_version
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0006_chat_message_usage"
+down_revision = "0005_space_config_version"
+branch_labels = None
+depends_on = None
+
+USAGE_COLUMNS = ("prompt_tokens", "completion_tokens", "cached_tokens", "latency_ms")
+
+
+def upgrade():
+    with op.batch_alter_table("chat_messages") as batch_op:
+        for name in USAGE_COLUMNS:
+            batch_op.add_column(sa.Column(name, sa.Integer(), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table("chat_messages") as batch_op:
+        for name in reversed(USAGE_COLUMNS):
+            batch_op.drop_column(name)
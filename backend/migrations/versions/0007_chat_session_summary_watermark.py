@@ -0,0 +1,23 @@
+"""watermark of the messages folded into the rolling chat session summary
+
+Revision ID: 0007_chat_session_summary_watermark
+Revises: 0006_chat_message_usage
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0007_chat_session_summary_watermark"
+down_revision = "0006_chat_message_usage"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table("chat_sessions") as batch_op:
+        batch_op.add_column(sa.Column("summary_through_message_id", sa.Integer(), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table("chat_sessions") as batch_op:
+        batch_op.drop_column("summary_through_message_id")
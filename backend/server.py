@@ -7,7 +7,7 @@ import json
 from config import GOOGLE_API_KEY # Used for early check
 from chat_handler import handle_chat_message
 from git_handler import get_git_tree
-from k8s_handler import get_k8s_status
+from k8s_handler import get_k8s_status, get_k8s_status_multi
 from agent_setup import initialize_agent # For initializing agent on startup
 
 # --- Create Flask App ---
@@ -82,10 +82,15 @@ def git_tree_endpoint():
 
 @app.route('/api/k8s/status', methods=['GET'])
 def k8s_status_endpoint():
-    """Provides Kubernetes workload status for a given app ID."""
+    """Provides Kubernetes workload status for a given app ID (or several, via 'appIds=a,b')."""
+    app_ids = [a.strip() for a in request.args.get('appIds', '').split(',') if a.strip()]
+    if app_ids:
+        # Partial results: each app carries its own "error"/"errors", so the response is always 200
+        return jsonify(get_k8s_status_multi(app_ids))
+
     app_id = request.args.get('appId')
     if not app_id:
-        return jsonify({"error": "Missing 'appId' query parameter"}), 400
+        return jsonify({"error": "Missing 'appId' or 'appIds' query parameter"}), 400
 
     status_data = get_k8s_status(app_id)
 
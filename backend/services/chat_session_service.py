@@ -1,6 +1,8 @@
 # devspace/backend/services/chat_session_service.py
 from sqlalchemy.orm import Session
 from sqlalchemy.sql import func
+from sqlalchemy import String, and_, or_, type_coerce
+import base64
 import uuid
 import json
 import datetime # Ensure datetime is imported
@@ -8,6 +10,9 @@ from typing import Union, Optional, List
 
 from database.db_session import SessionLocal
 from database.models import Space, ChatSession, ChatMessage, ChatMessageRoleEnum
+# Per-message usage columns; a message dict may carry them under "usage"
+MESSAGE_USAGE_FIELDS = ("prompt_tokens", "completion_tokens", "cached_tokens", "latency_ms")
+
 # For LangChain history formatting, if you do it here:
 # from langchain_core.messages import HumanMessage, AIMessage, SystemMessage, ToolMessage 
 
@@ -84,6 +89,20 @@ class ChatSessionService:
                 print(f"Error updating last_accessed_at for session {session_id}: {e}")
         return session
 
+    def resolve_active_session_id(self, db: Session, space_id: str, session_id: str = None) -> Optional[str]:
+        """Returns the session to use for a chat turn: 'session_id' if it belongs to the space, else the space's default."""
+        if session_id:
+            # Verify session exists and belongs to space, or refresh its last_accessed_at
+            session_obj = self.get_session_by_id(db, session_id)
+            if session_obj and str(session_obj.space_id) == str(space_id): # Ensure space_id matches if it's string/int
+                return session_obj.id
+            # Session ID provided but invalid or doesn't match space, create/get default
+            print(f"Warning: Provided sessionId '{session_id}' invalid or mismatched for space '{space_id}'. Getting default.")
+
+        # No (valid) session_id from frontend, get or create default for the space
+        default_session = self.get_or_create_default_session(db, space_id)
+        return default_session.id if default_session else None
+
     def add_message_to_session(self, db: Session, session_id: str, role_str: str, content: str, metadata: dict = None) -> Optional[ChatSession]:
         print(f"SERVICE-SESSION: Adding message to session {session_id}. Role: {role_str}")
         session = db.query(ChatSession).filter_by(id=session_id).first()
@@ -115,24 +134,114 @@ class ChatSessionService:
             print(f"SERVICE-SESSION ERROR: Failed to add message: {e}")
             return None
 
+    def add_messages_to_session(self, db: Session, session_id: str, messages: List[dict]) -> Optional[int]:
+        """
+        Bulk-writes several messages (typically one whole chat turn) with a single session lookup,
+        one executemany-style INSERT and one commit. Each item is {"role", "content", "metadata"?, "usage"?};
+        rows keep the list order. Returns the number of rows written, or None on failure.
+        """
+        print(f"SERVICE-SESSION: Adding {len(messages)} messages to session {session_id}")
+        if not messages:
+            return 0
+        session = db.query(ChatSession).filter_by(id=session_id).first()
+        if not session:
+            print(f"SERVICE-SESSION ERROR: Session {session_id} not found.")
+            return None
+
+        rows = []
+        for msg in messages:
+            try:
+                role_enum = ChatMessageRoleEnum(msg["role"].lower())
+            except ValueError:
+                print(f"SERVICE-SESSION ERROR: Invalid message role '{msg['role']}'.")
+                return None
+            rows.append({
+                "session_id": session_id,
+                "role": role_enum,
+                "content": msg.get("content") or "",
+                "metadata_json": json.dumps(msg["metadata"], default=str) if msg.get("metadata") else None,
+                # Every row needs the same keys for executemany
+                **{field: (msg.get("usage") or {}).get(field) for field in MESSAGE_USAGE_FIELDS},
+            })
+
+        session.last_accessed_at = datetime.datetime.now(datetime.timezone.utc)
+        try:
+            db.execute(ChatMessage.__table__.insert(), rows) # List of params -> executemany
+            db.commit()
+            return len(rows)
+        except Exception as e:
+            db.rollback()
+            print(f"SERVICE-SESSION ERROR: Failed to add messages: {e}")
+            return None
+
     def get_messages_for_session(self, db: Session, session_id: str, limit: int = 50, offset: int = 0) -> list[ChatMessage]:
         print(f"SERVICE-SESSION: Getting messages for session {session_id}, limit {limit}, offset {offset}")
         return (
             db.query(ChatMessage)
             .filter_by(session_id=session_id)
-            .order_by(ChatMessage.timestamp.asc()) # Chronological for display
+            .order_by(ChatMessage.timestamp.asc(), ChatMessage.id.asc()) # Chronological; id breaks ties within a bulk-inserted turn
             .offset(offset)
             .limit(limit)
             .all()
         )
 
+    @staticmethod
+    def _encode_message_cursor(raw_timestamp, message_id: int, newest_first: bool) -> str:
+        payload = json.dumps({"ts": str(raw_timestamp), "id": message_id, "desc": newest_first}, separators=(",", ":"))
+        return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii").rstrip("=")
+
+    @staticmethod
+    def _decode_message_cursor(cursor: str) -> dict:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        try:
+            data = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+            return {"ts": str(data["ts"]), "id": int(data["id"]), "desc": bool(data.get("desc", False))}
+        except (ValueError, KeyError, TypeError) as e:
+            raise ValueError(f"Invalid cursor: {e}")
+
+    def get_messages_page(self, db: Session, session_id: str, limit: int = 50, cursor: str = None, newest_first: bool = False):
+        """
+        Keyset (cursor) pagination over a session's messages, ordered by (timestamp, id).
+        Each page is a range scan on ix_chat_messages_session_ts_id, so its cost does not depend
+        on how deep the client has scrolled. Returns (messages, next_cursor); next_cursor is None
+        on the last page. Raises ValueError for a malformed cursor or one issued for the other order.
+        """
+        print(f"SERVICE-SESSION: Getting message page for session {session_id}, limit {limit}, newest_first {newest_first}")
+        # Compare timestamps as the stored value: SQLite keeps DATETIME as text, and re-binding a
+        # parsed datetime would change its format (and break equality on ties).
+        ts_raw = type_coerce(ChatMessage.timestamp, String)
+        query = db.query(ChatMessage, ts_raw).filter(ChatMessage.session_id == session_id)
+
+        if cursor:
+            position = self._decode_message_cursor(cursor)
+            if position["desc"] != newest_first:
+                raise ValueError("Cursor was issued for the opposite sort order.")
+            if newest_first:
+                query = query.filter(or_(ts_raw < position["ts"], and_(ts_raw == position["ts"], ChatMessage.id < position["id"])))
+            else:
+                query = query.filter(or_(ts_raw > position["ts"], and_(ts_raw == position["ts"], ChatMessage.id > position["id"])))
+
+        if newest_first:
+            query = query.order_by(ChatMessage.timestamp.desc(), ChatMessage.id.desc())
+        else:
+            query = query.order_by(ChatMessage.timestamp.asc(), ChatMessage.id.asc())
+
+        rows = query.limit(limit + 1).all() # One extra row tells us whether another page exists
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        next_cursor = None
+        if has_more and rows:
+            last_message, last_ts_raw = rows[-1]
+            next_cursor = self._encode_message_cursor(last_ts_raw, last_message.id, newest_first)
+        return [message for message, _ in rows], next_cursor
+
     def get_langchain_formatted_chat_history(self, db: Session, session_id: str, window_k: int = 10):
         print(f"SERVICE-SESSION: Getting LangChain history for session {session_id}, k={window_k}")
         # Fetch a bit more than k*2 to account for tool messages not being simple user/ai turns
         db_messages = (
             db.query(ChatMessage)
             .filter_by(session_id=session_id)
-            .order_by(ChatMessage.timestamp.desc())
+            .order_by(ChatMessage.timestamp.desc(), ChatMessage.id.desc())
             .limit(window_k * 3) # Fetch more to accommodate tool messages if needed
             .all()
         )
@@ -0,0 +1,191 @@
+# devspace/backend/services/conversation_history_service.py
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, List
+
+from sqlalchemy.orm import Session
+from langchain.memory import ConversationBufferMemory
+
+from config import config as app_config
+from core.token_budget import estimate_message_tokens, estimate_tokens, truncate_to_tokens
+from database.db_session import SessionLocal
+from database.models import ChatSession, ChatMessage, ChatMessageRoleEnum
+from services.chat_session_service import ChatSessionService
+
+# Roles that end up in the agent's chat_history (tool results are not replayed into memory)
+HISTORY_ROLES = (ChatMessageRoleEnum.USER.value, ChatMessageRoleEnum.ASSISTANT.value, ChatMessageRoleEnum.SYSTEM.value)
+_HISTORY_PAGE_SIZE = 50
+
+
+class TokenBudgetChatMemory(ConversationBufferMemory):
+    """
+    ConversationBufferMemory that drops its oldest messages whenever the estimated token count
+    of the buffer exceeds 'max_token_limit'. Unlike ConversationBufferWindowMemory (which counts
+    turns), one huge pasted log cannot push the prompt past the budget.
+    """
+    max_token_limit: int = 6000
+    summary_through_message_id: Optional[int] = None # Summary watermark the buffer was loaded at
+
+    def save_context(self, inputs, outputs) -> None:
+        super().save_context(inputs, outputs)
+        self.prune()
+
+    def prune(self) -> None:
+        buffer = self.chat_memory.messages
+        total = sum(estimate_message_tokens(str(m.content)) for m in buffer)
+        while buffer and total > self.max_token_limit:
+            total -= estimate_message_tokens(str(buffer.pop(0).content))
+
+
+class ConversationHistoryService:
+    """
+    Builds token-budgeted chat history windows and maintains ChatSession.summary as a rolling,
+    incrementally updated summary of everything older than the window.
+    """
+
+    def __init__(self):
+        self.chat_session_service = ChatSessionService()
+        self._summary_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="history-summary")
+        self._sessions_being_summarized = set()
+        self._lock = threading.Lock()
+        print("ConversationHistoryService initialized.")
+
+    def _to_history_entry(self, msg: ChatMessage) -> dict:
+        content = truncate_to_tokens(msg.content or "", app_config.HISTORY_MAX_TOKENS_PER_MESSAGE)
+        return {"id": msg.id, "role": msg.role.value, "content": content,
+                "metadata": json.loads(msg.metadata_json) if msg.metadata_json else None}
+
+    @staticmethod
+    def unfolded_overflow_tokens() -> int:
+        """
+        Room kept past the budget for messages that left it but are not in the summary yet: folding
+        waits for HISTORY_SUMMARY_MIN_FOLD_TOKENS of overflow, and one more turn (a user and an
+        assistant message) can land before a scheduled fold completes.
+        """
+        return app_config.HISTORY_SUMMARY_MIN_FOLD_TOKENS + 2 * app_config.HISTORY_MAX_TOKENS_PER_MESSAGE
+
+    def get_budgeted_history(self, db: Session, session_id: str, max_tokens: int = None,
+                             include_unfolded_overflow: bool = True) -> dict:
+        """
+        Packs the newest history messages into 'max_tokens' (estimated), walking back page by page
+        and stopping at the summary watermark. With 'include_unfolded_overflow', messages past the
+        budget that are not folded yet stay in the window (up to unfolded_overflow_tokens()), so no
+        message is in neither the window nor the summary. Returns {"messages": [...chronological
+        dicts...], "summary": str|None, "summary_through_message_id": int|None, "window_start_id": int|None}.
+        """
+        max_tokens = max_tokens or app_config.HISTORY_MAX_TOKENS
+        if include_unfolded_overflow: # Everything walked below is newer than the watermark, i.e. unfolded
+            max_tokens += self.unfolded_overflow_tokens()
+        session = db.query(ChatSession).filter_by(id=session_id).first()
+        if not session:
+            return {"messages": [], "summary": None, "summary_through_message_id": None, "window_start_id": None}
+        watermark = session.summary_through_message_id or 0
+
+        window, used_tokens, cursor = [], 0, None
+        budget_exhausted = False
+        while not budget_exhausted:
+            page, cursor = self.chat_session_service.get_messages_page(
+                db, session_id, limit=_HISTORY_PAGE_SIZE, cursor=cursor, newest_first=True
+            )
+            for msg in page:
+                if msg.id <= watermark:
+                    budget_exhausted = True
+                    break
+                if msg.role.value not in HISTORY_ROLES:
+                    continue
+                entry = self._to_history_entry(msg)
+                cost = estimate_message_tokens(entry["content"])
+                if used_tokens + cost > max_tokens:
+                    budget_exhausted = True
+                    break
+                window.append(entry)
+                used_tokens += cost
+            if not cursor:
+                break
+        window.reverse() # Back to chronological
+        print(f"SERVICE-HISTORY: Session {session_id}: {len(window)} messages (~{used_tokens} tokens) in window, watermark {watermark}")
+        return {
+            "messages": window,
+            "summary": session.summary,
+            "summary_through_message_id": session.summary_through_message_id,
+            "window_start_id": window[0]["id"] if window else None,
+        }
+
+    def get_summary_state(self, db: Session, session_id: str) -> tuple:
+        """(summary, summary_through_message_id) of a session; (None, None) if it does not exist."""
+        row = db.query(ChatSession.summary, ChatSession.summary_through_message_id).filter(ChatSession.id == session_id).first()
+        return tuple(row) if row else (None, None)
+
+    def _messages_to_fold(self, db: Session, session: ChatSession, window_start_id: Optional[int]) -> List[ChatMessage]:
+        query = db.query(ChatMessage).filter(
+            ChatMessage.session_id == session.id,
+            ChatMessage.id > (session.summary_through_message_id or 0),
+        )
+        if window_start_id is not None:
+            query = query.filter(ChatMessage.id < window_start_id)
+        return (query.order_by(ChatMessage.id.asc())
+                .limit(app_config.HISTORY_SUMMARY_MAX_FOLD_MESSAGES)
+                .all())
+
+    def refresh_summary(self, session_id: str, summarize_fn) -> bool:
+        """
+        Folds messages that fell out of the token budget (and are newer than the watermark) into
+        ChatSession.summary, once they add up to HISTORY_SUMMARY_MIN_FOLD_TOKENS. Until then they
+        stay in the agent's window as unfolded overflow.
+        'summarize_fn(previous_summary, messages)' returns the updated summary text.
+        Returns True if the summary changed.
+        """
+        db = SessionLocal()
+        try:
+            window = self.get_budgeted_history(db, session_id, include_unfolded_overflow=False)
+            session = db.query(ChatSession).filter_by(id=session_id).first()
+            if not session:
+                return False
+            to_fold = self._messages_to_fold(db, session, window["window_start_id"])
+            if not to_fold:
+                return False
+            overflow_tokens = sum(estimate_message_tokens(m.content or "") for m in to_fold)
+            if overflow_tokens < app_config.HISTORY_SUMMARY_MIN_FOLD_TOKENS and len(to_fold) < app_config.HISTORY_SUMMARY_MAX_FOLD_MESSAGES:
+                return False
+
+            entries = [self._to_history_entry(m) for m in to_fold]
+            new_summary = summarize_fn(session.summary, entries) or session.summary
+            session.summary = truncate_to_tokens(new_summary, app_config.HISTORY_SUMMARY_MAX_TOKENS)
+            session.summary_through_message_id = to_fold[-1].id
+            db.commit()
+            print(f"SERVICE-HISTORY: Folded {len(to_fold)} messages (~{overflow_tokens} tokens) into summary of session {session_id}")
+            return True
+        except Exception as e:
+            db.rollback()
+            print(f"SERVICE-HISTORY ERROR: Failed to refresh summary for session {session_id}: {e}")
+            return False
+        finally:
+            db.close()
+
+    def schedule_summary_refresh(self, session_id: str, summarize_fn):
+        """Runs refresh_summary off the request path; at most one refresh per session at a time."""
+        with self._lock:
+            if session_id in self._sessions_being_summarized:
+                return
+            self._sessions_being_summarized.add(session_id)
+
+        def run():
+            try:
+                self.refresh_summary(session_id, summarize_fn)
+            finally:
+                with self._lock:
+                    self._sessions_being_summarized.discard(session_id)
+
+        self._summary_executor.submit(run)
+
+    @staticmethod
+    def extractive_summary(previous_summary: Optional[str], messages: List[dict]) -> str:
+        """LLM-free fallback: appends a clipped line per folded message; the caller trims the result."""
+        lines = [previous_summary] if previous_summary else []
+        for msg in messages:
+            lines.append(f"- {msg['role']}: {truncate_to_tokens(msg['content'], 50)}")
+        text = "\n".join(lines)
+        # Keep the newest part if it grows past the summary budget
+        max_chars = int(app_config.HISTORY_SUMMARY_MAX_TOKENS * app_config.HISTORY_CHARS_PER_TOKEN)
+        return text[-max_chars:] if estimate_tokens(text) > app_config.HISTORY_SUMMARY_MAX_TOKENS else text
@@ -0,0 +1,300 @@
+# devspace/backend/services/git_blob_reader.py
+import os
+import threading
+import subprocess
+import tempfile
+from typing import Optional
+
+from config import config as app_config
+from core.ttl_lru_cache import TTLLRUCache
+from services.git_mirror_store import git_mirror_store, GIT_WORK_BASE_DIR
+
+_READ_CHUNK_BYTES = 64 * 1024
+
+
+class CatFileProcessClosed(Exception):
+    """Raised by a GitCatFileProcess used after close(); get a fresh one from the reader instead."""
+
+
+class GitCatFileProcess:
+    """
+    A long-lived 'git cat-file --batch' (or '--batch-check') process for one repository, so repeated
+    object lookups cost a pipe round trip instead of a process spawn. Requests are serialized by a
+    lock; the process is restarted transparently if it dies, but never after close() (eviction), so
+    a caller still holding a closed instance cannot leave an untracked process behind.
+    """
+
+    def __init__(self, git_dir: str, batch_mode: str = "--batch"):
+        self.git_dir = git_dir
+        self.batch_mode = batch_mode
+        self._lock = threading.Lock()
+        self._process = None
+        self._closed = False
+
+    def _ensure_started(self):
+        if self._closed:
+            raise CatFileProcessClosed(self.git_dir)
+        if self._process is None or self._process.poll() is not None:
+            self._process = subprocess.Popen(
+                ["git", "--git-dir", self.git_dir, "cat-file", self.batch_mode],
+                stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+            )
+
+    def _read_header(self, object_name: str):
+        self._process.stdin.write(object_name.encode("utf-8") + b"\n")
+        self._process.stdin.flush()
+        header = self._process.stdout.readline()
+        if not header:
+            raise BrokenPipeError("git cat-file exited")
+        parts = header.decode("utf-8", errors="replace").split()
+        if len(parts) != 3: # "<name> missing" / "<name> ambiguous"
+            return None
+        return parts[0], parts[1], int(parts[2])
+
+    def info(self, object_name: str):
+        """(sha, type, size) for an object name such as '<commit>:<path>' or 'refs/heads/main', or None."""
+        with self._lock:
+            for attempt in (1, 2):
+                try:
+                    self._ensure_started()
+                    header = self._read_header(object_name)
+                    if header and self.batch_mode == "--batch":
+                        self._skip(header[2] + 1) # Contents + trailing newline
+                    return header
+                except (BrokenPipeError, OSError, ValueError):
+                    self._kill()
+                    if attempt == 2:
+                        raise
+
+    def read(self, object_name: str, start: int = 0, length: int = None):
+        """
+        Returns ((sha, type, size), bytes) for the object, keeping only 'length' bytes from 'start'
+        (the rest is streamed past, so huge blobs never sit in memory). None if missing.
+        """
+        with self._lock:
+            for attempt in (1, 2):
+                try:
+                    self._ensure_started()
+                    header = self._read_header(object_name)
+                    if header is None:
+                        return None
+                    size = header[2]
+                    end = size if length is None else min(size, start + length)
+                    start = min(start, size)
+                    self._skip(start)
+                    data = self._read_exact(end - start)
+                    self._skip(size - end + 1) # Remainder + trailing newline
+                    return header, data
+                except (BrokenPipeError, OSError, ValueError):
+                    self._kill()
+                    if attempt == 2:
+                        raise
+
+    def _read_exact(self, count: int) -> bytes:
+        chunks = []
+        while count > 0:
+            chunk = self._process.stdout.read(min(count, _READ_CHUNK_BYTES))
+            if not chunk:
+                raise BrokenPipeError("git cat-file exited mid-object")
+            chunks.append(chunk)
+            count -= len(chunk)
+        return b"".join(chunks)
+
+    def _skip(self, count: int):
+        while count > 0:
+            chunk = self._process.stdout.read(min(count, _READ_CHUNK_BYTES))
+            if not chunk:
+                raise BrokenPipeError("git cat-file exited mid-object")
+            count -= len(chunk)
+
+    def _kill(self):
+        if self._process is not None:
+            try:
+                self._process.kill()
+                self._process.wait(timeout=5)
+            except Exception:
+                pass
+            self._process = None
+
+    def close(self):
+        with self._lock:
+            self._closed = True
+            if self._process is not None and self._process.poll() is None:
+                try:
+                    self._process.stdin.close()
+                    self._process.wait(timeout=5)
+                except Exception:
+                    self._kill()
+            self._process = None
+
+
+class GitBlobReader:
+    """
+    Reads blobs from bare mirrors through per-repo cat-file processes, with a content-addressed
+    (blob SHA keyed) cache in memory and on disk. Blob contents never change for a SHA, so cache
+    entries are never invalidated, only evicted.
+    """
+
+    def __init__(self, disk_cache_dir: str, memory_cache_bytes: int, disk_cache_bytes: int,
+                 max_cached_blob_bytes: int, max_processes: int = 16, process_idle_ttl_seconds: float = 600):
+        self.disk_cache_dir = disk_cache_dir
+        self.disk_cache_bytes = disk_cache_bytes
+        self.max_cached_blob_bytes = max_cached_blob_bytes
+        os.makedirs(self.disk_cache_dir, exist_ok=True)
+        self.processes = TTLLRUCache(
+            "git_cat_file_processes", max_entries=max_processes, idle_ttl_seconds=process_idle_ttl_seconds,
+            on_evict=lambda _key, procs, _reason: [proc.close() for proc in procs.values()],
+        )
+        self.blob_cache = TTLLRUCache("git_blobs", max_entries=100000, max_weight=memory_cache_bytes, weigher=len)
+        # (commit SHA, path) -> (blob SHA, type, size); immutable, so safe to keep until evicted
+        self.path_cache = TTLLRUCache("git_blob_paths", max_entries=50000)
+        self._disk_lock = threading.Lock()
+        self._disk_writes_since_sweep = 0
+        print(f"GitBlobReader initialized (disk cache at {self.disk_cache_dir}).")
+
+    def _processes_for(self, mirror_path: str) -> dict:
+        return self.processes.get_or_create(mirror_path, lambda: {
+            "check": GitCatFileProcess(mirror_path, "--batch-check"),
+            "batch": GitCatFileProcess(mirror_path, "--batch"),
+        })
+
+    def _call(self, mirror_path: str, kind: str, method: str, *args, **kwargs):
+        """Runs 'method' on the repo's 'check' or 'batch' process, moving to a fresh one if it was evicted meanwhile."""
+        for attempt in (1, 2, 3):
+            process = self._processes_for(mirror_path)[kind]
+            try:
+                return getattr(process, method)(*args, **kwargs)
+            except CatFileProcessClosed:
+                if attempt == 3:
+                    raise
+
+    def close_repo(self, mirror_path: str):
+        """Stops the cat-file processes of a mirror (e.g. before it is deleted)."""
+        self.processes.pop(mirror_path)
+
+    def resolve(self, mirror_path: str, object_name: str):
+        """(sha, type, size) via the repo's --batch-check process, or None if the object does not exist."""
+        return self._call(mirror_path, "check", "info", object_name)
+
+    # --- disk cache ---
+    def _disk_path(self, blob_sha: str) -> str:
+        return os.path.join(self.disk_cache_dir, blob_sha[:2], blob_sha)
+
+    def _read_from_disk(self, blob_sha: str) -> Optional[bytes]:
+        path = self._disk_path(blob_sha)
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+            os.utime(path, None) # mtime doubles as the LRU timestamp
+            return data
+        except OSError:
+            return None
+
+    def _write_to_disk(self, blob_sha: str, data: bytes):
+        path = self._disk_path(blob_sha)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".tmp_")
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path) # Atomic: readers see the whole blob or nothing
+        except OSError as e:
+            print(f"SERVICE-GIT-BLOB WARN: Could not write blob {blob_sha} to disk cache: {e}")
+            return
+        with self._disk_lock:
+            self._disk_writes_since_sweep += 1
+            if self._disk_writes_since_sweep < 100:
+                return
+            self._disk_writes_since_sweep = 0
+        self.enforce_disk_quota()
+
+    def enforce_disk_quota(self) -> int:
+        """Deletes least recently read blobs until the disk cache is under its quota. Returns count deleted."""
+        entries, total = [], 0
+        for root, _dirs, files in os.walk(self.disk_cache_dir):
+            for name in files:
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+                total += stat.st_size
+        deleted = 0
+        for _mtime, size, path in sorted(entries):
+            if total <= self.disk_cache_bytes:
+                break
+            try:
+                os.remove(path)
+                total -= size
+                deleted += 1
+            except OSError:
+                pass
+        if deleted:
+            print(f"SERVICE-GIT-BLOB: Evicted {deleted} blobs from disk cache")
+        return deleted
+
+    # --- reads ---
+    def read_blob(self, mirror_path: str, commit_sha: str, file_path: str, byte_offset: int = 0, max_bytes: int = None) -> dict:
+        """
+        Returns {"success", "blob_sha", "size", "data", "byte_offset", "truncated"} for 'file_path' at
+        'commit_sha'. Blobs up to max_cached_blob_bytes are cached whole (memory, then disk) and sliced;
+        larger ones are streamed and only the requested window is kept.
+        """
+        path_key = (commit_sha, file_path)
+        info = self.path_cache.get(path_key)
+        if info is None:
+            info = self.resolve(mirror_path, f"{commit_sha}:{file_path}")
+            if info is None:
+                return {"success": False, "error": f"File '{file_path}' not found.", "not_found": True}
+            self.path_cache.put(path_key, info)
+        blob_sha, object_type, size = info
+        if object_type != "blob":
+            return {"success": False, "error": f"'{file_path}' is a {'directory' if object_type == 'tree' else object_type}, not a file."}
+
+        byte_offset = max(0, min(byte_offset or 0, size))
+        window_end = size if max_bytes is None else min(size, byte_offset + max_bytes)
+        if size <= self.max_cached_blob_bytes:
+            data = self.blob_cache.get(blob_sha)
+            if data is None:
+                data = self._read_from_disk(blob_sha)
+                if data is None:
+                    result = self._call(mirror_path, "batch", "read", blob_sha)
+                    if result is None:
+                        return {"success": False, "error": f"Blob {blob_sha} missing from mirror."}
+                    data = result[1]
+                    self._write_to_disk(blob_sha, data)
+                self.blob_cache.put(blob_sha, data)
+            window = data[byte_offset:window_end]
+        else:
+            result = self._call(mirror_path, "batch", "read", blob_sha, start=byte_offset, length=window_end - byte_offset)
+            if result is None:
+                return {"success": False, "error": f"Blob {blob_sha} missing from mirror."}
+            window = result[1]
+        return {
+            "success": True,
+            "blob_sha": blob_sha,
+            "size": size,
+            "data": window,
+            "byte_offset": byte_offset,
+            "truncated": byte_offset > 0 or window_end < size,
+        }
+
+    def stats(self) -> dict:
+        return {
+            "blobs": self.blob_cache.stats(),
+            "paths": self.path_cache.stats(),
+            "processes": self.processes.stats(),
+        }
+
+
+# One reader per process: its cat-file processes and blob cache serve every GitService, and the
+# shared mirror store stops a mirror's processes before deleting it
+git_blob_reader = GitBlobReader(
+    os.path.join(GIT_WORK_BASE_DIR, "blob_cache"),
+    memory_cache_bytes=app_config.GIT_BLOB_MEMORY_CACHE_MB * 1024 * 1024,
+    disk_cache_bytes=app_config.GIT_BLOB_DISK_CACHE_MB * 1024 * 1024,
+    max_cached_blob_bytes=int(app_config.GIT_BLOB_CACHE_MAX_BLOB_MB * 1024 * 1024),
+    max_processes=app_config.GIT_CAT_FILE_MAX_PROCESSES,
+)
+git_mirror_store.on_mirror_evicted = git_blob_reader.close_repo
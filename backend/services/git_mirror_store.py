@@ -0,0 +1,210 @@
+# devspace/backend/services/git_mirror_store.py
+import os
+import re
+import time
+import shutil
+import hashlib
+import tempfile
+import threading
+import subprocess
+from typing import Optional
+
+from config import config as app_config
+
+LAST_USED_MARKER = "devspace_last_used" # Touched on every use; its mtime drives LRU eviction across restarts
+GIT_WORK_BASE_DIR = os.path.join(tempfile.gettempdir(), "devspace_git_clones") # Mirrors and blob cache
+
+
+class GitMirrorStore:
+    """
+    One bare mirror ('git clone --mirror') per repository URL under 'base_dir', kept current with
+    incremental 'git fetch --prune'. Operations on a mirror are serialized by a per-repo lock;
+    when the store grows past 'max_disk_bytes' the least recently used idle mirrors are deleted.
+    """
+
+    def __init__(self, base_dir: str, max_disk_bytes: int, fetch_interval_seconds: float, clone_timeout: int = 600):
+        self.base_dir = base_dir
+        self.max_disk_bytes = max_disk_bytes
+        self.fetch_interval_seconds = fetch_interval_seconds
+        self.clone_timeout = clone_timeout
+        os.makedirs(self.base_dir, exist_ok=True)
+        self._locks = {} # mirror path -> RLock
+        self._locks_guard = threading.Lock()
+        self._last_fetch = {} # mirror path -> monotonic time of last successful clone/fetch
+        self._sizes = {} # mirror path -> bytes on disk (measured after clone/fetch)
+        self._state_lock = threading.Lock() # Guards _last_fetch and _sizes (written under different repo locks)
+        self._quota_lock = threading.Lock() # One quota pass at a time
+        self.on_mirror_evicted = None # Optional callback(mirror_path), e.g. to stop processes reading the mirror
+        print(f"GitMirrorStore initialized at {self.base_dir} (quota {self.max_disk_bytes // (1024 * 1024)} MB).")
+
+    # --- paths & locks ---
+    def mirror_path(self, git_repo_url: str) -> str:
+        repo_name = git_repo_url.rstrip("/").split("/")[-1].replace(".git", "") or "repo"
+        repo_name = re.sub(r"[^A-Za-z0-9._-]", "_", repo_name)[:40]
+        url_hash = hashlib.sha1(git_repo_url.encode("utf-8")).hexdigest()[:16]
+        return os.path.join(self.base_dir, f"{repo_name}_{url_hash}.git")
+
+    def has_mirror(self, git_repo_url: str) -> bool:
+        return os.path.exists(os.path.join(self.mirror_path(git_repo_url), "HEAD"))
+
+    def repo_lock(self, mirror_path: str) -> threading.RLock:
+        with self._locks_guard:
+            lock = self._locks.get(mirror_path)
+            if lock is None:
+                lock = self._locks[mirror_path] = threading.RLock()
+            return lock
+
+    def _touch(self, mirror_path: str):
+        marker = os.path.join(mirror_path, LAST_USED_MARKER)
+        try:
+            with open(marker, "a"):
+                pass
+            os.utime(marker, None)
+        except OSError as e:
+            print(f"SERVICE-GIT-MIRROR WARN: Could not touch {marker}: {e}")
+
+    def _last_used(self, mirror_path: str) -> float:
+        try:
+            return os.path.getmtime(os.path.join(mirror_path, LAST_USED_MARKER))
+        except OSError:
+            return 0.0
+
+    # --- git ---
+    def run_git(self, args: list, git_dir: str = None, timeout: int = 60, text: bool = True) -> dict:
+        """Runs git (against 'git_dir' if given). Same result shape as GitService._run_git_command."""
+        command_parts = ["git"] + (["--git-dir", git_dir] if git_dir else []) + args
+        try:
+            print(f"SERVICE-GIT-MIRROR: Executing command: {' '.join(command_parts)}")
+            process = subprocess.run(command_parts, check=True, capture_output=True, timeout=timeout,
+                                     env={**os.environ, "GIT_TERMINAL_PROMPT": "0"})
+            stdout = process.stdout.decode("utf-8", errors="replace").strip() if text else process.stdout
+            return {"success": True, "stdout": stdout, "stderr": process.stderr.decode("utf-8", errors="replace").strip()}
+        except subprocess.CalledProcessError as e:
+            stderr = e.stderr.decode("utf-8", errors="replace").strip()
+            error_msg = f"Git command failed: {stderr}"
+            print(f"SERVICE-GIT-MIRROR ERROR: {error_msg}")
+            return {"success": False, "error": error_msg, "details": stderr}
+        except subprocess.TimeoutExpired:
+            error_msg = "Git command timed out."
+            print(f"SERVICE-GIT-MIRROR ERROR: {error_msg}")
+            return {"success": False, "error": error_msg}
+        except Exception as e:
+            error_msg = f"Unexpected error running git command: {str(e)}"
+            print(f"SERVICE-GIT-MIRROR ERROR: {error_msg}")
+            return {"success": False, "error": error_msg}
+
+    # --- mirror lifecycle ---
+    def ensure_mirror(self, git_repo_url: str, force_fetch: bool = False) -> dict:
+        """
+        Returns {"success": True, "path": <bare mirror dir>, "fetched": bool}. Clones the mirror on
+        first use; otherwise fetches when 'force_fetch' is set or the last fetch is older than
+        fetch_interval_seconds. If a background-style (non-forced) fetch fails, the existing mirror
+        is served as-is and "stale" is set.
+        """
+        if not git_repo_url:
+            return {"success": False, "error": "Repository URL is required."}
+        mirror_path = self.mirror_path(git_repo_url)
+        with self.repo_lock(mirror_path):
+            fetched, stale = False, False
+            if not os.path.exists(os.path.join(mirror_path, "HEAD")):
+                result = self._clone_mirror(git_repo_url, mirror_path)
+                if not result["success"]:
+                    return result
+                fetched = True
+            else:
+                with self._state_lock:
+                    last_fetch = self._last_fetch.get(mirror_path)
+                if force_fetch or last_fetch is None or time.monotonic() - last_fetch > self.fetch_interval_seconds:
+                    result = self.run_git(["fetch", "--prune", "--quiet", "origin"], git_dir=mirror_path, timeout=self.clone_timeout)
+                    if result["success"]:
+                        fetched = True
+                    elif force_fetch:
+                        return result
+                    else:
+                        stale = True
+                        print(f"SERVICE-GIT-MIRROR WARN: Fetch failed, serving existing mirror for {git_repo_url}")
+            if fetched:
+                size = self._dir_size(mirror_path)
+                with self._state_lock:
+                    self._last_fetch[mirror_path] = time.monotonic()
+                    self._sizes[mirror_path] = size
+            self._touch(mirror_path)
+        if fetched: # Disk usage only grows on clone/fetch
+            self.enforce_quota(keep=mirror_path)
+        return {"success": True, "path": mirror_path, "fetched": fetched, "stale": stale}
+
+    def _clone_mirror(self, git_repo_url: str, mirror_path: str) -> dict:
+        # Clone next to the final location and rename, so a half-finished clone is never picked up
+        tmp_path = tempfile.mkdtemp(prefix=".cloning_", dir=self.base_dir)
+        try:
+            result = self.run_git(["clone", "--mirror", "--quiet", "--", git_repo_url, tmp_path], timeout=self.clone_timeout)
+            if not result["success"]:
+                return result
+            shutil.rmtree(mirror_path, ignore_errors=True)
+            os.rename(tmp_path, mirror_path)
+            print(f"SERVICE-GIT-MIRROR: Created mirror {mirror_path} for {git_repo_url}")
+            return {"success": True}
+        finally:
+            if os.path.exists(tmp_path):
+                shutil.rmtree(tmp_path, ignore_errors=True)
+
+    def _dir_size(self, path: str) -> int:
+        total = 0
+        for root, _dirs, files in os.walk(path):
+            for name in files:
+                try:
+                    total += os.path.getsize(os.path.join(root, name))
+                except OSError:
+                    pass
+        return total
+
+    def enforce_quota(self, keep: str = None) -> int:
+        """Deletes least recently used mirrors (never 'keep' or one currently locked) until under quota. Returns count deleted."""
+        with self._quota_lock:
+            mirrors = [os.path.join(self.base_dir, name) for name in os.listdir(self.base_dir) if name.endswith(".git")]
+            with self._state_lock:
+                unmeasured = [path for path in mirrors if path not in self._sizes]
+            measured = {path: self._dir_size(path) for path in unmeasured} # Walk the disk outside the lock
+            with self._state_lock:
+                for path, size in measured.items():
+                    self._sizes.setdefault(path, size)
+                total = sum(self._sizes.get(path, 0) for path in mirrors)
+            evicted = 0
+            for path in sorted(mirrors, key=self._last_used):
+                if total <= self.max_disk_bytes:
+                    break
+                if path == keep:
+                    continue
+                lock = self.repo_lock(path)
+                if not lock.acquire(blocking=False):
+                    continue # In use; try the next one
+                try:
+                    if self.on_mirror_evicted:
+                        self.on_mirror_evicted(path)
+                    shutil.rmtree(path, ignore_errors=True)
+                    with self._state_lock:
+                        total -= self._sizes.pop(path, 0)
+                        self._last_fetch.pop(path, None)
+                    evicted += 1
+                    print(f"SERVICE-GIT-MIRROR: Evicted mirror {path} (disk quota)")
+                finally:
+                    lock.release()
+            return evicted
+
+    def resolve_commit(self, mirror_path: str, ref: str) -> Optional[str]:
+        """Commit SHA of a branch name or other ref inside the mirror, or None."""
+        for candidate in (f"refs/heads/{ref}", ref):
+            result = self.run_git(["rev-parse", "--verify", "--quiet", f"{candidate}^{{commit}}"], git_dir=mirror_path)
+            if result["success"] and result["stdout"]:
+                return result["stdout"]
+        return None
+
+
+# Shared by every GitService (API and agent tools), so per-repo locks, fetch throttling and the
+# disk quota cover all users of a mirror
+git_mirror_store = GitMirrorStore(
+    os.path.join(GIT_WORK_BASE_DIR, "mirrors"),
+    max_disk_bytes=app_config.GIT_MIRROR_MAX_DISK_MB * 1024 * 1024,
+    fetch_interval_seconds=app_config.GIT_MIRROR_FETCH_INTERVAL_SECONDS,
+    clone_timeout=app_config.GIT_MIRROR_CLONE_TIMEOUT_SECONDS,
+)
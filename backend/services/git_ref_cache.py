@@ -0,0 +1,118 @@
+# devspace/backend/services/git_ref_cache.py
+import os
+import time
+import threading
+import subprocess
+from concurrent.futures import Future
+
+from config import config as app_config
+from core.ttl_lru_cache import TTLLRUCache
+
+
+class GitRefCache:
+    """
+    Shared cache of remote refs ('git ls-remote --symref <url>': branches, tags and their SHAs, plus
+    the remote's default branch). Results are reused for 'ttl_seconds' (failures for a shorter
+    'error_ttl_seconds'), and concurrent lookups of the same URL share a single ls-remote process.
+    """
+
+    def __init__(self, ttl_seconds: float, error_ttl_seconds: float, max_entries: int = 256, timeout: int = 30):
+        self.ttl_seconds = ttl_seconds
+        self.error_ttl_seconds = error_ttl_seconds
+        self.timeout = timeout
+        self._results = TTLLRUCache("git_remote_refs", max_entries=max_entries) # url -> (monotonic fetched_at, result)
+        self._in_flight = {} # url -> Future of the running ls-remote
+        self._lock = threading.Lock()
+        self._stats = {"ls_remote_calls": 0, "coalesced": 0}
+
+    def _run_ls_remote(self, git_repo_url: str) -> dict:
+        command_parts = ["git", "ls-remote", "--symref", "--", git_repo_url, "HEAD", "refs/heads/*", "refs/tags/*"]
+        print(f"SERVICE-GIT-REFS: Executing command: {' '.join(command_parts)}")
+        try:
+            process = subprocess.run(command_parts, check=True, capture_output=True, text=True, timeout=self.timeout,
+                                     env={**os.environ, "GIT_TERMINAL_PROMPT": "0"})
+        except subprocess.CalledProcessError as e:
+            stderr = (e.stderr or "").strip()
+            print(f"SERVICE-GIT-REFS ERROR: 'git ls-remote' failed for {git_repo_url}: {stderr}")
+            if "not found" in stderr.lower() or "does not appear to be a git repository" in stderr.lower():
+                return {"success": False, "error": f"Repository not found or access denied: {git_repo_url}", "details": stderr}
+            return {"success": False, "error": f"Git command failed: {stderr}", "details": stderr}
+        except subprocess.TimeoutExpired:
+            print(f"SERVICE-GIT-REFS ERROR: 'git ls-remote' timed out for {git_repo_url}")
+            return {"success": False, "error": "Git command timed out."}
+        except Exception as e:
+            print(f"SERVICE-GIT-REFS ERROR: Unexpected error listing refs of {git_repo_url}: {e}")
+            return {"success": False, "error": f"Unexpected error running git command: {str(e)}"}
+        return self._parse_ls_remote(process.stdout)
+
+    def _parse_ls_remote(self, output: str) -> dict:
+        branches, tags, default_branch = {}, {}, None
+        for line in output.splitlines():
+            if line.startswith("ref: "): # "ref: refs/heads/main\tHEAD"
+                target, _, name = line[5:].partition("\t")
+                if name == "HEAD" and target.startswith("refs/heads/"):
+                    default_branch = target[len("refs/heads/"):]
+                continue
+            sha, _, ref = line.partition("\t")
+            if ref.startswith("refs/heads/"):
+                branches[ref[len("refs/heads/"):]] = sha
+            elif ref.startswith("refs/tags/"):
+                name = ref[len("refs/tags/"):]
+                if name.endswith("^{}"):
+                    tags[name[:-3]] = sha # Peeled annotated tag: the commit it points at wins
+                else:
+                    tags.setdefault(name, sha)
+        return {"success": True, "branches": branches, "tags": tags, "default_branch": default_branch}
+
+    def get_refs(self, git_repo_url: str, force_refresh: bool = False) -> dict:
+        """
+        Returns {"success", "branches": {name: sha}, "tags": {name: sha}, "default_branch"} or
+        {"success": False, "error", ...}. 'force_refresh' bypasses the cached result (but still
+        joins an ls-remote that is already running for the URL).
+        """
+        if not git_repo_url:
+            return {"success": False, "error": "Repository URL is required."}
+        if not force_refresh:
+            cached = self._results.get(git_repo_url)
+            if cached:
+                fetched_at, result = cached
+                ttl = self.ttl_seconds if result["success"] else self.error_ttl_seconds
+                if time.monotonic() - fetched_at <= ttl:
+                    return result
+
+        with self._lock:
+            future = self._in_flight.get(git_repo_url)
+            is_leader = future is None
+            if is_leader:
+                future = self._in_flight[git_repo_url] = Future()
+                self._stats["ls_remote_calls"] += 1
+            else:
+                self._stats["coalesced"] += 1
+        if not is_leader:
+            return future.result()
+
+        try:
+            result = self._run_ls_remote(git_repo_url)
+            self._results.put(git_repo_url, (time.monotonic(), result))
+            future.set_result(result)
+            return result
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._in_flight.pop(git_repo_url, None)
+
+    def invalidate(self, git_repo_url: str):
+        self._results.pop(git_repo_url)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {**self._stats, "results": self._results.stats()}
+
+
+# Shared by GitService (branch listing, tree freshness checks) and SpaceService (URL validation)
+git_ref_cache = GitRefCache(
+    ttl_seconds=app_config.GIT_REF_CACHE_TTL_SECONDS,
+    error_ttl_seconds=app_config.GIT_REF_CACHE_ERROR_TTL_SECONDS,
+)
@@ -2,24 +2,41 @@
 import os
 import subprocess
 import shlex
-import tempfile
-import shutil
 import json # For loading/dumping JSON cache
 import datetime # For timestamping cache
+import copy
 
 # Assuming SpaceService is available, e.g., via dependency injection or global instance
 from .space_service import SpaceService # Adjust import if needed
 # from database.models import DevSpaceConfig # Not directly used here, SpaceService handles DB
-from database.db_session import SessionLocal # For direct DB operations if needed for cache update
-from database.models import DevSpaceConfig, Space, SpaceTypeEnum # Add others if directly used
+from database.db_session import get_db_session, release_db_connection # Request/turn-scoped when called from a chat turn
+from database.models import DevSpaceConfig, GitTreeCache, Space, SpaceTypeEnum # Add others if directly used
 from typing import Union, Optional, List # Add List if you use list[Plugin]
+from config import config as app_config
+from .git_mirror_store import GitMirrorStore, git_mirror_store, GIT_WORK_BASE_DIR
+from .git_blob_reader import GitBlobReader, git_blob_reader
+from .git_ref_cache import git_ref_cache
+from core.ttl_lru_cache import TTLLRUCache
 
 space_service_instance = SpaceService() # Simple instantiation for now
+_LS_TREE_PATHS_PER_CALL = 200 # Folder paths per level-by-level 'ls-tree' call
+
+
+def _dev_config_snapshot(space_id: str):
+    """Cached DevConfigSnapshot (git_repo_url, dev_config_id, ...) of a space, or None."""
+    snapshot = space_service_instance.get_config_snapshot(space_id)
+    return snapshot.dev if snapshot else None
 
 class GitService:
-    def __init__(self):
-        self.temp_clone_dir_base = os.path.join(tempfile.gettempdir(), "devspace_git_clones")
+    def __init__(self, mirror_store: GitMirrorStore = None, blob_reader: GitBlobReader = None):
+        self.temp_clone_dir_base = GIT_WORK_BASE_DIR
         os.makedirs(self.temp_clone_dir_base, exist_ok=True)
+        # Persistent bare mirrors replace clone-per-request. The store is process-wide.
+        self.mirror_store = mirror_store or git_mirror_store
+        # Shared cat-file processes and blob cache, wired to the shared store's eviction hook
+        self.blob_reader = blob_reader or git_blob_reader
+        # Subtree listings keyed by (mirror, commit SHA, path, depth)
+        self.subtree_cache = TTLLRUCache("git_subtrees", max_entries=app_config.GIT_SUBTREE_CACHE_MAX_ENTRIES)
         print("GitService initialized.")
 
     def _run_git_command(self, command_parts, cwd=None, timeout=60):
@@ -42,101 +59,366 @@ class GitService:
             return {"success": False, "error": error_msg}
 
 
-    def list_branches(self, git_repo_url: str):
-        # ... (same as before, ensure it returns {"success": True/False, "branches": [], "error": "..."})
+    def list_branches(self, git_repo_url: str, force_refresh: bool = False):
+        """
+        Returns {"success": True, "branches": [...], "tags": [...], "default_branch", "branch_shas": {...}}.
+        Served from the shared ls-remote ref cache, so repeated calls within GIT_REF_CACHE_TTL_SECONDS
+        (and concurrent calls for the same URL) cost at most one 'git ls-remote'.
+        """
         print(f"SERVICE-GIT: list_branches for repo_url: {git_repo_url}")
         if not git_repo_url: return {"success": False, "error": "Repository URL is required."}
-        command_parts = ["git", "ls-remote", "--heads", shlex.quote(git_repo_url)]
-        result = self._run_git_command(command_parts)
-        if not result["success"]: return result
-        branches = []
-        for line in result["stdout"].splitlines():
-            if line and "\trefs/heads/" in line:
-                branches.append(line.split("\trefs/heads/")[1])
-        if not branches and "not found" in result.get("stderr", "").lower():
-            return {"success": False, "error": f"Repository not found or access denied: {git_repo_url}"}
-        return {"success": True, "branches": sorted(list(set(branches)))}
-
-
-    def _fetch_tree_from_git(self, git_repo_url: str, branch: str, temp_repo_path: str):
-        # Extracted actual Git fetching logic
-        clone_command = ["git", "clone", "--depth", "1", "--branch", shlex.quote(branch), shlex.quote(git_repo_url), temp_repo_path]
-        clone_result = self._run_git_command(clone_command, timeout=120)
-        if not clone_result["success"]:
-            return clone_result
-
-        tree_data = []
-        # ... (os.walk logic to build tree_data - same as before) ...
-        for root, dirs, files in os.walk(temp_repo_path):
-            if ".git" in dirs: dirs.remove(".git")
-            relative_root = os.path.relpath(root, temp_repo_path);
-            if relative_root == ".": relative_root = ""
-            current_level_nodes = []
-            for name in sorted(dirs): current_level_nodes.append({"id": os.path.join(relative_root, name).replace("\\", "/"), "name": name, "type": "folder", "children": []})
-            for name in sorted(files): current_level_nodes.append({"id": os.path.join(relative_root, name).replace("\\", "/"), "name": name, "type": "file"})
-            if not relative_root: tree_data.extend(current_level_nodes)
+        if not SpaceService.is_supported_git_url(git_repo_url):
+            return {"success": False, "error": "Invalid repository URL: use an https://, ssh:// or git@ URL."}
+        refs = git_ref_cache.get_refs(git_repo_url, force_refresh=force_refresh)
+        if not refs["success"]: return refs
+        return {
+            "success": True,
+            "branches": sorted(refs["branches"]),
+            "tags": sorted(refs["tags"]),
+            "default_branch": refs["default_branch"],
+            "branch_shas": refs["branches"],
+        }
+
+
+    def _parse_ls_tree(self, raw_output: bytes):
+        """
+        Yields (mode, object_type, object_sha, size, path) from 'git ls-tree -z --long' output.
+        Size is None for trees and submodules ("-").
+        """
+        for record in raw_output.split(b"\0"):
+            if not record:
+                continue
+            meta, _, path = record.partition(b"\t")
+            mode, object_type, object_sha, size = meta.decode("ascii").split(None, 3)
+            yield mode, object_type, object_sha, (None if size.strip() == "-" else int(size)), path.decode("utf-8", errors="replace")
+
+    def _build_tree_from_ls_tree(self, raw_output: bytes, base_path: str = "", max_depth: int = None) -> list:
+        """
+        One pass over 'git ls-tree -r -t -z --long' output into the nested folder/file node structure
+        the frontend renders. Parents are found through a path->node dict, never by scanning siblings.
+        'base_path' prefixes node ids when the listing was taken from a subtree ('<sha>:<path>').
+        With 'max_depth', deeper entries are skipped and folders on the last level are returned with
+        empty children and "children_loaded": False, to be expanded with another subtree call.
+        """
+        root_children = []
+        folders = {"": {"children": root_children}} # relative path -> folder node
+        id_prefix = f"{base_path}/" if base_path else ""
+
+        def get_folder(path: str) -> dict:
+            node = folders.get(path)
+            if node is None: # Implicit parent (only if git did not list the tree entry itself)
+                parent_path, _, name = path.rpartition("/")
+                node = {"id": id_prefix + path, "name": name, "type": "folder", "children": []}
+                get_folder(parent_path)["children"].append(node)
+                folders[path] = node
+            return node
+
+        for mode, object_type, object_sha, size, path in self._parse_ls_tree(raw_output):
+            level = path.count("/") + 1
+            if max_depth is not None and level > max_depth:
+                continue
+            parent_path, _, name = path.rpartition("/")
+            if object_type == "tree":
+                if path in folders:
+                    folders[path]["sha"] = object_sha
+                    continue
+                node = {"id": id_prefix + path, "name": name, "type": "folder", "sha": object_sha, "children": []}
+                if max_depth is not None and level == max_depth:
+                    node["children_loaded"] = False
+                folders[path] = node
             else:
-                path_parts = relative_root.split(os.sep); parent_ref = tree_data; found = True
-                for part in path_parts:
-                    parent_node = next((n for n in parent_ref if n["name"] == part and n["type"] == "folder"), None)
-                    if parent_node: 
-                        parent_ref = parent_node["children"]
-                    else : 
-                        found = False
-                        break
-                if found: parent_ref.extend(current_level_nodes)
-        return {"success": True, "tree": tree_data}
-
-    def get_file_tree(self, space_id_str: str, branch: str, force_refresh: bool = False):
+                node = {"id": id_prefix + path, "name": name, "type": "file", "sha": object_sha, "size": size}
+                if object_type == "commit":
+                    node["submodule"] = True
+                elif mode == "120000":
+                    node["symlink"] = True
+            get_folder(parent_path)["children"].append(node)
+
+        # Folders before files within each directory, as the UI has always listed them
+        # (git already emits entries sorted by name, so a stable partition keeps this linear)
+        for folder in folders.values():
+            children = folder["children"]
+            folder["children"] = [n for n in children if n["type"] == "folder"] + [n for n in children if n["type"] != "folder"]
+        return folders[""]["children"]
+
+    def _resolve_branch_commit(self, git_repo_url: str, branch: str, force_fetch: bool = False, expected_sha: str = None) -> dict:
+        """
+        Returns {"success": True, "mirror_path", "commit_sha"} for the branch tip in the repo's mirror.
+        If the mirror's branch tip differs from 'expected_sha' (the remote's current SHA), the mirror
+        is fetched first instead of waiting for the throttled refresh.
+        """
+        mirror = self.mirror_store.ensure_mirror(git_repo_url, force_fetch=force_fetch)
+        if not mirror["success"]:
+            return mirror
+        commit_sha = self.mirror_store.resolve_commit(mirror["path"], branch)
+        if expected_sha and commit_sha != expected_sha and not mirror["fetched"]:
+            mirror = self.mirror_store.ensure_mirror(git_repo_url, force_fetch=True)
+            if not mirror["success"]:
+                return mirror
+            commit_sha = self.mirror_store.resolve_commit(mirror["path"], branch)
+        if not commit_sha:
+            return {"success": False, "error": f"Branch '{branch}' not found in {git_repo_url}."}
+        return {"success": True, "mirror_path": mirror["path"], "commit_sha": commit_sha}
+
+    def _fetch_tree_from_git(self, git_repo_url: str, branch: str, force_fetch: bool = False, expected_sha: str = None):
+        # Reads the tree straight from the mirror's object database; nothing is checked out
+        resolved = self._resolve_branch_commit(git_repo_url, branch, force_fetch=force_fetch, expected_sha=expected_sha)
+        if not resolved["success"]:
+            return resolved
+        commit_sha = resolved["commit_sha"]
+        with self.mirror_store.repo_lock(resolved["mirror_path"]):
+            ls_tree_result = self.mirror_store.run_git(
+                ["ls-tree", "-r", "-t", "-z", "--long", commit_sha], git_dir=resolved["mirror_path"], timeout=120, text=False
+            )
+        if not ls_tree_result["success"]:
+            return ls_tree_result
+        return {"success": True, "tree": self._build_tree_from_ls_tree(ls_tree_result["stdout"]), "commit_sha": commit_sha}
+
+    def _ls_tree_level(self, mirror_path: str, tree_ish: str, folder_paths: list) -> dict:
+        """
+        One 'git ls-tree' (non-recursive) over the direct entries of 'folder_paths' (relative to
+        'tree_ish'; [""] for tree_ish itself). Paths are batched to keep argv bounded.
+        """
+        chunks = []
+        for start in range(0, len(folder_paths), _LS_TREE_PATHS_PER_CALL):
+            batch = [f"{p}/" for p in folder_paths[start:start + _LS_TREE_PATHS_PER_CALL] if p]
+            ls_args = ["--literal-pathspecs", "ls-tree", "-z", "--long", tree_ish] + (["--"] + batch if batch else [])
+            result = self.mirror_store.run_git(ls_args, git_dir=mirror_path, timeout=120, text=False)
+            if not result["success"]:
+                return result
+            chunks.append(result["stdout"])
+        return {"success": True, "stdout": b"\0".join(chunks)}
+
+    def _list_subtree_nodes(self, mirror_path: str, commit_sha: str, path: str, depth: int) -> dict:
+        cache_key = (mirror_path, commit_sha, path, depth)
+        nodes = self.subtree_cache.get(cache_key) # Keyed by commit SHA, so entries never go stale
+        if nodes is not None:
+            return {"success": True, "nodes": nodes}
+        tree_ish = f"{commit_sha}:{path}" if path else commit_sha
+        # Level by level: each 'ls-tree' lists only the folders of the previous level, so the cost is
+        # bounded by the entries within 'depth', never by everything below 'path'
+        raw_levels, folder_paths = [], [""]
+        with self.mirror_store.repo_lock(mirror_path):
+            for level in range(1, depth + 1):
+                result = self._ls_tree_level(mirror_path, tree_ish, folder_paths)
+                if not result["success"]:
+                    if level == 1 and self._is_missing_tree(mirror_path, tree_ish):
+                        return {"success": False, "error": f"Path '{path}' is not a directory on this commit.", "not_found": True}
+                    return result
+                raw_levels.append(result["stdout"])
+                folder_paths = [entry_path for _, object_type, _, _, entry_path in self._parse_ls_tree(result["stdout"])
+                                if object_type == "tree"]
+                if not folder_paths:
+                    break
+        nodes = self._build_tree_from_ls_tree(b"\0".join(raw_levels), base_path=path, max_depth=depth)
+        self.subtree_cache.put(cache_key, nodes)
+        return {"success": True, "nodes": nodes}
+
+    def _is_missing_tree(self, mirror_path: str, tree_ish: str) -> bool:
+        # Git answered and the object is absent or not a tree; timeouts and other failures are not "missing"
+        result = self.mirror_store.run_git(["cat-file", "-t", tree_ish], git_dir=mirror_path, timeout=30)
+        if result["success"]:
+            return result["stdout"] != "tree"
+        return "details" in result
+
+    def _cap_nested_children(self, nodes: list, max_children: int):
+        # Paging applies to the requested folder; nested levels are capped so one wide folder cannot blow up the response
+        for node in nodes:
+            children = node.get("children")
+            if not children:
+                continue
+            if len(children) > max_children:
+                node["children_total"] = len(children)
+                node["children_truncated"] = True
+                node["children"] = children[:max_children]
+            self._cap_nested_children(node["children"], max_children)
+
+    def get_subtree(self, space_id_str: str, branch: str, path: str = "", depth: int = 1,
+                    offset: int = 0, limit: int = 200, commit_sha: str = None) -> dict:
+        """
+        Lists the folder 'path' of a branch 'depth' levels deep, paginated over its direct entries.
+        Returns {"success", "path", "commit_sha", "entries", "offset", "limit", "total", "next_offset"}.
+        Pass the returned 'commit_sha' back when paging so every page comes from the same commit.
+        """
+        print(f"SERVICE-GIT: get_subtree for space {space_id_str}, branch {branch}, path '{path}', depth {depth}")
+        path = (path or "").strip("/")
+        if ".." in path.split("/"):
+            return {"success": False, "error": "Invalid path."}
+        dev_config = _dev_config_snapshot(space_id_str)
+        if not dev_config or not dev_config.git_repo_url:
+            return {"success": False, "error": "Git repository not configured for this space."}
+
+        if commit_sha:
+            mirror = self.mirror_store.ensure_mirror(dev_config.git_repo_url)
+            if not mirror["success"]:
+                return mirror
+            pinned_sha = self.mirror_store.resolve_commit(mirror["path"], commit_sha)
+            if not pinned_sha:
+                return {"success": False, "error": f"Commit '{commit_sha}' not found.", "not_found": True}
+            resolved = {"success": True, "mirror_path": mirror["path"], "commit_sha": pinned_sha}
+        else:
+            remote_sha = self.resolve_remote_branch_sha(dev_config.git_repo_url, branch)
+            resolved = self._resolve_branch_commit(dev_config.git_repo_url, branch, expected_sha=remote_sha)
+            if not resolved["success"]:
+                return resolved
+
+        listing = self._list_subtree_nodes(resolved["mirror_path"], resolved["commit_sha"], path, depth)
+        if not listing["success"]:
+            return listing
+        nodes = listing["nodes"]
+        page = copy.deepcopy(nodes[offset:offset + limit]) # Cached nodes are shared; cap a copy
+        self._cap_nested_children(page, limit)
+        next_offset = offset + limit if offset + limit < len(nodes) else None
+        return {
+            "success": True,
+            "path": path,
+            "commit_sha": resolved["commit_sha"],
+            "entries": page,
+            "offset": offset,
+            "limit": limit,
+            "total": len(nodes),
+            "next_offset": next_offset,
+        }
+
+    def resolve_remote_branch_sha(self, git_repo_url: str, branch: str, force_refresh: bool = False) -> Optional[str]:
+        """Current commit SHA of 'branch' on the remote, from the shared ls-remote ref cache (no object transfer)."""
+        refs = git_ref_cache.get_refs(git_repo_url, force_refresh=force_refresh)
+        return refs["branches"].get(branch) if refs["success"] else None
+
+    def _load_cached_tree(self, db_session, dev_config_id: int, branch: str, commit_sha: Optional[str]):
+        """Cached tree row for 'branch' if it matches 'commit_sha' (any row for the branch if the SHA is unknown)."""
+        cached = db_session.query(GitTreeCache).filter_by(dev_config_id=dev_config_id, branch=branch).first()
+        if cached and (commit_sha is None or cached.commit_sha == commit_sha):
+            return cached
+        if commit_sha:
+            # Another branch of this space may point at the same commit (e.g. a fresh feature branch)
+            return db_session.query(GitTreeCache).filter_by(dev_config_id=dev_config_id, commit_sha=commit_sha).first()
+        return None
+
+    def _store_tree(self, db_session, dev_config_id: int, branch: str, commit_sha: str, tree_json: str):
+        cached = db_session.query(GitTreeCache).filter_by(dev_config_id=dev_config_id, branch=branch).first()
+        if not cached:
+            cached = GitTreeCache(dev_config_id=dev_config_id, branch=branch)
+            db_session.add(cached)
+        cached.commit_sha = commit_sha
+        cached.tree_json = tree_json
+        cached.fetched_at = datetime.datetime.now(datetime.timezone.utc)
+        db_session.flush()
+        # Keep only the most recently fetched branches for this space
+        stale_rows = (db_session.query(GitTreeCache)
+                      .filter_by(dev_config_id=dev_config_id)
+                      .order_by(GitTreeCache.fetched_at.desc())
+                      .offset(app_config.GIT_TREE_CACHE_MAX_BRANCHES)
+                      .all())
+        for row in stale_rows:
+            db_session.delete(row)
+
+    def get_file_tree(self, space_id_str: str, branch: str, force_refresh: bool = False, known_commit_sha: str = None):
+        """
+        Returns {"success", "tree", "commit_sha", "from_cache"}. Trees are cached per branch and
+        reused while the remote branch still points at the same commit; a moved branch is rebuilt.
+        If 'known_commit_sha' (what the client already has) is still current, returns
+        {"success": True, "not_modified": True, "commit_sha": ...} without loading the tree.
+        """
         print(f"SERVICE-GIT: get_file_tree for space {space_id_str}, branch {branch}, refresh: {force_refresh}")
-        
-        dev_config = space_service_instance.get_dev_config_object(space_id_str)
+
+        dev_config = _dev_config_snapshot(space_id_str)
         if not dev_config or not dev_config.git_repo_url:
             return {"success": False, "error": "Git repository not configured for this space."}
-        
+
         git_repo_url = dev_config.git_repo_url
+        remote_sha = self.resolve_remote_branch_sha(git_repo_url, branch, force_refresh=force_refresh)
+        if not remote_sha:
+            print(f"SERVICE-GIT WARN: Could not resolve remote SHA for branch {branch}; cached tree may be stale.")
+
+        if not force_refresh and remote_sha and known_commit_sha == remote_sha:
+            return {"success": True, "not_modified": True, "commit_sha": remote_sha}
 
         # Check cache first (unless force_refresh)
-        if not force_refresh and dev_config.cached_file_tree_json and dev_config.cached_tree_branch == branch:
-            # TODO: Add staleness check for cache if desired, e.g., if dev_config.tree_last_fetched_at is too old
-            print(f"SERVICE-GIT: Returning cached tree for branch {branch}")
-            try:
-                return {"success": True, "tree": json.loads(dev_config.cached_file_tree_json), "from_cache": True}
-            except json.JSONDecodeError:
-                print("SERVICE-GIT WARN: Failed to decode cached JSON tree. Fetching fresh.")
-
-        # Proceed to fetch from Git
-        repo_name_for_temp = git_repo_url.split('/')[-1].replace('.git', '')
-        temp_repo_path = tempfile.mkdtemp(prefix=f"{repo_name_for_temp}_{branch}_", dir=self.temp_clone_dir_base)
-        
-        try:
-            fetch_result = self._fetch_tree_from_git(git_repo_url, branch, temp_repo_path)
-            if fetch_result["success"]:
-                # Update cache in DB
-                db_session = SessionLocal()
+        if not force_refresh:
+            with get_db_session() as db_session:
+                cached = self._load_cached_tree(db_session, dev_config.dev_config_id, branch, remote_sha)
+                cached_tree = (cached.tree_json, cached.commit_sha) if cached else None
+            if cached_tree:
+                print(f"SERVICE-GIT: Returning cached tree for branch {branch} at {cached_tree[1][:12]}")
                 try:
-                    # Re-fetch dev_config within this new session to update it
-                    db_dev_config = db_session.query(DevSpaceConfig).filter_by(id=dev_config.id).first()
-                    if db_dev_config:
-                        db_dev_config.cached_file_tree_json = json.dumps(fetch_result["tree"])
-                        db_dev_config.cached_tree_branch = branch
-                        db_dev_config.tree_last_fetched_at = datetime.datetime.now(datetime.timezone.utc)
-                        db_session.commit()
-                        print(f"SERVICE-GIT: Cached new tree for branch {branch}")
-                    else:
-                        print(f"SERVICE-GIT WARN: Could not find DevSpaceConfig with id {dev_config.id} to update cache.")
+                    return {"success": True, "tree": json.loads(cached_tree[0]), "commit_sha": cached_tree[1], "from_cache": True}
+                except json.JSONDecodeError:
+                    print("SERVICE-GIT WARN: Failed to decode cached JSON tree. Fetching fresh.")
+
+        # Proceed to fetch from Git, with no DB connection checked out meanwhile
+        release_db_connection()
+        fetch_result = self._fetch_tree_from_git(git_repo_url, branch, force_fetch=force_refresh, expected_sha=remote_sha)
+        if fetch_result["success"]:
+            with get_db_session() as db_session:
+                try:
+                    self._store_tree(db_session, dev_config.dev_config_id, branch, fetch_result["commit_sha"], json.dumps(fetch_result["tree"]))
+                    db_session.commit()
+                    print(f"SERVICE-GIT: Cached new tree for branch {branch} at {fetch_result['commit_sha'][:12]}")
                 except Exception as db_e:
                     db_session.rollback()
                     print(f"SERVICE-GIT ERROR: Failed to update cache in DB: {db_e}")
-                finally:
-                    db_session.close()
-            return fetch_result
-        finally:
-            if os.path.exists(temp_repo_path):
-                print(f"SERVICE-GIT: Cleaning up temporary clone: {temp_repo_path}")
-                shutil.rmtree(temp_repo_path, ignore_errors=True)
-
-    
+            fetch_result["from_cache"] = False
+        return fetch_result
+
+    def _resolve_read_commit(self, mirror_path: str, branch: str) -> Optional[str]:
+        # Through the repo's long-lived cat-file process: no process spawn per read
+        for object_name in (f"refs/heads/{branch}^{{commit}}", f"{branch}^{{commit}}"):
+            info = self.blob_reader.resolve(mirror_path, object_name)
+            if info:
+                return info[0]
+        return None
+
+    def read_file_content(self, git_repo_url: str, branch: str, file_path: str, start_line: int = None,
+                          end_line: int = None, byte_offset: int = 0, max_bytes: int = None) -> dict:
+        """
+        Reads a file at the tip of 'branch' (or a tag/commit) from the repo's mirror.
+        'start_line'/'end_line' (1-based, inclusive) select lines; otherwise 'byte_offset' and
+        'max_bytes' select a byte window. Output is capped at GIT_FILE_READ_MAX_BYTES; 'truncated'
+        tells whether anything was left out.
+        """
+        file_path = (file_path or "").strip().lstrip("/")
+        if not file_path or ".." in file_path.split("/"):
+            return {"success": False, "error": "Invalid file path."}
+        max_bytes = min(max_bytes or app_config.GIT_FILE_READ_MAX_BYTES, app_config.GIT_FILE_READ_MAX_BYTES)
+        mirror = self.mirror_store.ensure_mirror(git_repo_url)
+        if not mirror["success"]:
+            return mirror
+        commit_sha = self._resolve_read_commit(mirror["path"], branch)
+        if not commit_sha:
+            return {"success": False, "error": f"Branch '{branch}' not found in {git_repo_url}.", "not_found": True}
+
+        by_lines = start_line is not None or end_line is not None
+        # Line ranges need the text from the start of the file; large blobs only expose their first window
+        read = self.blob_reader.read_blob(
+            mirror["path"], commit_sha, file_path,
+            byte_offset=0 if by_lines else byte_offset,
+            max_bytes=self.blob_reader.max_cached_blob_bytes if by_lines else max_bytes,
+        )
+        if not read["success"]:
+            return read
+        data = read["data"]
+        result = {"success": True, "commit_sha": commit_sha, "blob_sha": read["blob_sha"], "size": read["size"]}
+        if b"\0" in data[:8000]:
+            return {**result, "binary": True, "content": "", "truncated": True}
+
+        text = data.decode("utf-8", errors="replace")
+        truncated = read["truncated"]
+        if by_lines:
+            lines = text.splitlines(keepends=True)
+            first = max(1, start_line or 1)
+            last = min(len(lines), end_line or len(lines))
+            text = "".join(lines[first - 1:last])
+            truncated = truncated or first > 1 or last < len(lines)
+            result.update({"start_line": first, "end_line": last})
+            if not read["truncated"]:
+                result["total_lines"] = len(lines)
+        encoded = text.encode("utf-8")
+        if len(encoded) > max_bytes:
+            text = encoded[:max_bytes].decode("utf-8", errors="ignore")
+            truncated = True
+        return {**result, "content": text, "truncated": truncated}
+
     def get_repository_local_path(self, space_id: str, git_repo_url: str, branch: str, force_clone_or_pull: bool = False) -> Optional[str]:
         """
         Ensures a local clone of the specified branch of the repo exists and is up-to-date.
@@ -0,0 +1,204 @@
+# devspace/backend/services/k8s_applier.py
+import time
+import threading
+
+import yaml
+from kubernetes import dynamic
+from kubernetes.dynamic.exceptions import ResourceNotFoundError, NotFoundError, DynamicApiError
+
+from config import config as app_config
+from core.ttl_lru_cache import TTLLRUCache
+from services.k8s_fanout import fan_out
+
+# Applied first, in this order, so later objects can live in the namespaces / use the CRDs
+FIRST_KINDS = ("CustomResourceDefinition", "Namespace")
+# Server-populated fields that are not part of what a manifest changes
+_IGNORED_DIFF_PATHS = {
+    "status", "metadata.resourceVersion", "metadata.generation", "metadata.managedFields", "metadata.uid",
+    "metadata.creationTimestamp", "metadata.selfLink",
+    "metadata.annotations.kubectl.kubernetes.io/last-applied-configuration",
+    "metadata.annotations.deployment.kubernetes.io/revision",
+}
+_MAX_DIFF_ENTRIES = 50
+
+
+def _flatten(value, prefix: str = "", out: dict = None) -> dict:
+    out = {} if out is None else out
+    if isinstance(value, dict) and (value or not prefix): # An empty nested dict is a value; an empty object is not
+        for key, child in value.items():
+            path = f"{prefix}.{key}" if prefix else str(key)
+            if path not in _IGNORED_DIFF_PATHS:
+                _flatten(child, path, out)
+    else:
+        out[prefix] = value
+    return out
+
+
+def object_diff(before: dict, after: dict) -> list:
+    """Leaf-level differences between two object dicts: [{"path", "before", "after"}], ignoring server bookkeeping."""
+    flat_before, flat_after = _flatten(before or {}), _flatten(after or {})
+    diff = []
+    for path in sorted(set(flat_before) | set(flat_after)):
+        if flat_before.get(path) != flat_after.get(path):
+            diff.append({"path": path, "before": flat_before.get(path), "after": flat_after.get(path)})
+    return diff
+
+
+def parse_manifest(yaml_string: str) -> list:
+    """YAML documents -> object dicts; 'kind: List' documents are flattened into their items. Raises yaml.YAMLError."""
+    objects = []
+    for doc in yaml.safe_load_all(yaml_string):
+        if not doc:
+            continue
+        if isinstance(doc, dict) and str(doc.get("kind", "")).endswith("List") and isinstance(doc.get("items"), list):
+            objects.extend(item for item in doc["items"] if item)
+        else:
+            objects.append(doc)
+    return objects
+
+
+class K8sApplier:
+    """
+    Server-side apply of manifests through the dynamic client. Discovery (the apiVersion/kind -> REST
+    resource mapping) is cached per cluster client and refreshed when a kind is unknown, e.g. right
+    after its CRD was applied. CRDs and namespaces go first; everything else is applied concurrently.
+    """
+
+    def __init__(self, field_manager: str, mapping_ttl_seconds: float, crd_wait_seconds: float, apply_timeout_seconds: float):
+        self.field_manager = field_manager
+        self.mapping_ttl_seconds = mapping_ttl_seconds
+        self.crd_wait_seconds = crd_wait_seconds
+        self.apply_timeout_seconds = apply_timeout_seconds
+        # (context key, client generation) -> {"lock", "client": DynamicClient}; a rebuilt ApiClient (new
+        # credentials) has a new generation and gets its own. The lock serializes discovery on that client,
+        # whose resource cache is not thread-safe.
+        self._dynamic_clients = TTLLRUCache("k8s_dynamic_clients", max_entries=32, idle_ttl_seconds=3600)
+        self._mappings = TTLLRUCache("k8s_rest_mappings", max_entries=2048) # (.., apiVersion, kind) -> (fetched_at, resource)
+
+    def _discovery_entry(self, clients: dict) -> dict:
+        key = (clients["context_key"], clients["generation"])
+        return self._dynamic_clients.get_or_create(key, lambda: {"lock": threading.Lock(), "client": None})
+
+    def _cached_resource(self, key):
+        cached = self._mappings.get(key)
+        if cached and time.monotonic() - cached[0] <= self.mapping_ttl_seconds:
+            return cached[1]
+        return None
+
+    def _resource_for(self, clients: dict, api_version: str, kind: str, wait_seconds: float = 0):
+        key = (clients["context_key"], clients["generation"], api_version, kind)
+        resource = self._cached_resource(key)
+        if resource is not None:
+            return resource
+        entry = self._discovery_entry(clients)
+        deadline = time.monotonic() + wait_seconds
+        while True:
+            with entry["lock"]:
+                resource = self._cached_resource(key) # Resolved by another thread while we waited
+                if resource is not None:
+                    return resource
+                if entry["client"] is None: # Built under the lock: construction runs discovery too
+                    entry["client"] = dynamic.DynamicClient(clients["api_client"])
+                try:
+                    resource = entry["client"].resources.get(api_version=api_version, kind=kind)
+                    self._mappings.put(key, (time.monotonic(), resource))
+                    return resource
+                except ResourceNotFoundError:
+                    if time.monotonic() >= deadline:
+                        raise
+                    entry["client"].resources.invalidate_cache() # A CRD applied moments ago may not be served yet
+            time.sleep(1)
+
+    def _apply_one(self, clients: dict, obj: dict, default_namespace: str, dry_run: bool, force_conflicts: bool,
+                   wait_seconds: float) -> dict:
+        meta = obj.get("metadata") or {}
+        result = {"kind": obj.get("kind"), "name": meta.get("name"), "namespace": None}
+        if not obj.get("apiVersion") or not obj.get("kind") or not meta.get("name"):
+            return {**result, "action": "error", "error": "apiVersion, kind and metadata.name are required."}
+        try:
+            resource = self._resource_for(clients, obj["apiVersion"], obj["kind"], wait_seconds)
+        except ResourceNotFoundError:
+            hint = " (its CRD is only created by a real apply)" if dry_run else ""
+            return {**result, "action": "error", "error": f"Unknown kind {obj['apiVersion']}/{obj['kind']}{hint}."}
+
+        namespace = (meta.get("namespace") or default_namespace) if resource.namespaced else None
+        result["namespace"] = namespace
+        if namespace:
+            obj = {**obj, "metadata": {**meta, "namespace": namespace}}
+        try:
+            try:
+                before = resource.get(name=meta["name"], namespace=namespace).to_dict()
+            except NotFoundError:
+                before = None
+            kwargs = {"field_manager": self.field_manager, "force_conflicts": force_conflicts}
+            if dry_run:
+                kwargs["dry_run"] = "All"
+            after = resource.server_side_apply(body=obj, name=meta["name"], namespace=namespace, **kwargs).to_dict()
+        except DynamicApiError as e:
+            return {**result, "action": "error", "error": f"{e.reason} (Status: {e.status}): {e.summary()}"}
+        diff = object_diff(before, after)
+        action = "created" if before is None else ("configured" if diff else "unchanged")
+        return {**result, "action": action, "diff": [] if before is None else diff[:_MAX_DIFF_ENTRIES],
+                **({"diff_truncated": True} if len(diff) > _MAX_DIFF_ENTRIES and before is not None else {})}
+
+    def apply(self, clients: dict, objects: list, default_namespace: str, dry_run: bool = False, force_conflicts: bool = False) -> dict:
+        """
+        Applies 'objects' (dicts). Returns {"success", "dry_run", "results": [{"kind", "name", "namespace",
+        "action": created|configured|unchanged|error, "diff", "error"}], "counts": {action: n}} in manifest order.
+        """
+        started = time.monotonic()
+        indexed = list(enumerate(objects))
+        phases = [[(i, o) for i, o in indexed if o.get("kind") == kind] for kind in FIRST_KINDS]
+        phases.append([(i, o) for i, o in indexed if o.get("kind") not in FIRST_KINDS])
+        new_crds = bool(phases[0]) and not dry_run
+
+        results = {}
+        for phase_index, phase in enumerate(phases):
+            if not phase:
+                continue
+            # Kinds from CRDs applied in this call may take a moment to appear in discovery
+            wait_seconds = self.crd_wait_seconds if new_crds and phase_index == len(phases) - 1 else 0
+            outcomes = fan_out({
+                i: (lambda obj=obj, wait_seconds=wait_seconds: self._apply_one(clients, obj, default_namespace, dry_run, force_conflicts, wait_seconds))
+                for i, obj in phase
+            }, timeout=self.apply_timeout_seconds)
+            for i, obj in phase:
+                outcome = outcomes[i]
+                if outcome["success"]:
+                    results[i] = outcome["result"]
+                else:
+                    meta = obj.get("metadata") or {}
+                    results[i] = {"kind": obj.get("kind"), "name": meta.get("name"), "namespace": meta.get("namespace"),
+                                  "action": "error", "error": outcome["error"]}
+
+        ordered = [results[i] for i, _obj in indexed]
+        counts = {}
+        for r in ordered:
+            counts[r["action"]] = counts.get(r["action"], 0) + 1
+        print(f"SERVICE-K8S-APPLY: {'Dry-run applied' if dry_run else 'Applied'} {len(ordered)} objects in {time.monotonic() - started:.2f}s: {counts}")
+        return {"success": "error" not in counts, "dry_run": dry_run, "results": ordered, "counts": counts}
+
+
+k8s_applier = K8sApplier(
+    field_manager=app_config.K8S_APPLY_FIELD_MANAGER,
+    mapping_ttl_seconds=app_config.K8S_APPLY_DISCOVERY_TTL_SECONDS,
+    crd_wait_seconds=app_config.K8S_APPLY_CRD_WAIT_SECONDS,
+    apply_timeout_seconds=app_config.K8S_APPLY_TIMEOUT_SECONDS,
+)
+
+
+def render_apply_result(result: dict) -> str:
+    """Compact text for agent tools: one line per object, plus the changed paths of configured ones."""
+    verb = "would be" if result["dry_run"] else ""
+    lines = [f"{'Dry run' if result['dry_run'] else 'Apply'}: " + ", ".join(f"{n} {action}" for action, n in result["counts"].items())]
+    for r in result["results"]:
+        target = f"{r['kind']}/{r['name']}" + (f" (ns {r['namespace']})" if r.get("namespace") else "")
+        if r["action"] == "error":
+            lines.append(f"- {target}: ERROR {r['error']}")
+            continue
+        lines.append(f"- {target}: {verb + ' ' if verb else ''}{r['action']}")
+        for change in r.get("diff", [])[:10]:
+            lines.append(f"    {change['path']}: {change['before']!r} -> {change['after']!r}")
+        if len(r.get("diff", [])) > 10 or r.get("diff_truncated"):
+            lines.append("    ...")
+    return "\n".join(lines)
@@ -0,0 +1,152 @@
+# devspace/backend/services/k8s_client_pool.py
+import os
+import time
+import threading
+import socket
+import hashlib
+import itertools
+
+from kubernetes import client, config as k8s_config_loader
+
+from config import config as app_config
+from core.ttl_lru_cache import TTLLRUCache
+from services.k8s_informer_cache import k8s_informer_cache
+
+# TCP keep-alive on the pooled connections, so idle-but-warm TLS connections survive NATs/load balancers
+_KEEPALIVE_SOCKET_OPTIONS = [
+    (socket.IPPROTO_TCP, socket.TCP_NODELAY, 1),
+    (socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1),
+] + ([(socket.IPPROTO_TCP, socket.TCP_KEEPIDLE, 60), (socket.IPPROTO_TCP, socket.TCP_KEEPINTVL, 20)]
+     if hasattr(socket, "TCP_KEEPIDLE") else [])
+
+
+def environment_context_key(env_config: dict) -> str:
+    """
+    Stable identity of the cluster credentials an environment config points at. Environments of
+    different spaces that use the same kubeconfig context (or cluster URL + token) share one client.
+    Supported env config fields: "in_cluster": true | "cluster_url" (+ "token"/"token_file",
+    "ca_cert", "verify_ssl") | "context" (+ optional "kubeconfig" path).
+    """
+    if env_config.get("in_cluster"):
+        return "in-cluster"
+    if env_config.get("cluster_url"):
+        credential = env_config.get("token_file") or env_config.get("token") or ""
+        return f"url:{env_config['cluster_url']}#{hashlib.sha1(credential.encode('utf-8')).hexdigest()[:12]}"
+    kubeconfig = env_config.get("kubeconfig") or os.environ.get("KUBECONFIG") or "~/.kube/config"
+    return f"context:{env_config.get('context') or '<current>'}@{kubeconfig}"
+
+
+class K8sClientPool:
+    """
+    One ApiClient (and its urllib3 connection pool) per cluster context, built from the space's
+    environment config into its own Configuration object, so the process-wide default config is
+    never touched. Clients are LRU/idle evicted, and rebuilt after 'credential_ttl_seconds' or on
+    invalidate() (e.g. after a 401) so rotated kubeconfig credentials are picked up. A credential
+    rebuild swaps the new client in without closing the old one, which requests and informer watches
+    may still be using; only an eviction or invalidate() closes the client and stops its informers.
+    """
+
+    def __init__(self, max_clients: int, idle_ttl_seconds: float, connection_pool_maxsize: int,
+                 credential_ttl_seconds: float, on_client_evicted=None):
+        self.connection_pool_maxsize = connection_pool_maxsize
+        self.credential_ttl_seconds = credential_ttl_seconds
+        self.on_client_evicted = on_client_evicted # Optional callback(context_key), e.g. to stop informers
+        self._rotation_lock = threading.Lock()
+        self._generations = itertools.count(1) # Never reused, unlike id(api_client)
+        self._clients = TTLLRUCache(
+            "k8s_api_clients", max_entries=max_clients, idle_ttl_seconds=idle_ttl_seconds,
+            on_evict=self._close_entry,
+        )
+
+    def _close_entry(self, context_key, entry, reason):
+        if reason == "replaced": # Credential rotation: in-flight users keep it; it is closed when garbage collected
+            return
+        print(f"SERVICE-K8S-POOL: Closing API client for '{context_key}' ({reason})")
+        try:
+            entry["api_client"].close()
+        except Exception as e:
+            print(f"SERVICE-K8S-POOL WARN: Error closing API client for '{context_key}': {e}")
+        if self.on_client_evicted and reason != "duplicate":
+            self.on_client_evicted(context_key)
+
+    def _build_configuration(self, env_config: dict) -> client.Configuration:
+        configuration = client.Configuration()
+        if env_config.get("in_cluster"):
+            k8s_config_loader.load_incluster_config(client_configuration=configuration) # Re-reads rotated SA tokens
+        elif env_config.get("cluster_url"):
+            configuration.host = env_config["cluster_url"]
+            configuration.verify_ssl = env_config.get("verify_ssl", True)
+            if env_config.get("ca_cert"):
+                configuration.ssl_ca_cert = env_config["ca_cert"]
+            configuration.api_key_prefix = {"authorization": "Bearer"}
+            if env_config.get("token_file"):
+                token_file = env_config["token_file"]
+                def _refresh_token(cfg):
+                    with open(token_file) as f: # Cheap; called before each request, picks up rotated tokens
+                        cfg.api_key["authorization"] = f.read().strip()
+                configuration.api_key = {}
+                configuration.refresh_api_key_hook = _refresh_token
+            elif env_config.get("token"):
+                configuration.api_key = {"authorization": env_config["token"]}
+        else:
+            kubeconfig = env_config.get("kubeconfig")
+            k8s_config_loader.load_kube_config(
+                config_file=os.path.expanduser(kubeconfig) if kubeconfig else None,
+                context=env_config.get("context"),
+                client_configuration=configuration,
+                persist_config=False,
+            )
+        configuration.connection_pool_maxsize = self.connection_pool_maxsize
+        configuration.socket_options = _KEEPALIVE_SOCKET_OPTIONS
+        return configuration
+
+    def _build_entry(self, context_key: str, env_config: dict) -> dict:
+        print(f"SERVICE-K8S-POOL: Creating API client for '{context_key}'")
+        try:
+            api_client = client.ApiClient(self._build_configuration(env_config))
+        except (k8s_config_loader.ConfigException, OSError) as e:
+            print(f"SERVICE-K8S-POOL ERROR: Could not load K8s config for '{context_key}': {e}")
+            raise ConnectionError(f"Failed to connect to K8s for context {context_key}: {e}")
+        return {
+            "api_client": api_client,
+            "core_v1": client.CoreV1Api(api_client),
+            "apps_v1": client.AppsV1Api(api_client),
+            "context_key": context_key,
+            "created_at": time.monotonic(),
+            "generation": next(self._generations), # Identifies this client (and its credentials) in derived caches
+        }
+
+    def get_clients(self, env_config: dict) -> dict:
+        """Returns {"api_client", "core_v1", "apps_v1", "context_key", "generation", ...} for an environment config."""
+        context_key = environment_context_key(env_config)
+        entry = self._clients.get_or_create(context_key, lambda: self._build_entry(context_key, env_config))
+        if time.monotonic() - entry["created_at"] > self.credential_ttl_seconds:
+            entry = self._rotate(context_key, entry, env_config)
+        return entry
+
+    def _rotate(self, context_key: str, stale_entry: dict, env_config: dict) -> dict:
+        """Swaps in a client with freshly loaded kubeconfig/exec credentials (once, if several callers notice)."""
+        with self._rotation_lock:
+            current = self._clients.peek(context_key)
+            if current is not None and current is not stale_entry:
+                return current
+            print(f"SERVICE-K8S-POOL: Credential TTL reached for '{context_key}', rebuilding its API client")
+            entry = self._build_entry(context_key, env_config)
+            self._clients.put(context_key, entry)
+            return entry
+
+    def invalidate(self, context_key: str):
+        self._clients.pop(context_key)
+
+    def stats(self) -> dict:
+        return self._clients.stats()
+
+
+# Shared by every K8sService instance; informers built on an evicted client are stopped with it
+k8s_client_pool = K8sClientPool(
+    max_clients=app_config.K8S_CLIENT_POOL_MAX_CLIENTS,
+    idle_ttl_seconds=app_config.K8S_CLIENT_POOL_IDLE_TTL_SECONDS,
+    connection_pool_maxsize=app_config.K8S_CLIENT_CONNECTION_POOL_MAXSIZE,
+    credential_ttl_seconds=app_config.K8S_CLIENT_CREDENTIAL_TTL_SECONDS,
+    on_client_evicted=k8s_informer_cache.invalidate_context,
+)
@@ -0,0 +1,39 @@
+# devspace/backend/services/k8s_fanout.py
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+
+from kubernetes import client
+
+from config import config as app_config
+
+# Shared pool for concurrent Kubernetes reads (several kinds, namespaces or apps per status request)
+_k8s_executor = ThreadPoolExecutor(max_workers=app_config.K8S_FANOUT_MAX_WORKERS, thread_name_prefix="k8s-fanout")
+
+
+def _describe_error(e: BaseException) -> str:
+    if isinstance(e, client.ApiException):
+        return f"Kubernetes API Error: {e.reason} (Status: {e.status})"
+    return str(e) or e.__class__.__name__
+
+
+def fan_out(calls: dict, timeout: float = None) -> dict:
+    """
+    Runs every callable of 'calls' ({key: fn}) concurrently and returns {key: {"success": True, "result"}}
+    or {key: {"success": False, "error"}}. Waits at most 'timeout' seconds in total, so the latency is that
+    of the slowest call rather than the sum; calls still running at the deadline count as timed out.
+    """
+    timeout = app_config.K8S_STATUS_TIMEOUT_SECONDS if timeout is None else timeout
+    started = time.monotonic()
+    futures = {key: _k8s_executor.submit(fn) for key, fn in calls.items()}
+    wait(futures.values(), timeout=timeout)
+    results = {}
+    for key, future in futures.items():
+        if not future.done():
+            future.cancel() # Only stops calls that have not started yet
+            results[key] = {"success": False, "error": f"Timed out after {timeout:g}s"}
+        elif future.exception() is not None:
+            results[key] = {"success": False, "error": _describe_error(future.exception())}
+        else:
+            results[key] = {"success": True, "result": future.result()}
+    print(f"SERVICE-K8S: Fan-out of {len(calls)} calls took {time.monotonic() - started:.2f}s")
+    return results
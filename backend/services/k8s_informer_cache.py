@@ -0,0 +1,418 @@
+# devspace/backend/services/k8s_informer_cache.py
+import re
+import time
+import socket
+import threading
+import functools
+from collections import defaultdict
+
+from kubernetes import client, watch
+
+from config import config as app_config
+from core.ttl_lru_cache import TTLLRUCache
+from services.k8s_projections import PROJECTIONS
+
+_LIST_PAGE_SIZE = 500
+
+# kind -> (api group key, namespaced list method, all-namespaces list method)
+LIST_METHODS = {
+    "pods": ("core_v1", "list_namespaced_pod", "list_pod_for_all_namespaces"),
+    "services": ("core_v1", "list_namespaced_service", "list_service_for_all_namespaces"),
+    "deployments": ("apps_v1", "list_namespaced_deployment", "list_deployment_for_all_namespaces"),
+}
+
+
+# --- Label selectors ---
+_SET_REQUIREMENT = re.compile(r"^([^\s!=]+)\s+(in|notin)\s+\((.*)\)$")
+
+
+def parse_label_selector(selector: str) -> list:
+    """
+    Parses a Kubernetes label selector ("app=web,tier!=db,env in (a,b),!canary") into
+    (key, operator, values) requirements. Operators: =, !=, in, notin, exists, !exists.
+    """
+    requirements = []
+    if not selector:
+        return requirements
+    parts, depth, current = [], 0, ""
+    for ch in selector: # Split on commas outside of "in (...)" value lists
+        if ch == "(": depth += 1
+        elif ch == ")": depth -= 1
+        if ch == "," and depth == 0:
+            parts.append(current)
+            current = ""
+        else:
+            current += ch
+    parts.append(current)
+
+    for part in (p.strip() for p in parts):
+        if not part:
+            continue
+        set_match = _SET_REQUIREMENT.match(part)
+        if set_match:
+            values = {v.strip() for v in set_match.group(3).split(",") if v.strip()}
+            requirements.append((set_match.group(1), set_match.group(2), values))
+        elif "!=" in part:
+            key, value = part.split("!=", 1)
+            requirements.append((key.strip(), "!=", {value.strip()}))
+        elif "=" in part:
+            key, value = part.replace("==", "=", 1).split("=", 1)
+            requirements.append((key.strip(), "=", {value.strip()}))
+        elif part.startswith("!"):
+            requirements.append((part[1:].strip(), "!exists", set()))
+        else:
+            requirements.append((part, "exists", set()))
+    return requirements
+
+
+def labels_match(labels: dict, requirements: list) -> bool:
+    for key, op, values in requirements:
+        present = key in labels
+        if op in ("=", "in"):
+            if not present or labels[key] not in values: return False
+        elif op in ("!=", "notin"):
+            if present and labels[key] in values: return False
+        elif op == "exists":
+            if not present: return False
+        elif op == "!exists":
+            if present: return False
+    return True
+
+
+# Field selectors the informers can answer from their projections: selector field -> projection key
+PROJECTED_FIELDS = {
+    "metadata.name": "name",
+    "metadata.namespace": "namespace",
+    "status.phase": "status", # Pods
+    "spec.nodeName": "nodeName", # Pods
+    "spec.type": "type", # Services
+}
+
+
+def parse_field_selector(selector: str) -> list:
+    """Parses "status.phase!=Running,spec.nodeName=n1" into (field, operator, value) with operators = and !=."""
+    requirements = []
+    for part in (p.strip() for p in (selector or "").split(",")):
+        if not part:
+            continue
+        if "!=" in part:
+            field, value = part.split("!=", 1)
+            requirements.append((field.strip(), "!=", value.strip()))
+        else:
+            field, value = part.replace("==", "=", 1).split("=", 1)
+            requirements.append((field.strip(), "=", value.strip()))
+    return requirements
+
+
+def fields_match(item: dict, requirements: list) -> bool:
+    for field, op, value in requirements:
+        actual = item.get(PROJECTED_FIELDS[field])
+        actual = "" if actual is None else str(actual)
+        if (actual == value) != (op == "="):
+            return False
+    return True
+
+
+class K8sInformer:
+    """
+    Keeps an in-memory copy of one resource kind in one namespace (or all namespaces): lists once
+    (paginated), then applies watch events, resuming from the last resourceVersion. A '410 Gone',
+    an error or the periodic resync triggers a fresh list. Objects are stored as compact projections
+    with an index by label (key, value) so selector queries do not scan everything.
+    """
+
+    def __init__(self, name: str, list_fn, namespace: str, project, resync_seconds: float,
+                 watch_timeout_seconds: int, max_objects: int):
+        self.name = name
+        self.namespace = namespace
+        self._list_fn = list_fn
+        self._project = project
+        self.resync_seconds = resync_seconds
+        self.watch_timeout_seconds = watch_timeout_seconds
+        self.max_objects = max_objects
+        self._objects = {} # "namespace/name" -> projected dict
+        self._label_index = defaultdict(set) # (label key, value) -> object keys
+        self._lock = threading.RLock()
+        self._synced = threading.Event()
+        self._stop = threading.Event()
+        self._watcher = None
+        self._watch_response = None # HTTP response of the watch in progress, to interrupt a blocked read
+        self.resource_version = None
+        self.last_relist_at = None
+        self.last_error = None
+        self.overflowed = False
+        self.unauthorized = False # Credentials of its client were rejected; a new informer takes over
+        self._stats = {"relists": 0, "events": 0, "watch_restarts": 0, "errors": 0}
+        self._thread = threading.Thread(target=self._run, name=f"k8s-informer-{name}", daemon=True)
+
+    # --- lifecycle ---
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._watcher:
+            self._watcher.stop() # Only checked between events
+        self._interrupt_watch()
+        print(f"SERVICE-K8S-INFORMER: Stopped informer {self.name}")
+
+    def _interrupt_watch(self):
+        """Unblocks the watch thread, which may otherwise wait up to watch_timeout_seconds for the next event."""
+        response = self._watch_response
+        sock = getattr(getattr(response, "connection", None), "sock", None)
+        if sock is None:
+            return
+        try:
+            sock.shutdown(socket.SHUT_RDWR) # Not close(): it can block on the SSL lock the reading thread holds
+        except OSError:
+            pass
+
+    def wait_synced(self, timeout: float) -> bool:
+        return self._synced.wait(timeout)
+
+    @property
+    def usable(self) -> bool:
+        return self._synced.is_set() and not self.overflowed and not self.unauthorized and not self._stop.is_set()
+
+    # --- store ---
+    def _ns_kwargs(self):
+        return {"namespace": self.namespace} if self.namespace else {}
+
+    def _index_add(self, key, labels):
+        for label in labels.items():
+            self._label_index[label].add(key)
+
+    def _index_remove(self, key, labels):
+        for label in labels.items():
+            keys = self._label_index.get(label)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._label_index[label]
+
+    def _upsert(self, projected):
+        key = f"{projected['namespace']}/{projected['name']}"
+        previous = self._objects.get(key)
+        if previous is not None:
+            self._index_remove(key, previous["labels"])
+        self._objects[key] = projected
+        self._index_add(key, projected["labels"])
+
+    def _delete(self, projected):
+        key = f"{projected['namespace']}/{projected['name']}"
+        previous = self._objects.pop(key, None)
+        if previous is not None:
+            self._index_remove(key, previous["labels"])
+
+    def list(self, label_selector: str = None, field_selector: str = None) -> list:
+        requirements = parse_label_selector(label_selector)
+        field_requirements = parse_field_selector(field_selector)
+        with self._lock:
+            # Narrow through the index with the first equality requirement, then filter the rest
+            equality = next(((k, next(iter(v))) for k, op, v in requirements if op == "=" ), None)
+            if equality:
+                candidates = [self._objects[key] for key in self._label_index.get(equality, ())]
+            else:
+                candidates = list(self._objects.values())
+            items = [dict(obj) for obj in candidates
+                     if labels_match(obj["labels"], requirements) and fields_match(obj, field_requirements)]
+        items.sort(key=lambda o: (o["namespace"] or "", o["name"]))
+        return items
+
+    # --- list/watch loop ---
+    def _relist(self):
+        objects, continue_token = [], None
+        while True:
+            kwargs = {**self._ns_kwargs(), "limit": _LIST_PAGE_SIZE}
+            if continue_token:
+                kwargs["_continue"] = continue_token
+            page = self._list_fn(**kwargs)
+            objects.extend(self._project(item) for item in page.items)
+            if len(objects) > self.max_objects:
+                self.overflowed = True
+                raise OverflowError(f"more than {self.max_objects} objects")
+            continue_token = page.metadata._continue
+            if not continue_token:
+                break
+        with self._lock:
+            self._objects.clear()
+            self._label_index.clear()
+            for projected in objects:
+                self._upsert(projected)
+            self.resource_version = page.metadata.resource_version
+        self.last_relist_at = time.monotonic()
+        self._stats["relists"] += 1
+        self._synced.set()
+        print(f"SERVICE-K8S-INFORMER: {self.name} listed {len(objects)} objects at resourceVersion {self.resource_version}")
+
+    def _watch(self):
+        self._watch_response = None
+
+        @functools.wraps(self._list_fn) # Watch reads the item type from the list method's signature/docstring
+        def list_fn(*args, **kwargs):
+            self._watch_response = self._list_fn(*args, **kwargs)
+            if self._stop.is_set(): # stop() ran while the request was being sent
+                self._interrupt_watch()
+            return self._watch_response
+
+        self._watcher = watch.Watch()
+        stream = self._watcher.stream(
+            list_fn, resource_version=self.resource_version, timeout_seconds=self.watch_timeout_seconds,
+            allow_watch_bookmarks=True, **self._ns_kwargs()
+        )
+        for event in stream:
+            if self._stop.is_set():
+                return
+            event_type = event["type"]
+            raw = event.get("raw_object") or {}
+            if event_type == "ERROR":
+                if raw.get("code") == 410: # Our resourceVersion is too old: relist
+                    self.resource_version = None
+                    return
+                raise RuntimeError(raw.get("message") or "watch error")
+            if event_type == "BOOKMARK":
+                self.resource_version = (raw.get("metadata") or {}).get("resourceVersion") or self.resource_version
+                continue
+            projected = self._project(event["object"])
+            with self._lock:
+                if event_type == "DELETED":
+                    self._delete(projected)
+                else:
+                    self._upsert(projected)
+                if len(self._objects) > self.max_objects:
+                    self.overflowed = True
+                    raise OverflowError(f"more than {self.max_objects} objects")
+                self.resource_version = projected["resourceVersion"]
+            self._stats["events"] += 1
+            if time.monotonic() - self.last_relist_at > self.resync_seconds:
+                return
+
+    def _run(self):
+        backoff = 1
+        while not self._stop.is_set():
+            try:
+                resync_due = self.last_relist_at is None or time.monotonic() - self.last_relist_at > self.resync_seconds
+                if self.resource_version is None or resync_due:
+                    self._relist()
+                self._watch()
+                self._stats["watch_restarts"] += 1
+                backoff = 1
+            except client.ApiException as e:
+                if e.status == 410:
+                    self.resource_version = None
+                    continue
+                self._record_error(f"Kubernetes API Error: {e.reason} (Status: {e.status})")
+                if e.status == 401: # Expired credentials: retrying with this client cannot succeed
+                    self.unauthorized = True
+                    return
+            except OverflowError as e:
+                self._record_error(f"Informer disabled, {e}; queries fall back to direct lists")
+                return
+            except Exception as e:
+                if self._stop.is_set(): # The read interrupted by stop()
+                    return
+                self._record_error(str(e))
+            else:
+                continue
+            self._stop.wait(backoff)
+            backoff = min(backoff * 2, 60)
+            self.resource_version = None # Relist after an error; events may have been missed
+
+    def _record_error(self, message: str):
+        self.last_error = message
+        self._stats["errors"] += 1
+        print(f"SERVICE-K8S-INFORMER ERROR: {self.name}: {message}")
+
+    def stats(self) -> dict:
+        with self._lock:
+            size = len(self._objects)
+        return {
+            "name": self.name,
+            "objects": size,
+            "synced": self._synced.is_set(),
+            "overflowed": self.overflowed,
+            "resource_version": self.resource_version,
+            "last_error": self.last_error,
+            **self._stats,
+        }
+
+
+class K8sInformerCache:
+    """
+    Registry of informers keyed by (cluster context, kind, namespace). Informers start on first use,
+    and stop when evicted (LRU over 'max_informers', or unused for 'idle_ttl_seconds'). An informer
+    whose client got a 401 is dropped and rebuilt on the caller's current client by the next query.
+    """
+
+    def __init__(self, max_informers: int, idle_ttl_seconds: float, resync_seconds: float,
+                 watch_timeout_seconds: int, sync_timeout_seconds: float, max_objects_per_informer: int):
+        self.resync_seconds = resync_seconds
+        self.watch_timeout_seconds = watch_timeout_seconds
+        self.sync_timeout_seconds = sync_timeout_seconds
+        self.max_objects_per_informer = max_objects_per_informer
+        self._informers = TTLLRUCache(
+            "k8s_informers", max_entries=max_informers, idle_ttl_seconds=idle_ttl_seconds,
+            on_evict=lambda _key, informer, _reason: informer.stop(),
+        )
+
+    def _create_informer(self, context_key: str, kind: str, namespace: str, apis: dict) -> K8sInformer:
+        api_key, namespaced_method, all_namespaces_method = LIST_METHODS[kind]
+        api = apis[api_key]
+        list_fn = getattr(api, namespaced_method if namespace else all_namespaces_method)
+        informer = K8sInformer(
+            f"{context_key}/{kind}/{namespace or '*'}", list_fn, namespace, PROJECTIONS[kind],
+            resync_seconds=self.resync_seconds, watch_timeout_seconds=self.watch_timeout_seconds,
+            max_objects=self.max_objects_per_informer,
+        )
+        informer.start()
+        return informer
+
+    def list(self, context_key: str, kind: str, namespace: str, apis: dict, label_selector: str = None,
+             field_selector: str = None) -> dict:
+        """
+        Returns {"success": True, "items": [...], "resource_version"} from memory, waiting for the
+        informer's first sync if needed, or {"success": False, "error"} if it is not usable or the
+        field selector uses fields outside PROJECTED_FIELDS (callers then fall back to a direct list).
+        """
+        if kind not in LIST_METHODS:
+            return {"success": False, "error": f"No informer for resource type: {kind}"}
+        try:
+            unsupported = [f for f, _op, _v in parse_field_selector(field_selector) if f not in PROJECTED_FIELDS]
+        except ValueError:
+            return {"success": False, "error": f"Invalid field selector: {field_selector}"}
+        if unsupported:
+            return {"success": False, "error": f"Field selector on {', '.join(unsupported)} needs the API server"}
+        self._informers.sweep() # Stop informers nobody asked for within the idle TTL
+        key = (context_key, kind, namespace or "")
+        informer = self._informers.get_or_create(key, lambda: self._create_informer(context_key, kind, namespace, apis))
+        # A first sync that is still running is worth waiting for; one that is failing is not
+        wait_seconds = 0 if informer.last_error else self.sync_timeout_seconds
+        synced = informer.usable or informer.wait_synced(wait_seconds)
+        if informer.overflowed or informer.unauthorized: # Dead for good, also before its first sync
+            self._informers.pop(key)
+            return {"success": False, "error": informer.last_error}
+        if not synced:
+            return {"success": False, "error": informer.last_error or "Informer not synced yet."}
+        return {"success": True, "items": informer.list(label_selector, field_selector), "resource_version": informer.resource_version}
+
+    def invalidate_context(self, context_key: str) -> int:
+        """Stops all informers of a context (e.g. after its credentials or cluster changed)."""
+        return self._informers.pop_where(lambda key, _informer: key[0] == context_key)
+
+    def stats(self) -> dict:
+        return {
+            "cache": self._informers.stats(),
+            "informers": [informer.stats() for _key, informer in self._informers.items()],
+        }
+
+
+
+# Shared by K8sService (space environments) and the legacy k8s_handler status endpoint
+k8s_informer_cache = K8sInformerCache(
+    max_informers=app_config.K8S_INFORMER_MAX_INFORMERS,
+    idle_ttl_seconds=app_config.K8S_INFORMER_IDLE_TTL_SECONDS,
+    resync_seconds=app_config.K8S_INFORMER_RESYNC_SECONDS,
+    watch_timeout_seconds=app_config.K8S_INFORMER_WATCH_TIMEOUT_SECONDS,
+    sync_timeout_seconds=app_config.K8S_INFORMER_SYNC_TIMEOUT_SECONDS,
+    max_objects_per_informer=app_config.K8S_INFORMER_MAX_OBJECTS,
+)
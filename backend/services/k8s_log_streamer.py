@@ -0,0 +1,174 @@
+# devspace/backend/services/k8s_log_streamer.py
+import re
+import heapq
+import queue
+import threading
+from collections import deque
+
+from services.k8s_fanout import fan_out
+
+_READ_CHUNK_BYTES = 64 * 1024
+_END = object() # Marks the end of one source in follow mode
+
+# Severity words as they appear in common log formats ("ERROR", "level=warn", "[W]" is not covered)
+LEVEL_PATTERN = re.compile(r"\b(TRACE|DEBUG|INFO|NOTICE|WARN|WARNING|ERROR|ERR|CRITICAL|CRIT|FATAL|PANIC)\b", re.IGNORECASE)
+LEVEL_RANK = {"trace": 0, "debug": 1, "info": 2, "notice": 2, "warn": 3, "warning": 3,
+              "error": 4, "err": 4, "critical": 5, "crit": 5, "fatal": 5, "panic": 5}
+
+
+def _timestamp_key(timestamp: str) -> str:
+    # Kubelet timestamps are RFC3339Nano with trailing zeros trimmed; pad the fraction so they sort as strings
+    if "." not in timestamp:
+        return timestamp.rstrip("Z") + ".000000000Z"
+    seconds, fraction = timestamp.rstrip("Z").split(".", 1)
+    return f"{seconds}.{fraction.ljust(9, '0')}Z"
+
+
+class LogLineFilter:
+    """Regex and minimum-severity filter, applied to each line as it is read."""
+
+    def __init__(self, pattern: str = None, min_level: str = None):
+        self.regex = re.compile(pattern) if pattern else None # re.error propagates to the caller
+        if min_level and min_level.lower() not in LEVEL_RANK:
+            raise ValueError(f"Unknown log level '{min_level}'. Use one of: debug, info, warn, error, fatal.")
+        self.min_rank = LEVEL_RANK[min_level.lower()] if min_level else None
+
+    def matches(self, message: str) -> bool:
+        if self.regex and not self.regex.search(message):
+            return False
+        if self.min_rank is not None:
+            level = LEVEL_PATTERN.search(message)
+            if not level or LEVEL_RANK[level.group(1).lower()] < self.min_rank:
+                return False
+        return True
+
+
+def _iter_lines(response):
+    """Yields decoded lines of a streamed (non-preloaded) urllib3 response without buffering it whole."""
+    pending = b""
+    try:
+        for chunk in response.stream(_READ_CHUNK_BYTES, decode_content=True):
+            pending += chunk
+            *lines, pending = pending.split(b"\n")
+            for line in lines:
+                yield line.decode("utf-8", errors="replace")
+        if pending:
+            yield pending.decode("utf-8", errors="replace")
+    finally:
+        response.release_conn()
+
+
+def _iter_entries(response, pod: str, container: str, line_filter: LogLineFilter):
+    # Requested with timestamps=True: "<RFC3339Nano> <message>"
+    for line in _iter_lines(response):
+        timestamp, _, message = line.partition(" ")
+        if line_filter.matches(message):
+            yield {"ts": timestamp, "key": _timestamp_key(timestamp), "pod": pod, "container": container, "message": message}
+
+
+def open_log_streams(core_v1, namespace: str, targets: list, since_seconds: int = None, tail_lines: int = None,
+                     limit_bytes: int = None, follow: bool = False) -> dict:
+    """
+    Opens one streaming log request per (pod, container) target concurrently. Returns
+    {"streams": [(pod, container, response)], "errors": [{"pod", "container", "error"}]}.
+    """
+    def _open(pod, container):
+        kwargs = {"name": pod, "namespace": namespace, "container": container, "timestamps": True,
+                  "follow": follow, "_preload_content": False}
+        if since_seconds: kwargs["since_seconds"] = int(since_seconds)
+        if tail_lines: kwargs["tail_lines"] = int(tail_lines)
+        if limit_bytes: kwargs["limit_bytes"] = int(limit_bytes) # Enforced by the kubelet, per container
+        return core_v1.read_namespaced_pod_log(**kwargs)
+
+    # Follow streams never finish; the fan-out deadline only bounds opening them
+    outcomes = fan_out({(pod, container): (lambda pod=pod, container=container: _open(pod, container)) for pod, container in targets})
+    streams, errors = [], []
+    for (pod, container), outcome in outcomes.items():
+        if outcome["success"]:
+            streams.append((pod, container, outcome["result"]))
+        else:
+            errors.append({"pod": pod, "container": container, "error": outcome["error"]})
+    return {"streams": streams, "errors": errors}
+
+
+def merge_log_streams(streams: list, line_filter: LogLineFilter, follow: bool = False):
+    """
+    Yields filtered entries {"ts", "pod", "container", "message"} of all streams. Finished logs are
+    k-way merged by timestamp (each container's log is already ordered); followed logs are interleaved
+    in arrival order by one reader thread per stream.
+    """
+    if not follow:
+        yield from heapq.merge(*(_iter_entries(r, pod, container, line_filter) for pod, container, r in streams),
+                               key=lambda entry: entry["key"])
+        return
+
+    entries = queue.Queue(maxsize=1000) # Backpressure: readers block while the consumer is slow
+    stop = threading.Event()
+
+    def _put(item) -> bool:
+        while not stop.is_set(): # Never block forever on a queue nobody reads any more
+            try:
+                entries.put(item, timeout=1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _read(pod, container, response):
+        try:
+            for entry in _iter_entries(response, pod, container, line_filter):
+                if not _put(entry):
+                    break
+        except Exception as e:
+            if not stop.is_set():
+                _put({"ts": "", "key": "", "pod": pod, "container": container, "message": f"[log stream error: {e}]"})
+        finally:
+            _put(_END)
+
+    for pod, container, response in streams:
+        threading.Thread(target=_read, args=(pod, container, response), name=f"k8s-log-{pod}-{container}", daemon=True).start()
+    remaining = len(streams)
+    try:
+        while remaining:
+            entry = entries.get()
+            if entry is _END:
+                remaining -= 1
+                continue
+            yield entry
+    finally:
+        stop.set() # Client went away: readers exit on their next line
+        for _pod, _container, response in streams:
+            try:
+                response.close()
+            except Exception:
+                pass
+
+
+def tail_within_budget(entries, max_bytes: int) -> dict:
+    """Keeps the most recent entries whose formatted lines fit in 'max_bytes'. Memory stays within the budget."""
+    kept, used, matched, dropped = deque(), 0, 0, 0
+    for entry in entries:
+        line = format_entry(entry)
+        matched += 1
+        kept.append(line)
+        used += len(line.encode("utf-8")) + 1
+        while used > max_bytes and kept:
+            used -= len(kept.popleft().encode("utf-8")) + 1
+            dropped += 1
+    return {"lines": list(kept), "matched": matched, "dropped": dropped}
+
+
+def format_entry(entry: dict) -> str:
+    return f"{entry['ts']} [{entry['pod']}/{entry['container']}] {entry['message']}"
+
+
+def render_log_tail(result: dict) -> str:
+    """Plain-text tool output for a tail_pod_logs result: the lines plus notes on what was left out."""
+    notes = []
+    if result["dropped"]:
+        notes.append(f"[{result['dropped']} older matching lines omitted to fit the output budget]")
+    for error in result["errors"]:
+        notes.append(f"[could not read {error['pod']}/{error['container']}: {error['error']}]")
+    if not result["lines"]:
+        notes.append("[no matching log lines]")
+    return "\n".join(notes + result["lines"])
@@ -0,0 +1,147 @@
+# devspace/backend/services/k8s_projections.py
+# Compact dict views of Kubernetes objects. Informers keep only these (not the full client models),
+# which bounds their memory, and every status/list response is built from the same shapes.
+
+
+def _common(obj) -> dict:
+    meta = obj.metadata
+    return {
+        "name": meta.name,
+        "namespace": meta.namespace,
+        "labels": dict(meta.labels or {}),
+        "uid": meta.uid,
+        "resourceVersion": meta.resource_version,
+        "creationTimestamp": meta.creation_timestamp.isoformat() if meta.creation_timestamp else None,
+    }
+
+
+def project_deployment(dep) -> dict:
+    status = dep.status
+    replicas = dep.spec.replicas or 0
+    ready = status.ready_replicas or 0
+    return {
+        **_common(dep),
+        "replicas": replicas,
+        "readyReplicas": ready,
+        "availableReplicas": status.available_replicas or 0,
+        "updatedReplicas": status.updated_replicas or 0,
+        "status": "Running" if ready == replicas and ready > 0 else "Updating/Pending", # Simplified status
+        "conditions": [cond.type + "=" + cond.status for cond in status.conditions] if status.conditions else [],
+    }
+
+
+def project_pod(pod) -> dict:
+    ready_containers = 0
+    total_containers = len(pod.spec.containers)
+    restarts = 0
+    waiting_reasons = []
+    if pod.status.container_statuses:
+        for cs in pod.status.container_statuses:
+            if cs.ready:
+                ready_containers += 1
+            restarts += cs.restart_count # Sum restarts across containers
+            if cs.state and cs.state.waiting and cs.state.waiting.reason:
+                waiting_reasons.append(cs.state.waiting.reason) # e.g. CrashLoopBackOff, ImagePullBackOff
+    return {
+        **_common(pod),
+        "ready": f"{ready_containers}/{total_containers}",
+        "status": pod.status.phase, # e.g., Pending, Running, Succeeded, Failed, Unknown
+        "restarts": restarts,
+        "waitingReasons": waiting_reasons,
+        "containers": [c.name for c in pod.spec.containers],
+        "nodeName": pod.spec.node_name,
+        "podIP": pod.status.pod_ip,
+    }
+
+
+def project_service(svc) -> dict:
+    external_ip = "<none>"
+    if svc.spec.type == "LoadBalancer" and svc.status.load_balancer and svc.status.load_balancer.ingress:
+        # Use hostname if available, else IP
+        ingress = svc.status.load_balancer.ingress[0]
+        external_ip = ingress.hostname or ingress.ip or "<pending>"
+    elif svc.spec.external_i_ps: # Handle ExternalName, etc. if needed
+        external_ip = ",".join(svc.spec.external_i_ps)
+    return {
+        **_common(svc),
+        "type": svc.spec.type,
+        "clusterIP": svc.spec.cluster_ip or "<none>",
+        "externalIP": external_ip,
+        "ports": ", ".join([f"{p.port}/{p.protocol}" + (f"->{p.node_port}" if p.node_port else "") for p in svc.spec.ports]) if svc.spec.ports else "<none>",
+        "selector": dict(svc.spec.selector or {}),
+    }
+
+
+PROJECTIONS = {
+    "deployments": project_deployment,
+    "pods": project_pod,
+    "services": project_service,
+}
+
+
+def select_fields(item: dict, fields: list) -> dict:
+    """Keeps only the requested projection keys (plus name/namespace, so items stay identifiable)."""
+    return {key: item[key] for key in ["name", "namespace", *fields] if key in item}
+
+
+# --- Summaries: aggregate views for large result sets ---
+RESTART_BUCKETS = ((0, "0"), (5, "1-5"), (20, "6-20"), (100, "21-100"))
+
+
+def _restart_bucket(restarts: int) -> str:
+    for upper, label in RESTART_BUCKETS:
+        if restarts <= upper:
+            return label
+    return ">100"
+
+
+def _count(values) -> dict:
+    counts = {}
+    for value in values:
+        counts[value] = counts.get(value, 0) + 1
+    return dict(sorted(counts.items(), key=lambda kv: -kv[1]))
+
+
+def summarize_pods(pods: list, top_n: int) -> dict:
+    histogram = {label: 0 for _upper, label in RESTART_BUCKETS}
+    histogram[">100"] = 0
+    for pod in pods:
+        histogram[_restart_bucket(pod["restarts"])] += 1
+    not_ready = [p for p in pods if p["ready"].split("/")[0] != p["ready"].split("/")[1]]
+    offenders = sorted((p for p in pods if p["restarts"] or p["waitingReasons"] or p["status"] not in ("Running", "Succeeded")),
+                       key=lambda p: (-p["restarts"], p["name"]))
+    return {
+        "total": len(pods),
+        "by_phase": _count(p["status"] for p in pods),
+        "not_ready": len(not_ready),
+        "waiting_reasons": _count(reason for p in pods for reason in p["waitingReasons"]),
+        "restart_histogram": histogram,
+        "top_offenders": [select_fields(p, ["status", "ready", "restarts", "waitingReasons", "nodeName"]) for p in offenders[:top_n]],
+    }
+
+
+def summarize_deployments(deployments: list, top_n: int) -> dict:
+    degraded = sorted((d for d in deployments if d["availableReplicas"] < d["replicas"] or d["updatedReplicas"] < d["replicas"]),
+                      key=lambda d: (-(d["replicas"] - d["availableReplicas"]), d["name"]))
+    return {
+        "total": len(deployments),
+        "fully_available": len(deployments) - len(degraded),
+        "scaled_to_zero": sum(1 for d in deployments if d["replicas"] == 0),
+        "top_offenders": [select_fields(d, ["replicas", "readyReplicas", "availableReplicas", "updatedReplicas", "conditions"]) for d in degraded[:top_n]],
+    }
+
+
+def summarize_services(services: list, top_n: int) -> dict:
+    pending = [s for s in services if s["externalIP"] == "<pending>"]
+    return {
+        "total": len(services),
+        "by_type": _count(s["type"] for s in services),
+        "pending_load_balancers": [select_fields(s, ["type", "ports"]) for s in pending[:top_n]],
+    }
+
+
+SUMMARIES = {
+    "deployments": summarize_deployments,
+    "pods": summarize_pods,
+    "services": summarize_services,
+}
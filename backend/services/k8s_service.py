@@ -1,106 +1,258 @@
 # devspace/backend/services/k8s_service.py
-from kubernetes import client, config as k8s_config_loader
+from kubernetes import client
 import yaml # For parsing YAML strings
-import json # For parsing k8s_environments_json
+import re
+
+from config import config as app_config
+
+from services.k8s_applier import k8s_applier, parse_manifest
+from services.k8s_client_pool import k8s_client_pool
+from services.k8s_fanout import fan_out
+from services.k8s_informer_cache import k8s_informer_cache, LIST_METHODS
+from services.k8s_log_streamer import LogLineFilter, open_log_streams, merge_log_streams, tail_within_budget
+from services.k8s_projections import PROJECTIONS, SUMMARIES, select_fields
+from services.space_service import SpaceService
+
+space_service_instance = SpaceService()
+
+CACHE_CONTINUE_PREFIX = "cache:" # Continue tokens for pages served from an informer are "cache:<offset>"
 
 class K8sService:
     def __init__(self):
-        self.active_clients = {} # Cache clients: {"context_name": {"core_v1": ..., "apps_v1": ...}}
+        self.client_pool = k8s_client_pool
+        self.informer_cache = k8s_informer_cache
+        self.applier = k8s_applier
         print("K8sService initialized.")
 
+    def _get_environment_config(self, space_id: str, environment_key: str) -> dict:
+        snapshot = space_service_instance.get_config_snapshot(space_id) # Cached and pre-parsed
+        dev = snapshot.dev if snapshot else None
+        if dev and dev.k8s_environments_invalid:
+            raise ValueError(f"Invalid K8s environment config for space {space_id}")
+        if not dev or not dev.k8s_environments:
+            raise ValueError(f"K8s environment config not found for space {space_id}")
+        target_env_config = dev.k8s_environments.get(environment_key)
+        if not target_env_config:
+            raise ValueError(f"K8s config for environment '{environment_key}' not found in space {space_id}")
+        return target_env_config
+
+    def get_environment(self, space_id: str, environment_key: str) -> dict:
+        """{"clients", "namespace"} for an environment of a space. Raises ValueError/ConnectionError."""
+        env_config = self._get_environment_config(space_id, environment_key)
+        return {"clients": self.client_pool.get_clients(env_config), "namespace": env_config.get("namespace")}
+
+    def get_clients_for_context(self, k8s_context_name: str = None) -> dict:
+        """Pooled clients for a kubeconfig context by name (None: the current context), e.g. for ops spaces."""
+        return self.client_pool.get_clients({"context": k8s_context_name} if k8s_context_name else {})
+
     def _get_k8s_api_clients(self, space_id: str, environment_key: str = 'test'):
         """
-        Loads K8s config for a specific environment of a space and returns API clients.
-        'environment_key' could be 'test', 'grayscale', 'production'.
+        Returns pooled API clients ({"core_v1", "apps_v1", "context_key", ...}) for an environment of a
+        space. 'environment_key' could be 'test', 'grayscale', 'production'; its entry in the space's
+        k8s_environments_json names the kubeconfig context, cluster URL or in-cluster config to use.
         """
-        # TODO: Fetch DevSpaceConfig for space_id
-        # from services.space_service import space_service_instance
-        # dev_config_model = space_service_instance.get_dev_config_object(space_id)
-        # if not dev_config_model or not dev_config_model.k8s_environments_json:
-        #     raise ValueError(f"K8s environment config not found for space {space_id}")
-        # envs = json.loads(dev_config_model.k8s_environments_json)
-        # target_env_config = envs.get(environment_key)
-        # if not target_env_config or not target_env_config.get("context"): # Assuming context is stored
-        #     raise ValueError(f"K8s config for environment '{environment_key}' not found in space {space_id}")
-        # context_name = target_env_config["context"]
-        
-        # For MOCKING, let's assume a context name can be derived or is fixed for testing
-        context_name = f"mock_context_for_space_{space_id}_env_{environment_key}" # Placeholder
-        
-        if context_name in self.active_clients:
-            return self.active_clients[context_name]
+        return self.client_pool.get_clients(self._get_environment_config(space_id, environment_key))
+
+    def _list_direct(self, clients: dict, kind: str, namespace: str, label_selector: str, field_selector: str,
+                     limit: int, continue_token: str) -> dict:
+        """Lists from the API server, one page of 'limit' or (limit None) all pages up to K8S_LIST_MAX_OBJECTS."""
+        api_key, namespaced_method, _ = LIST_METHODS[kind]
+        list_fn = getattr(clients[api_key], namespaced_method)
+        items, remaining = [], limit or app_config.K8S_LIST_MAX_OBJECTS
+        while True:
+            kwargs = {"namespace": namespace, "limit": min(remaining, app_config.K8S_LIST_MAX_LIMIT), "timeout_seconds": 10}
+            if label_selector: kwargs["label_selector"] = label_selector
+            if field_selector: kwargs["field_selector"] = field_selector
+            if continue_token: kwargs["_continue"] = continue_token
+            ret = list_fn(**kwargs)
+            items.extend(PROJECTIONS[kind](i) for i in ret.items)
+            remaining -= len(ret.items)
+            continue_token = ret.metadata._continue
+            if not continue_token or remaining <= 0:
+                break
+        return {
+            "success": True,
+            "resources": items,
+            "continue": continue_token or None,
+            "truncated": bool(continue_token) and limit is None, # Hit K8S_LIST_MAX_OBJECTS
+            "resource_version": ret.metadata.resource_version,
+            "from_cache": False,
+        }
 
+    def list_resources(self, space_id: str, environment_key: str, resource_type: str, namespace: str, label_selector: str = None,
+                       field_selector: str = None, limit: int = None, continue_token: str = None, fields: list = None):
+        """
+        Lists pods, deployments or services as compact dicts (see k8s_projections), optionally only
+        the projection keys in 'fields'. Served from the shared informer cache; if the informer is not
+        usable (or the field selector needs the API server), falls back to a paginated direct list.
+        With 'limit', one page is returned and "continue" is the token for the next page (None at the
+        end); tokens from either source are only valid with the same source and filters.
+        """
+        if resource_type.lower() not in PROJECTIONS:
+            return {"success": False, "error": f"Unsupported resource type: {resource_type}"}
         try:
-            print(f"SERVICE-K8S: Loading K8s config for context: {context_name}")
-            # k8s_config_loader.load_kube_config(context=context_name) # Use specific context
-            k8s_config_loader.load_kube_config() # For now, use default context for simplicity
-            
-            clients = {
-                "core_v1": client.CoreV1Api(),
-                "apps_v1": client.AppsV1Api(),
-                # Add other API groups as needed: BatchV1Api for Jobs/CronJobs, etc.
-            }
-            self.active_clients[context_name] = clients # Cache it
-            return clients
-        except k8s_config_loader.ConfigException as e:
-            print(f"SERVICE-K8S ERROR: Could not load K8s config for context '{context_name}': {e}")
-            raise ConnectionError(f"Failed to connect to K8s for context {context_name}: {e}")
-
-
-    def list_resources(self, space_id: str, environment_key: str, resource_type: str, namespace: str):
-        clients = self._get_k8s_api_clients(space_id, environment_key)
-        core_v1 = clients["core_v1"]
-        apps_v1 = clients["apps_v1"]
+            clients = self._get_k8s_api_clients(space_id, environment_key)
+        except (ValueError, ConnectionError) as e:
+            return {"success": False, "error": str(e)}
         print(f"SERVICE-K8S: Listing {resource_type} in ns '{namespace}' for env '{environment_key}' of space '{space_id}'")
-        
-        items = []
-        if resource_type.lower() == "pods":
-            ret = core_v1.list_namespaced_pod(namespace=namespace, watch=False, limit=50)
-            items = [{"name": i.metadata.name, "status": i.status.phase} for i in ret.items]
-        elif resource_type.lower() == "deployments":
-            ret = apps_v1.list_namespaced_deployment(namespace=namespace, watch=False, limit=50)
-            items = [{"name": i.metadata.name, "replicas": i.spec.replicas, "ready": i.status.ready_replicas or 0} for i in ret.items]
-        # Add more resource types (services, statefulsets, etc.)
+        return self._list_with_clients(clients, resource_type.lower(), namespace, label_selector, field_selector, limit, continue_token, fields)
+
+    def _list_with_clients(self, clients: dict, kind: str, namespace: str, label_selector: str = None, field_selector: str = None,
+                           limit: int = None, continue_token: str = None, fields: list = None) -> dict:
+        if limit is not None:
+            limit = max(1, min(int(limit), app_config.K8S_LIST_MAX_LIMIT))
+
+        cached = {"success": False, "error": "API server continue token"}
+        if not continue_token or continue_token.startswith(CACHE_CONTINUE_PREFIX):
+            cached = self.informer_cache.list(clients["context_key"], kind, namespace, clients, label_selector, field_selector)
+        if cached["success"]:
+            items = cached["items"]
+            offset_text = continue_token[len(CACHE_CONTINUE_PREFIX):] if continue_token else "0"
+            if not offset_text.isdigit():
+                return {"success": False, "error": f"Invalid continue token: {continue_token}"}
+            offset = int(offset_text)
+            end = len(items) if limit is None else offset + limit
+            result = {"success": True, "resources": items[offset:end], "total": len(items),
+                      "continue": f"{CACHE_CONTINUE_PREFIX}{end}" if end < len(items) else None,
+                      "resource_version": cached["resource_version"], "from_cache": True}
+        elif (continue_token or "").startswith(CACHE_CONTINUE_PREFIX):
+            return {"success": False, "error": "The cached listing is no longer available; start the listing again without a continue token."}
         else:
-            return {"success": False, "error": f"Unsupported resource type: {resource_type}"}
-        return {"success": True, "resources": items}
+            print(f"SERVICE-K8S: Informer not used for {kind} in '{namespace}' ({cached['error']}), listing directly")
+            try:
+                result = self._list_direct(clients, kind, namespace, label_selector, field_selector, limit, continue_token)
+            except client.ApiException as e:
+                if e.status == 401: # Expired credentials: rebuild the client on the next call
+                    self.client_pool.invalidate(clients["context_key"])
+                if e.status == 410:
+                    return {"success": False, "error": "The continue token has expired; start the listing again without it."}
+                return {"success": False, "error": f"Kubernetes API Error: {e.reason} (Status: {e.status})"}
+        if fields:
+            result["resources"] = [select_fields(item, fields) for item in result["resources"]]
+        return result
+
+    def summarize_resources(self, space_id: str, environment_key: str, resource_type: str, namespace: str,
+                            label_selector: str = None, field_selector: str = None, top_n: int = 10):
+        """
+        Aggregate view instead of the items: pods by phase, restart histogram and waiting reasons,
+        deployments not fully available, services by type, each with the 'top_n' worst offenders.
+        """
+        result = self.list_resources(space_id, environment_key, resource_type, namespace, label_selector, field_selector)
+        if not result["success"]:
+            return result
+        kind = resource_type.lower()
+        return {
+            "success": True,
+            "resource_type": kind,
+            "namespace": namespace,
+            "summary": SUMMARIES[kind](result["resources"], max(0, int(top_n))),
+            "truncated": result.get("truncated", False),
+            "from_cache": result["from_cache"],
+        }
+
+    def get_workload_status(self, space_id: str, environment_key: str, namespaces, label_selector: str = None):
+        """
+        Deployments, pods and services matching 'label_selector' in one or more namespaces. All
+        (namespace, kind) lists run concurrently; a failing one is reported in "errors" as
+        {"namespace", "resource", "error"} while the others are still returned.
+        """
+        if isinstance(namespaces, str):
+            namespaces = [namespaces]
+        kinds = ("deployments", "pods", "services")
+        calls = {
+            (namespace, kind): (lambda namespace=namespace, kind=kind: self.list_resources(space_id, environment_key, kind, namespace, label_selector))
+            for namespace in namespaces for kind in kinds
+        }
+        status = {kind: [] for kind in kinds}
+        errors = []
+        for (namespace, kind), outcome in fan_out(calls).items():
+            result = outcome["result"] if outcome["success"] else {"success": False, "error": outcome["error"]}
+            if result["success"]:
+                status[kind].extend(result["resources"])
+            else:
+                errors.append({"namespace": namespace, "resource": kind, "error": result["error"]})
+        return {"success": len(errors) < len(calls), "partial": bool(errors) and len(errors) < len(calls), **status, "errors": errors}
+
+    # --- Pod logs ---
+    def stream_pod_logs(self, clients: dict, namespace: str, pod_names: list = None, label_selector: str = None,
+                        container: str = None, since_seconds: int = None, tail_lines: int = None, limit_bytes: int = None,
+                        pattern: str = None, min_level: str = None, follow: bool = False) -> dict:
+        """
+        Streams the logs of the named pods (or those matching 'label_selector'), every container unless
+        'container' is given, merged into one timestamp-ordered sequence. Lines are filtered by regex
+        'pattern' and 'min_level' while they are read. Returns {"success", "entries": <generator of
+        {"ts", "pod", "container", "message"}>, "targets", "errors"} or {"success": False, "error"}.
+        """
+        try:
+            line_filter = LogLineFilter(pattern, min_level)
+        except (re.error, ValueError) as e:
+            return {"success": False, "error": f"Invalid filter: {e}"}
+        pods = self._list_with_clients(clients, "pods", namespace, label_selector)
+        if not pods["success"]:
+            return pods
+        selected = [p for p in pods["resources"] if not pod_names or p["name"] in pod_names]
+        if pod_names and len(selected) < len(set(pod_names)):
+            missing = sorted(set(pod_names) - {p["name"] for p in selected})
+            return {"success": False, "error": f"Pod(s) not found in '{namespace}': {', '.join(missing)}"}
+        targets = [(p["name"], c) for p in selected for c in p["containers"] if not container or c == container]
+        if not targets:
+            return {"success": False, "error": "No matching pods/containers to read logs from."}
+        if len(targets) > app_config.K8S_LOG_MAX_STREAMS:
+            return {"success": False, "error": f"{len(targets)} containers match; narrow the selection to at most {app_config.K8S_LOG_MAX_STREAMS}."}
 
-    def apply_yaml_string(self, space_id: str, environment_key: str, namespace: str, yaml_string: str):
-        clients = self._get_k8s_api_clients(space_id, environment_key) # Ensures correct context
-        print(f"SERVICE-K8S: Applying YAML in ns '{namespace}' for env '{environment_key}' of space '{space_id}'")
+        print(f"SERVICE-K8S: Streaming logs of {len(targets)} container(s) in ns '{namespace}' (follow={follow})")
+        opened = open_log_streams(clients["core_v1"], namespace, targets, since_seconds=since_seconds, tail_lines=tail_lines,
+                                  limit_bytes=limit_bytes or app_config.K8S_LOG_LIMIT_BYTES, follow=follow)
+        if not opened["streams"]:
+            return {"success": False, "error": opened["errors"][0]["error"], "errors": opened["errors"]}
+        return {
+            "success": True,
+            "entries": merge_log_streams(opened["streams"], line_filter, follow=follow),
+            "targets": [{"pod": pod, "container": c} for pod, c, _r in opened["streams"]],
+            "errors": opened["errors"],
+        }
+
+    def tail_pod_logs(self, clients: dict, namespace: str, max_bytes: int = None, **stream_kwargs) -> dict:
+        """The most recent matching log lines that fit in 'max_bytes' (see stream_pod_logs for the filters)."""
+        result = self.stream_pod_logs(clients, namespace, **stream_kwargs)
+        if not result["success"]:
+            return result
+        tail = tail_within_budget(result["entries"], max_bytes or app_config.K8S_LOG_TOOL_MAX_BYTES)
+        return {"success": True, **tail, "targets": result["targets"], "errors": result["errors"]}
+
+    def informer_stats(self) -> dict:
+        return self.informer_cache.stats()
+
+    def client_pool_stats(self) -> dict:
+        return self.client_pool.stats()
+
+    def apply_manifest(self, clients: dict, namespace: str, yaml_string: str, dry_run: bool = False, force_conflicts: bool = False) -> dict:
+        """
+        Server-side applies every object of a YAML manifest (see K8sApplier.apply for the result shape);
+        namespaced objects without metadata.namespace go to 'namespace'.
+        """
         try:
-            yaml_objects = list(yaml.safe_load_all(yaml_string))
-            created_or_patched = []
-            for obj_data in yaml_objects:
-                if not obj_data: continue
-                # Using create_from_yaml_single_item which handles create or patch
-                # This requires the kubernetes client utils.
-                # Ensure namespace in YAML metadata is honored or overridden by provided namespace.
-                # For simplicity, let's assume the provided namespace takes precedence if obj_data doesn't have one.
-                if 'metadata' not in obj_data: obj_data['metadata'] = {}
-                obj_data['metadata']['namespace'] = obj_data['metadata'].get('namespace', namespace)
-                
-                # This is a simplified way. Kubernetes client has more robust methods.
-                # k8s_client_dynamic = client.dynamic.DynamicClient(client.ApiClient(configuration=k8s_config_loader.Configuration.get_default_copy()))
-                # api_version = obj_data["apiVersion"]
-                # kind = obj_data["kind"]
-                # resource_api = k8s_client_dynamic.resources.get(api_version=api_version, kind=kind)
-                # resource_api.server_side_apply(body=obj_data, field_manager="vibe-devops-platform")
-
-                # Fallback to a more direct approach if utils are not set up for this context
-                # This is a placeholder for robust apply logic.
-                # For actual apply, you'd often use the specific API client (e.g., apps_v1.create_namespaced_deployment)
-                # or a helper that handles create/patch logic based on resource kind.
-                print(f"Mock applying object: {obj_data.get('kind')}/{obj_data.get('metadata',{}).get('name')}")
-                created_or_patched.append(f"{obj_data.get('kind')}/{obj_data.get('metadata',{}).get('name')} apply action sent.")
-
-            if not created_or_patched:
-                 return {"success": False, "error": "No valid K8s objects found in YAML."}
-            return {"success": True, "message": "YAML applied successfully (mock).", "details": created_or_patched}
+            objects = parse_manifest(yaml_string)
         except yaml.YAMLError as ye:
             return {"success": False, "error": f"Invalid YAML: {str(ye)}"}
-        except Exception as e: # Catching FailToPatchError or others
-            return {"success": False, "error": f"Failed to apply YAML: {str(e)}"}
+        if not objects:
+            return {"success": False, "error": "No valid K8s objects found in YAML."}
+        if any(not isinstance(obj, dict) for obj in objects):
+            return {"success": False, "error": "Every YAML document must be a K8s object (a mapping)."}
+        result = self.applier.apply(clients, objects, namespace, dry_run=dry_run, force_conflicts=force_conflicts)
+        if not result["success"]:
+            failed = [r for r in result["results"] if r["action"] == "error"]
+            result["error"] = f"{len(failed)} of {len(objects)} objects failed, first: {failed[0]['kind']}/{failed[0]['name']}: {failed[0]['error']}"
+        return result
+
+    def apply_yaml_string(self, space_id: str, environment_key: str, namespace: str, yaml_string: str,
+                          dry_run: bool = False, force_conflicts: bool = False):
+        try:
+            clients = self._get_k8s_api_clients(space_id, environment_key) # Ensures correct context
+        except (ValueError, ConnectionError) as e:
+            return {"success": False, "error": str(e)}
+        print(f"SERVICE-K8S: Applying YAML in ns '{namespace}' for env '{environment_key}' of space '{space_id}' (dry_run={dry_run})")
+        return self.apply_manifest(clients, namespace, yaml_string, dry_run=dry_run, force_conflicts=force_conflicts)
 
     # TODO: Implement start_pod, stop_pod (delete pod), scale_deployment, etc.
     # These would use core_v1.delete_namespaced_pod, apps_v1.patch_namespaced_deployment_scale etc.
@@ -1,46 +1,78 @@
 # devspace/backend/services/llm_interaction_service.py
-import os
 import json
-from langchain_google_genai import ChatGoogleGenerativeAI
-from langchain.agents import AgentExecutor, create_tool_calling_agent # If using standard agent
+import uuid
+import asyncio
+import queue
+import threading
+from typing import Optional
+from langchain.agents import AgentExecutor
 # from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder # For history
-from langchain_core.messages import AIMessage, HumanMessage, ToolMessage # SystemMessage if needed
-from langchain.memory import ConversationBufferWindowMemory # <--- IMPORT MEMORY
-from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage, SystemMessage
+from langchain_core.callbacks import BaseCallbackHandler
 
 from config import config as app_config
+from core.ttl_lru_cache import TTLLRUCache
 from tools.dev_tools import get_all_dev_tools # Import the function that returns tool list
 from tools.ops_tools import get_all_ops_tools # Import for Ops
 from tools.common_tools import get_all_common_tools
+from tools.async_support import with_async_support
 from services.space_service import SpaceService # To get space-specific settings
 from services.chat_session_service import ChatSessionService # <--- IMPORT
-from database.db_session import SessionLocal # For direct session use if needed for saving
+from services.conversation_history_service import ConversationHistoryService, TokenBudgetChatMemory
+from services.prompt_assembly import AGENT_PROMPT, space_prompt_sections
+from services.usage_accounting_service import TurnUsageCallbackHandler
+from services.llm_router import llm_router, LLMRoute
+from database.db_session import get_db_session, db_session_scope, release_db_connection
 from database.models import ChatMessageRoleEnum # For saving messages with correct role
 from database.models import Space, SpaceTypeEnum, ChatMessage, ChatMessageRoleEnum
 
 
-# --- PROMPT TEMPLATE LOADING ---
-PROMPT_TEMPLATE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "prompts")
-DEVOPS_AGENT_PROMPT_FILE = os.path.join(PROMPT_TEMPLATE_DIR, "devops_agent_prompt_template.md")
-DEVOPS_AGENT_PROMPT_CONTENT = ""
+# --- PROMPT TEMPLATES ---
+HISTORY_SUMMARY_PROMPT = (
+    "You maintain a running summary of a DevOps assistant conversation.\n"
+    "Update the summary with the new messages below. Keep facts the assistant will need later: "
+    "goals, decisions, resource names, errors and their resolutions. Be concise (at most {max_words} words).\n\n"
+    "Current summary:\n{previous_summary}\n\nNew messages:\n{new_messages}\n\nUpdated summary:"
+)
+# --- END PROMPT TEMPLATES ---
 
 
+# --- STREAMING SUPPORT ---
+_STREAM_END = object() # Sentinel put on the event queue when a streamed turn has finished
 
-def load_prompt_template_from_file(file_path: str) -> str:
-    try:
-        with open(file_path, 'r', encoding='utf-8') as f:
-            return f.read()
-    except FileNotFoundError:
-        print(f"ERROR: Prompt template file not found at {file_path}")
-        # Fallback to a very basic template if file is missing
-        return "User: {input}\nAI: {agent_scratchpad}"
-    except Exception as e:
-        print(f"Error loading prompt template: {e}")
-        return "User: {input}\nAI: {agent_scratchpad}"
 
-# Load the template content once when the module is loaded
-DEVOPS_AGENT_PROMPT_CONTENT = load_prompt_template_from_file(DEVOPS_AGENT_PROMPT_FILE)
-# --- END PROMPT TEMPLATE LOADING ---
+class QueueStreamingCallbackHandler(BaseCallbackHandler):
+    """
+    Forwards LLM tokens and tool start/end events of one agent turn to 'emit(event_dict)'.
+    LangChain may call handlers from executor threads, so 'emit' must be thread-safe
+    (queue.Queue.put for the sync path, loop.call_soon_threadsafe for the async path).
+    """
+
+    def __init__(self, emit):
+        self.emit = emit
+        self._tool_names = {} # run_id -> tool name, so tool_end can report which tool finished
+
+    def on_llm_new_token(self, token: str, **kwargs):
+        if token:
+            self.emit({"event": "token", "data": {"text": token}})
+
+    def on_tool_start(self, serialized: dict, input_str: str, *, run_id=None, **kwargs):
+        tool_name = (serialized or {}).get("name") or kwargs.get("name") or "unknown_tool"
+        self._tool_names[str(run_id)] = tool_name
+        self.emit({"event": "tool_start", "data": {
+            "run_id": str(run_id), "tool_name": tool_name, "tool_input": kwargs.get("inputs") or input_str
+        }})
+
+    def on_tool_end(self, output, *, run_id=None, **kwargs):
+        self.emit({"event": "tool_end", "data": {
+            "run_id": str(run_id), "tool_name": self._tool_names.pop(str(run_id), None), "tool_output": str(output)
+        }})
+
+    def on_tool_error(self, error: BaseException, *, run_id=None, **kwargs):
+        self.emit({"event": "tool_error", "data": {
+            "run_id": str(run_id), "tool_name": self._tool_names.pop(str(run_id), None), "error": str(error)
+        }})
+# --- END STREAMING SUPPORT ---
 
 
 # This service will now set up a more real agent
@@ -48,44 +80,48 @@ class LLMInteractionService:
     def __init__(self):
         self.space_service = SpaceService() # Or inject
         self.chat_session_service = ChatSessionService() # <--- INSTANTIATE
-        self.agent_executors_cache = {} # Cache agent executors: key e.g. "space_id_dev"
+        self.history_service = ConversationHistoryService()
+        # Two-level cache: the LLM client, tool list and agent runnable are shared by every session
+        # of a space; the AgentExecutor + its TokenBudgetChatMemory are per chat session so
+        # sessions in the same space never see each other's history.
+        self.agent_components_cache = TTLLRUCache(
+            "agent_components",
+            max_entries=app_config.AGENT_CACHE_MAX_SPACES,
+            idle_ttl_seconds=app_config.AGENT_CACHE_IDLE_TTL_SECONDS,
+        )
+        self.session_executors_cache = TTLLRUCache(
+            "session_executors",
+            max_entries=app_config.AGENT_CACHE_MAX_SESSIONS,
+            idle_ttl_seconds=app_config.AGENT_CACHE_IDLE_TTL_SECONDS,
+            on_evict=self._on_session_executor_evicted,
+        )
+        self._background_turns = set() # Strong refs to in-flight async streamed turns
         print("LLMInteractionService initialized (for real tool usage).")
-    
-    def _get_space_specific_context_for_prompt(self, space_id: str, space_type: str):
-        """Fetches and formats space-specific details for the prompt."""
-        git_repo_url = "N/A"
-        k8s_environments_summary = "Not configured or N/A for this space type."
-        monitored_workloads_summary = "N/A"
-        aiops_skills_summary = "N/A"
-        app_blueprint_version = "N/A (no active blueprint)" # TODO: Get from space config or session
-
-        if space_type == "dev":
-            dev_config = self.space_service.get_dev_config_object(space_id) # Fetches ORM object
-            if dev_config:
-                git_repo_url = dev_config.git_repo_url or "Not configured"
-                if dev_config.k8s_environments_json:
-                    try:
-                        envs = json.loads(dev_config.k8s_environments_json)
-                        env_names = [val.get("name", key) for key, val in envs.items()]
-                        k8s_environments_summary = f"Configured for: {', '.join(env_names)}" if env_names else "No K8s environments defined."
-                    except json.JSONDecodeError:
-                        k8s_environments_summary = "Error parsing K8s environment config."
-        elif space_type == "ops":
-            ops_config = self.space_service.get_ops_config_object(space_id) # Fetches ORM object
-            if ops_config:
-                # TODO: Populate monitored_workloads_summary and aiops_skills_summary from ops_config
-                monitored_workloads_summary = ops_config.monitored_workloads_metadata_json or "Not specified"
-                aiops_skills_summary = ops_config.aiops_skills_config_json or "Default skills"
 
+    def _on_session_executor_evicted(self, session_id, entry, reason):
+        # Only drop the reference: a turn still running on this executor keeps working, and the
+        # next turn for the session rebuilds its memory from the DB.
+        if reason != "duplicate":
+            print(f"SERVICE-LLM: Dropped cached executor for session {session_id} ({reason})")
 
+    def get_agent_cache_stats(self) -> dict:
+        # Opportunistically drop idle entries so 'size' reflects live executors
+        self.agent_components_cache.sweep()
+        self.session_executors_cache.sweep()
         return {
-            "git_repo_url": git_repo_url,
-            "k8s_environments_summary": k8s_environments_summary,
-            "monitored_workloads_summary": monitored_workloads_summary,
-            "aiops_skills_summary": aiops_skills_summary,
-            "app_blueprint_version": app_blueprint_version, # This needs to come from session or Space config
-            "current_task_context": "Currently focusing on general assistance." # TODO: Make this dynamic
+            "agent_components": self.agent_components_cache.stats(),
+            "session_executors": self.session_executors_cache.stats(),
+            "space_prompt_sections": space_prompt_sections.stats(),
+            "llm_clients": llm_router.stats(),
         }
+
+    def invalidate_space_agents(self, space_id: str) -> int:
+        """Drops cached agent components and session executors for a space (e.g. after its LLM settings change)."""
+        space_id = str(space_id)
+        dropped = self.agent_components_cache.pop_where(lambda key, _v: key[0] == space_id)
+        dropped += self.session_executors_cache.pop_where(lambda _k, entry: entry["space_key"][0] == space_id)
+        return dropped
+    
     def _convert_db_messages_to_langchain_history(self, db_messages: list) -> list:
         lc_messages = []
         for msg in db_messages:
@@ -121,29 +157,9 @@ class LLMInteractionService:
                 lc_messages.append(SystemMessage(content=content))
         return lc_messages
 
-    def _get_or_create_agent_executor(self, db_session, space_id: str, space_type: str, session_id: str):
-        cache_key = f"{space_id}_{space_type}"
-        if cache_key in self.agent_executors_cache:
-            #return self.agent_executors_cache[cache_key]
-            return self.agent_executors_cache[cache_key]["executor"], self.agent_executors_cache[cache_key]["memory"] 
-
-        print(f"SERVICE-LLM: Creating new agent executor for space {space_id}, type {space_type}")
-        
-        # Fetch space-specific LLM settings (API key, model)
-        # backend_settings = self.space_service.get_backend_settings(space_id) # This returns a dict
-        # For now, use global config for simplicity; in prod, use space-specific settings
-        llm_api_key = app_config.GOOGLE_API_KEY
-        llm_model_name = app_config.DEFAULT_LLM_MODEL # Or from backend_settings
-
-        if not llm_api_key or llm_api_key == "YOUR_GOOGLE_API_KEY_HERE_IF_NO_ENV_VAR":
-             raise ValueError("Google API Key not configured for LLM service.")
-
-        llm = ChatGoogleGenerativeAI(
-            model=llm_model_name,
-            google_api_key=llm_api_key,
-            convert_system_message_to_human=True, # Important for Gemini tool calling
-            temperature=0.2 # More deterministic for tool use
-        )
+    def _build_agent_components(self, space_id: str, space_type: str, route: LLMRoute) -> dict:
+        print(f"SERVICE-LLM: Building agent components for space {space_id}, type {space_type}, "
+              f"model {route.primary} (tool steps: {route.tool_step or 'same'}, fallbacks: {', '.join(map(str, route.fallbacks)) or 'none'})")
 
         tools_for_agent = []
         if space_type == "dev":
@@ -154,148 +170,355 @@ class LLMInteractionService:
 
         if not tools_for_agent:
             print(f"WARNING: No tools configured for space type {space_type}")
-        
-        # --- MEMORY SETUP ---
-        # k=5 means it remembers the last 5 turns (user + AI = 1 turn)
-        # `memory_key` must match the `MessagesPlaceholder` variable_name for chat history
-        # `input_key` tells memory what the user's input variable is named in the chain.
-        # `output_key` (optional for some agents) tells memory where the AI's final response is.
-        # `return_messages=True` ensures memory stores and returns LangChain message objects.
-        #memory = ConversationBufferWindowMemory(
-        #    k=10, # Remember last 10 interactions (user + AI)
-        #    memory_key="chat_history", 
-        #    input_key="input", # Matches the key in agent_executor.invoke
-        #    output_key="output", # Matches the key in agent_executor response
-        #    return_messages=True
-        #)
-        # --- END MEMORY SETUP ---
-        
-
-        # --- MEMORY SETUP ---
-        # Fetch history from DB for this session
-        raw_chat_history = self.chat_session_service.get_langchain_formatted_chat_history(
-            db_session, session_id, window_k=app_config.AGENT_MAX_ITERATIONS # Or a specific window like 10
-        )
-        langchain_chat_history = self._convert_db_messages_to_langchain_history(raw_chat_history)
-       
- 
-        memory = ConversationBufferWindowMemory(
-            k=app_config.AGENT_MAX_ITERATIONS + 5, # Window slightly larger than max iterations
+        # Attach coroutines so the same components serve both invoke() and ainvoke()
+        tools_for_agent = with_async_support(tools_for_agent)
+
+        # Models come from the router's shared client pool; AGENT_PROMPT is compiled once at import
+        agent = llm_router.build_agent(route, tools_for_agent, AGENT_PROMPT)
+        return {"llm": llm_router.build_utility_llm(route), "tools": tools_for_agent, "agent": agent, "route": route}
+
+    def _build_session_memory(self, db_session, session_id: str) -> TokenBudgetChatMemory:
+        # `memory_key` must match the chat history variable in the prompt template,
+        # `input_key`/`output_key` match the agent_executor.invoke payload and response.
+        memory = TokenBudgetChatMemory(
+            # Same room as the window, so pruning after a turn cannot drop messages the summary lacks
+            max_token_limit=app_config.HISTORY_MAX_TOKENS + self.history_service.unfolded_overflow_tokens(),
             memory_key="chat_history",
             input_key="input",
             output_key="output", # Check if agent output key matches this
             return_messages=True
         )
-        # Load fetched history into memory
+        self._load_session_history(db_session, session_id, memory)
+        return memory
+
+    def _load_session_history(self, db_session, session_id: str, memory: TokenBudgetChatMemory) -> Optional[str]:
+        """(Re)fills 'memory' from the DB, records the summary watermark it was loaded at and returns that summary."""
+        # Newest messages that fit the token budget plus not-yet-folded overflow; anything older lives in ChatSession.summary
+        history_window = self.history_service.get_budgeted_history(db_session, session_id)
+        langchain_chat_history = self._convert_db_messages_to_langchain_history(history_window["messages"])
+        memory.chat_memory.clear()
         for msg in langchain_chat_history:
             if isinstance(msg, HumanMessage): memory.chat_memory.add_user_message(msg.content)
             elif isinstance(msg, AIMessage): memory.chat_memory.add_ai_message(msg.content)
             # TODO: Handle ToolMessages correctly for memory if needed by agent type
+        memory.summary_through_message_id = history_window["summary_through_message_id"]
+        return history_window["summary"]
+
+    def _get_or_create_agent_executor(self, db_session, space_id: str, space_type: str, session_id: str):
+        space_key = (str(space_id), space_type)
+        route = llm_router.resolve_route(self.space_service.get_config_snapshot(space_id))
+        # peek() does not count as a lookup: get_or_create below records exactly one hit or miss per cache
+        components = self.agent_components_cache.peek(space_key)
+        if components and components["route"] != route:
+            # The space's LLM settings changed: rebuild its agent, drop its sessions' executors
+            print(f"SERVICE-LLM: LLM route of space {space_id} changed to {route.primary}")
+            self.invalidate_space_agents(space_id)
+        cached = self.session_executors_cache.peek(session_id)
+        if cached and cached["space_key"] != space_key:
+            # Session moved to another space/type (should not happen); never reuse its history
+            self.session_executors_cache.pop(session_id)
+
+        entry = self.session_executors_cache.get_or_create(
+            session_id, lambda: self._build_session_executor(db_session, space_id, space_type, session_id, route)
+        )
+        return entry["executor"], entry["memory"]
 
-        prompt = ChatPromptTemplate.from_template(DEVOPS_AGENT_PROMPT_CONTENT)
+    def _build_session_executor(self, db_session, space_id: str, space_type: str, session_id: str, route: LLMRoute) -> dict:
+        space_key = (str(space_id), space_type)
+        components = self.agent_components_cache.get_or_create(
+            space_key, lambda: self._build_agent_components(space_id, space_type, route)
+        )
 
-        agent = create_tool_calling_agent(llm, tools_for_agent, prompt)
+        print(f"SERVICE-LLM: Creating agent executor for session {session_id} (space {space_id}, type {space_type})")
+        memory = self._build_session_memory(db_session, session_id)
         agent_executor = AgentExecutor(
-            agent=agent,
-            tools=tools_for_agent,
-            memory=memory, # <--- PASS MEMORY TO EXECUTOR
+            agent=components["agent"],
+            tools=components["tools"],
+            memory=memory, # <--- Per-session memory, never shared across sessions
             verbose=True, # Very helpful for debugging agent steps
             handle_parsing_errors="Please reformat your tool call or response.", # Custom message
             max_iterations=app_config.AGENT_MAX_ITERATIONS,
             return_intermediate_steps=True # If you want to see thoughts/tool calls
         )
-        self.agent_executors_cache[cache_key] = {"executor": agent_executor, "memory": memory}
-        return agent_executor, memory
+        return {"executor": agent_executor, "memory": memory, "space_key": space_key}
 
-    def process_message_with_llm_and_tools(self, user_message: str, space_id: str, space_type: str,  session_id: str):
-        print(f"SERVICE-LLM: Processing (DB history): '{user_message}' for space {space_id} ({space_type}) session {session_id}")
-        
-        db = SessionLocal() # Create a new session for this interaction
-        try:
-            # 1. Save User's message
-            self.chat_session_service.add_message_to_session(db, session_id, "user", user_message)
-            # db.commit() // Commit after all messages for this turn are added
+    def _build_invoke_payload(self, user_message: str, space_id: str, space_type: str, conversation_summary: str = None) -> dict:
+        # The space section is rendered once per config version; only input and summary vary per turn
+        snapshot = self.space_service.get_config_snapshot(space_id)
+        return {
+            "input": user_message,
+            "space_context": space_prompt_sections.get(space_id, space_type, snapshot),
+            "conversation_summary": conversation_summary or "None yet.",
+            # 'chat_history' is handled by memory, 'agent_scratchpad' by agent internals
+        }
 
-            agent_executor, _memory_instance = self._get_or_create_agent_executor(db, space_id, space_type, session_id)
-            
-            prompt_context = self._get_space_specific_context_for_prompt( space_id, space_type)
-            
-            # invoke_payload = { "input": user_message, **prompt_context }
-            # chat_history is now handled by the memory object within agent_executor
-            invoke_payload = {
-                "input": user_message,
-                "space_id": space_id,
-                "space_type": space_type,
-                "git_repo_url": prompt_context["git_repo_url"],
-                "k8s_environments_summary": prompt_context["k8s_environments_summary"],
-                "monitored_workloads_summary": prompt_context["monitored_workloads_summary"],
-                "aiops_skills_summary": prompt_context["aiops_skills_summary"],
-                "app_blueprint_version": prompt_context["app_blueprint_version"],
-                "current_task_context": prompt_context["current_task_context"],
-                # 'chat_history' is handled by memory, 'tools' and 'agent_scratchpad' by agent internals
-            }  
+    def _build_turn_messages(self, user_message: str, final_llm_message: str, intermediate_steps: list,
+                             usage: TurnUsageCallbackHandler = None):
+        """
+        Builds the chronological message rows for one turn (user input, tool call/result pairs,
+        final assistant reply) for a single bulk insert. Returns (messages, tool_executions_for_frontend).
+        With 'usage', tool_result rows carry their tool's run time and the final assistant row the
+        turn's LLM tokens and time (per-call breakdown in its metadata).
+        """
+        turn_id = uuid.uuid4().hex[:12] # Scopes fallback tool-call IDs to this turn
+        messages = [{"role": "user", "content": user_message}]
+        tool_executions_for_frontend = []
+        for step_index, (agent_action, observation) in enumerate(intermediate_steps or []):
+            tool_name = agent_action.tool
+            tool_input = agent_action.tool_input
+            # Tool-calling agents carry the model's own call ID (ToolAgentAction.tool_call_id);
+            # otherwise derive a stable one from the step index.
+            tool_call_id_for_result = getattr(agent_action, "tool_call_id", None) or f"tool_call_{turn_id}_{step_index}"
+
+            # LLM's request to call a tool (as an assistant message with tool_call metadata)
+            messages.append({
+                "role": "assistant",
+                "content": f"Okay, I need to use the tool: {tool_name} with input: {json.dumps(tool_input)}.",
+                "metadata": {"type": "tool_call_request", "tool_name": tool_name, "tool_input": tool_input, "tool_call_id": tool_call_id_for_result},
+            })
+            # The actual Tool's result
+            tool_run = usage.take_tool_run(tool_name, tool_input) if usage else None
+            tool_latency_ms = tool_run["latency_ms"] if tool_run else None
+            messages.append({
+                "role": "tool_result",
+                "content": str(observation), # Tool output content
+                "metadata": {"tool_name": tool_name, "tool_call_id": tool_call_id_for_result, "status": "success"}, # Assume success for now
+                "usage": {"latency_ms": tool_latency_ms},
+            })
+            tool_executions_for_frontend.append({
+                "tool_name": tool_name,
+                "tool_arguments": tool_input,
+                "tool_output": {"message": str(observation), "raw": observation}, # Adapt based on tool output structure
+                "status": "success",
+                "latency_ms": tool_latency_ms,
+            })
+
+        if final_llm_message:
+            messages.append({"role": "assistant", "content": final_llm_message})
+        if usage and usage.llm_calls:
+            # The final reply, or the user's row if the model returned nothing, carries the turn's LLM usage
+            turn_row = messages[-1] if messages[-1]["role"] == "assistant" and "metadata" not in messages[-1] else messages[0]
+            turn_row["usage"] = usage.turn_usage()
+            turn_row["metadata"] = {**(turn_row.get("metadata") or {}), "llm_calls": usage.llm_calls}
+        return messages, tool_executions_for_frontend
+
+    def _prepare_turn(self, user_message: str, space_id: str, space_type: str, session_id: str):
+        """
+        First half of a turn: resolve the executor (loading history from the DB on a cache miss)
+        and build the invoke payload. The DB session is closed before the LLM round trip starts,
+        so no connection is held while waiting on the model. The user's message is written
+        together with the rest of the turn in _complete_turn.
+        Inside the turn's db_session_scope() the space/config rows loaded here stay in the scope's
+        identity map, so the tools of this turn read them without new sessions or queries.
+        """
+        with get_db_session() as db:
+            agent_executor, memory = self._get_or_create_agent_executor(db, space_id, space_type, session_id)
+            conversation_summary, summary_through_message_id = self.history_service.get_summary_state(db, session_id)
+            if summary_through_message_id != memory.summary_through_message_id:
+                # Turns were folded into the summary since the cached memory was loaded: reload it
+                # from the window so the prompt does not carry them twice (summary read with the window)
+                conversation_summary = self._load_session_history(db, session_id, memory)
+            invoke_payload = self._build_invoke_payload(user_message, space_id, space_type, conversation_summary)
+        release_db_connection() # Return the connection to the pool for the LLM round trip
+        return agent_executor, invoke_payload
+
+    def _summarize_history(self, space_key: tuple, previous_summary: str, messages: list) -> str:
+        """Folds 'messages' into 'previous_summary' with the space's LLM; extractive fallback on failure."""
+        components = self.agent_components_cache.peek(space_key) # Not a turn lookup; keep hit stats clean
+        if components:
+            new_messages = "\n".join(f"{m['role']}: {m['content']}" for m in messages)
+            prompt = HISTORY_SUMMARY_PROMPT.format(
+                max_words=int(app_config.HISTORY_SUMMARY_MAX_TOKENS * 0.75),
+                previous_summary=previous_summary or "(empty)",
+                new_messages=new_messages,
+            )
+            try:
+                return components["llm"].invoke(prompt).content
+            except Exception as e:
+                print(f"SERVICE-LLM WARNING: LLM summarization failed, using extractive summary: {e}")
+        return ConversationHistoryService.extractive_summary(previous_summary, messages)
+
+    def _complete_turn(self, session_id: str, user_message: str, agent_response: dict, space_key: tuple = None,
+                       usage: TurnUsageCallbackHandler = None) -> dict:
+        """Second half of a turn: persist all of its messages in one transaction, build the API response."""
+        print(f"SERVICE-LLM: Agent executor response: {agent_response}")
+        final_llm_message = agent_response.get("output", "I apologize, I could not process that.")
+        messages, tool_executions_for_frontend = self._build_turn_messages(
+            user_message, final_llm_message, agent_response.get("intermediate_steps"), usage
+        )
 
-            print(f"SERVICE-LLM: Invoking agent executor with input and context keys: {list(invoke_payload.keys())}")
-            agent_response = agent_executor.invoke(invoke_payload)
-            print(f"SERVICE-LLM: Agent executor response: {agent_response}")
+        with get_db_session() as db:
+            if self.chat_session_service.add_messages_to_session(db, session_id, messages) is None:
+                raise RuntimeError(f"Failed to persist turn for session {session_id}.")
 
-            final_llm_message = agent_response.get("output", "I apologize, I could not process that.")
-            
-            # 2. Save LLM's final assistant message
-            if final_llm_message:
-                self.chat_session_service.add_message_to_session(db, session_id, "assistant", final_llm_message)
-
-            tool_executions_for_frontend = []
-            if agent_response.get("intermediate_steps"):
-                for step_index, (agent_action, observation) in enumerate(agent_response["intermediate_steps"]):
-                    # For Gemini, agent_action.tool_call_id might be needed if it's a ToolCallingAgent
-                    # And agent_action might be a list of ToolInvocation objects
-                    # This part needs to be adapted based on the exact structure of AgentAction for Gemini function calling
-                    tool_name = agent_action.tool
-                    tool_input = agent_action.tool_input
-                    tool_call_id_for_result = f"tool_call_{session_id}_{len(db.query(ChatMessage).filter_by(session_id=session_id).all()) + step_index}" # Generate a unique ID
-
-                    # 2a. Save LLM's request to call a tool (as an assistant message with tool_call metadata)
-                    # Or as a specific ChatMessageRoleEnum.TOOL_CALL
-                    # For Gemini, AIMessage can have `tool_calls` attribute.
-                    # Let's represent the LLM's decision to call a tool
-                    self.chat_session_service.add_message_to_session(
-                        db, session_id, "assistant", 
-                        f"Okay, I need to use the tool: {tool_name} with input: {json.dumps(tool_input)}.", # Or empty content if tool_calls in metadata
-                        metadata={"type": "tool_call_request", "tool_name": tool_name, "tool_input": tool_input, "tool_call_id": tool_call_id_for_result}
-                    )
-                    
-                    # 2b. Save the actual Tool's result
-                    self.chat_session_service.add_message_to_session(
-                        db, session_id, "tool_result", 
-                        str(observation), # Tool output content
-                        metadata={"tool_name": tool_name, "tool_call_id": tool_call_id_for_result, "status": "success"} # Assume success for now
-                    )
-                    tool_executions_for_frontend.append({
-                        "tool_name": tool_name,
-                        "tool_arguments": tool_input,
-                        "tool_output": {"message": str(observation), "raw": observation}, # Adapt based on tool output structure
-                        "status": "success"
-                    })
-            
-            db.commit() # Commit all messages for this turn
+        if space_key:
+            # Fold turns that fell out of the history window into the session summary (off the request path)
+            self.history_service.schedule_summary_refresh(
+                session_id, lambda previous, msgs: self._summarize_history(space_key, previous, msgs)
+            )
 
-            token_info = {"message": f"Session {session_id[-8:]} updated. Token usage mock."}
+        token_info = self._token_info(session_id, messages, usage)
+        return {
+            "llm_message": final_llm_message,
+            "tool_executions": tool_executions_for_frontend,
+            "token_info": token_info,
+            "session_id": session_id
+        }
 
-            return {
-                "llm_message": final_llm_message,
-                "tool_executions": tool_executions_for_frontend,
-                "token_info": token_info,
-                "session_id": session_id
-            }
+    def _token_info(self, session_id: str, messages: list, usage: TurnUsageCallbackHandler = None) -> dict:
+        """Usage of the turn for the API response (and the log)."""
+        if not usage:
+            return {"message": f"Session {session_id[-8:]} updated."}
+        turn = usage.turn_usage()
+        tool_latency_ms = sum((m.get("usage") or {}).get("latency_ms") or 0 for m in messages if m["role"] == "tool_result")
+        token_info = {
+            "prompt_tokens": turn["prompt_tokens"],
+            "completion_tokens": turn["completion_tokens"],
+            "cached_tokens": turn["cached_tokens"],
+            "total_tokens": turn["prompt_tokens"] + turn["completion_tokens"],
+            "llm_calls": len(usage.llm_calls),
+            "llm_latency_ms": turn["latency_ms"],
+            "tool_latency_ms": tool_latency_ms,
+        }
+        token_info["message"] = (f"Session {session_id[-8:]} updated. {token_info['total_tokens']} tokens "
+                                 f"({turn['cached_tokens']} cached) in {token_info['llm_calls']} LLM calls.")
+        print(f"SERVICE-USAGE: Turn for session {session_id}: {token_info}")
+        return token_info
+
+    def _persist_user_message_only(self, session_id: str, user_message: str, usage: TurnUsageCallbackHandler = None):
+        # Failed turns still keep the user's input in the session history (and the tokens they cost)
+        message = {"role": "user", "content": user_message}
+        if usage and usage.llm_calls:
+            message.update({"usage": usage.turn_usage(), "metadata": {"llm_calls": usage.llm_calls}})
+        try:
+            with get_db_session() as db:
+                self.chat_session_service.add_messages_to_session(db, session_id, [message])
+        except Exception as e:
+            print(f"SERVICE-LLM ERROR: Could not save user message after failed turn: {e}")
+
+    def _turn_error_response(self, session_id: str, e: Exception) -> dict:
+        print(f"Error in LLMInteractionService: {str(e)}")
+        import traceback
+        traceback.print_exc()
+        return {"error": "Failed to process message with LLM/Agent.", "details": str(e), "session_id": session_id}
+
+    def process_message_with_llm_and_tools(self, user_message: str, space_id: str, space_type: str,  session_id: str, callbacks: list = None):
+        """
+        Runs one agent turn and persists it. 'callbacks' are LangChain callback handlers attached
+        to this invocation only (used by the streaming endpoint to observe tokens and tool calls).
+        The whole turn, tool calls included, shares one DB session (joins the request's scope if any).
+        """
+        print(f"SERVICE-LLM: Processing (DB history): '{user_message}' for space {space_id} ({space_type}) session {session_id}")
+        with db_session_scope():
+            return self._process_turn(user_message, space_id, space_type, session_id, callbacks)
+
+    def _process_turn(self, user_message: str, space_id: str, space_type: str, session_id: str, callbacks: list = None):
+        usage = TurnUsageCallbackHandler() # Tokens and latency of this turn's LLM calls and tools
+        try:
+            agent_executor, invoke_payload = self._prepare_turn(user_message, space_id, space_type, session_id)
+
+            print(f"SERVICE-LLM: Invoking agent executor with input and context keys: {list(invoke_payload.keys())}")
+            agent_response = agent_executor.invoke(invoke_payload, config={"callbacks": [*(callbacks or []), usage]})
+        except Exception as e:
+            self._persist_user_message_only(session_id, user_message, usage)
+            return self._turn_error_response(session_id, e)
+        try:
+            return self._complete_turn(session_id, user_message, agent_response, (str(space_id), space_type), usage)
+        except Exception as e:
+            return self._turn_error_response(session_id, e)
+
+    async def aprocess_message_with_llm_and_tools(self, user_message: str, space_id: str, space_type: str, session_id: str, callbacks: list = None):
+        """
+        asyncio-native variant of process_message_with_llm_and_tools for the ASGI entry point.
+        The LLM round trip runs through AgentExecutor.ainvoke (async tools included), and the
+        short DB phases run on worker threads, so one event loop can carry many in-flight turns.
+        """
+        print(f"SERVICE-LLM: Processing async: '{user_message}' for space {space_id} ({space_type}) session {session_id}")
+        # Worker threads (asyncio.to_thread, async tool wrappers) inherit this task's scope
+        with db_session_scope():
+            return await self._aprocess_turn(user_message, space_id, space_type, session_id, callbacks)
+
+    async def _aprocess_turn(self, user_message: str, space_id: str, space_type: str, session_id: str, callbacks: list = None):
+        usage = TurnUsageCallbackHandler()
+        try:
+            agent_executor, invoke_payload = await asyncio.to_thread(
+                self._prepare_turn, user_message, space_id, space_type, session_id
+            )
+            agent_response = await agent_executor.ainvoke(invoke_payload, config={"callbacks": [*(callbacks or []), usage]})
+        except Exception as e:
+            await asyncio.to_thread(self._persist_user_message_only, session_id, user_message, usage)
+            return self._turn_error_response(session_id, e)
+        try:
+            return await asyncio.to_thread(self._complete_turn, session_id, user_message, agent_response, (str(space_id), space_type), usage)
         except Exception as e:
-            if db.is_active: db.rollback()
-            print(f"Error in LLMInteractionService: {str(e)}")
-            import traceback
-            traceback.print_exc()
-            return {"error": "Failed to process message with LLM/Agent.", "details": str(e), "session_id": session_id}
-        finally:
-            if db.is_active: db.close()
+            return self._turn_error_response(session_id, e)
+
+    def stream_message_with_llm_and_tools(self, user_message: str, space_id: str, space_type: str, session_id: str):
+        """
+        Generator variant of process_message_with_llm_and_tools. Yields event dicts
+        ({"event": ..., "data": ...}) as they happen: 'start', 'token', 'tool_start', 'tool_end',
+        'tool_error', periodic 'ping' keep-alives, and finally 'done' (the same payload the
+        blocking endpoint returns) or 'error'.
+        The turn runs on a worker thread and is persisted there, so a client that disconnects
+        mid-stream does not lose the turn.
+        """
+        events = queue.Queue()
+        handler = QueueStreamingCallbackHandler(events.put)
+
+        def run_turn():
+            try:
+                result = self.process_message_with_llm_and_tools(
+                    user_message, space_id, space_type, session_id, callbacks=[handler]
+                )
+                events.put({"event": "error" if result.get("error") else "done", "data": result})
+            except Exception as e:
+                print(f"SERVICE-LLM ERROR: Streaming turn failed: {e}")
+                events.put({"event": "error", "data": {"error": "Failed to process message with LLM/Agent.", "details": str(e), "session_id": session_id}})
+            finally:
+                events.put(_STREAM_END)
+
+        threading.Thread(target=run_turn, name=f"chat-stream-{session_id[-8:]}", daemon=True).start()
+        yield {"event": "start", "data": {"session_id": session_id}}
+        while True:
+            try:
+                item = events.get(timeout=app_config.CHAT_STREAM_HEARTBEAT_SECONDS)
+            except queue.Empty:
+                yield {"event": "ping", "data": {}}
+                continue
+            if item is _STREAM_END:
+                break
+            yield item
+
+    async def astream_message_with_llm_and_tools(self, user_message: str, space_id: str, space_type: str, session_id: str):
+        """Async generator with the same events as stream_message_with_llm_and_tools."""
+        loop = asyncio.get_running_loop()
+        events = asyncio.Queue()
+        handler = QueueStreamingCallbackHandler(lambda event: loop.call_soon_threadsafe(events.put_nowait, event))
+
+        async def run_turn():
+            try:
+                result = await self.aprocess_message_with_llm_and_tools(
+                    user_message, space_id, space_type, session_id, callbacks=[handler]
+                )
+                events.put_nowait({"event": "error" if result.get("error") else "done", "data": result})
+            finally:
+                events.put_nowait(_STREAM_END)
+
+        # A task (not an inline await) so the turn still completes and persists if the client goes away
+        turn_task = asyncio.create_task(run_turn())
+        self._background_turns.add(turn_task)
+        turn_task.add_done_callback(self._background_turns.discard)
+
+        yield {"event": "start", "data": {"session_id": session_id}}
+        while True:
+            try:
+                item = await asyncio.wait_for(events.get(), timeout=app_config.CHAT_STREAM_HEARTBEAT_SECONDS)
+            except asyncio.TimeoutError:
+                yield {"event": "ping", "data": {}}
+                continue
+            if item is _STREAM_END:
+                break
+            yield item
 
 
  
@@ -0,0 +1,230 @@
+# devspace/backend/services/llm_router.py
+from dataclasses import dataclass
+from typing import Optional
+
+from langchain_google_genai import ChatGoogleGenerativeAI
+from langchain_core.runnables import RunnableLambda, RunnablePassthrough
+from langchain.agents.format_scratchpad.tools import format_to_tool_messages
+from langchain.agents.output_parsers.tools import ToolsAgentOutputParser
+
+from config import config as app_config
+from core.ttl_lru_cache import TTLLRUCache
+from database.models import LLMSourceEnum
+
+_TEMPERATURE = 0.2 # More deterministic for tool use
+
+
+@dataclass(frozen=True, slots=True)
+class ModelSpec:
+    source: str # LLMSourceEnum value
+    model: str
+
+    def __str__(self):
+        return f"{self.source}:{self.model}"
+
+
+@dataclass(frozen=True, slots=True)
+class LLMRoute:
+    primary: ModelSpec # Writes final answers (and runs every step when tool_step is None)
+    tool_step: Optional[ModelSpec] # Cheap/fast model tried first on every step; kept only when it calls tools
+    fallbacks: tuple # ModelSpecs tried in order when a call times out or is rate limited
+
+
+def _default_model(source: str) -> str:
+    return {
+        LLMSourceEnum.GEMINI.value: app_config.DEFAULT_LLM_MODEL,
+        LLMSourceEnum.CHATGPT.value: app_config.OPENAI_DEFAULT_MODEL,
+        LLMSourceEnum.OTHER.value: app_config.OPENAI_COMPATIBLE_MODEL,
+    }[source]
+
+
+def parse_model_spec(text) -> Optional[ModelSpec]:
+    """'source' or 'source:model' (the model may contain colons, e.g. other:llama3.1:8b). ValueError on unknown sources."""
+    if not text or not str(text).strip():
+        return None
+    source, _, model = str(text).strip().partition(":")
+    source = LLMSourceEnum(source.strip().lower()).value
+    return ModelSpec(source, model.strip() or _default_model(source))
+
+
+def _fallback_exceptions() -> tuple:
+    """Timeout, rate-limit and unavailability errors of the installed provider SDKs: the ones another model can fix."""
+    exceptions = [TimeoutError]
+    try:
+        from google.api_core import exceptions as google_exceptions
+        exceptions += [google_exceptions.ResourceExhausted, google_exceptions.TooManyRequests,
+                       google_exceptions.DeadlineExceeded, google_exceptions.ServiceUnavailable]
+    except ImportError:
+        pass
+    try:
+        import openai
+        exceptions += [openai.RateLimitError, openai.APITimeoutError, openai.APIConnectionError, openai.InternalServerError]
+    except ImportError:
+        pass
+    try:
+        import httpx
+        exceptions.append(httpx.TimeoutException)
+    except ImportError:
+        pass
+    return tuple(exceptions)
+
+
+def _collect(chunks):
+    message = None
+    for chunk in chunks:
+        message = chunk if message is None else message + chunk
+    return message
+
+
+async def _acollect(chunks):
+    message = None
+    async for chunk in chunks:
+        message = chunk if message is None else message + chunk
+    return message
+
+
+class LLMRouter:
+    """
+    Picks the models that serve a space and builds its agent runnable. Chat model clients are pooled
+    per (source, model) and shared by every space, so their HTTP/gRPC connections stay warm.
+    Routing: the space's llm_source/llm_model_name is the primary model; an optional cheap tool-step
+    model drafts each agent step and is kept when it selects tools, otherwise the primary writes the
+    answer; timeouts and rate limits fall through to the configured fallback models.
+    """
+
+    def __init__(self, max_clients: int, idle_ttl_seconds: float, max_routes: int):
+        self._clients = TTLLRUCache("llm_clients", max_entries=max_clients, idle_ttl_seconds=idle_ttl_seconds)
+        # (space_id, config version) -> LLMRoute; a config write bumps the version, so no invalidation needed
+        self._routes = TTLLRUCache("llm_routes", max_entries=max_routes, idle_ttl_seconds=idle_ttl_seconds)
+        self.fallback_exceptions = _fallback_exceptions()
+
+    @staticmethod
+    def is_available(spec: ModelSpec) -> bool:
+        if spec.source == LLMSourceEnum.GEMINI.value:
+            return bool(app_config.GOOGLE_API_KEY) and app_config.GOOGLE_API_KEY != "YOUR_GOOGLE_API_KEY_HERE_IF_NO_ENV_VAR"
+        if spec.source == LLMSourceEnum.CHATGPT.value:
+            return bool(app_config.OPENAI_API_KEY)
+        return bool(app_config.OPENAI_COMPATIBLE_BASE_URL)
+
+    def _parse_specs(self, values) -> list:
+        if isinstance(values, str):
+            values = values.split(",")
+        specs = []
+        for value in values or ():
+            try:
+                spec = parse_model_spec(value)
+            except ValueError:
+                print(f"SERVICE-LLM-ROUTER WARN: Ignoring invalid model spec '{value}'")
+                continue
+            if spec and spec not in specs:
+                if self.is_available(spec):
+                    specs.append(spec)
+                else:
+                    print(f"SERVICE-LLM-ROUTER WARN: Skipping {spec}: source not configured")
+        return specs
+
+    def resolve_route(self, snapshot) -> LLMRoute:
+        """Route for a space (SpaceConfigSnapshot or None for the global defaults)."""
+        key = (snapshot.space_id, snapshot.version) if snapshot else None
+        return self._routes.get_or_create(key, lambda: self._resolve_route(snapshot))
+
+    def _resolve_route(self, snapshot) -> LLMRoute:
+        if app_config.LLM_SOURCE_OVERRIDE: # Every space on one source, e.g. a local stand-in
+            return LLMRoute(parse_model_spec(app_config.LLM_SOURCE_OVERRIDE), None, ())
+
+        source = (snapshot.llm_source if snapshot else None) or app_config.DEFAULT_LLM_SOURCE
+        model = (snapshot.llm_model_name if snapshot else None) or None
+        primary = parse_model_spec(f"{source}:{model}" if model else source)
+        routing = (snapshot.agent_config.get("llm_routing") if snapshot else None) or {}
+
+        fallbacks = [s for s in self._parse_specs(routing.get("fallbacks", app_config.LLM_FALLBACK_MODELS)) if s != primary]
+        if not self.is_available(primary) and fallbacks:
+            print(f"SERVICE-LLM-ROUTER WARN: {primary} is not configured, using {fallbacks[0]}")
+            primary = fallbacks.pop(0)
+        tool_step = self._parse_specs([routing.get("tool_step_model", app_config.LLM_TOOL_STEP_MODEL)])
+        tool_step = tool_step[0] if tool_step and tool_step[0] != primary else None
+        return LLMRoute(primary, tool_step, tuple(fallbacks))
+
+    def client(self, spec: ModelSpec):
+        """Warm, shared chat model client for 'spec'."""
+        return self._clients.get_or_create((spec.source, spec.model), lambda: self._create_client(spec))
+
+    def _create_client(self, spec: ModelSpec):
+        if not self.is_available(spec):
+            raise ValueError(f"LLM source '{spec.source}' is not configured (API key / base URL missing).")
+        print(f"SERVICE-LLM-ROUTER: Creating client for {spec}")
+        common = {"model": spec.model, "temperature": _TEMPERATURE, "timeout": app_config.LLM_REQUEST_TIMEOUT_SECONDS,
+                  "max_retries": app_config.LLM_MAX_RETRIES}
+        if spec.source == LLMSourceEnum.GEMINI.value:
+            return ChatGoogleGenerativeAI(
+                google_api_key=app_config.GOOGLE_API_KEY,
+                convert_system_message_to_human=True, # Important for Gemini tool calling
+                **common,
+            )
+        try:
+            from langchain_openai import ChatOpenAI
+        except ImportError:
+            raise ValueError(f"LLM source '{spec.source}' requires the langchain-openai package.")
+        if spec.source == LLMSourceEnum.CHATGPT.value:
+            # stream_usage: token counts also arrive on streamed responses (usage accounting)
+            return ChatOpenAI(api_key=app_config.OPENAI_API_KEY, base_url=app_config.OPENAI_BASE_URL, stream_usage=True, **common)
+        return ChatOpenAI(api_key=app_config.OPENAI_COMPATIBLE_API_KEY, base_url=app_config.OPENAI_COMPATIBLE_BASE_URL, **common)
+
+    def _model_chain(self, specs: list, tools: list = None):
+        """The first model, falling back to the others in order on timeout / rate limit."""
+        models = [self.client(spec).bind_tools(tools) if tools else self.client(spec) for spec in specs]
+        first, rest = models[0], models[1:]
+        return first.with_fallbacks(rest, exceptions_to_handle=self.fallback_exceptions) if rest else first
+
+    def _cascade(self, draft_model, answer_model):
+        """Agent step: the cheap model's output is kept when it calls tools, otherwise the answer model replies."""
+        fallback_exceptions = self.fallback_exceptions
+
+        def route_step(messages, config):
+            try:
+                draft = draft_model.invoke(messages, config)
+                if draft.tool_calls:
+                    return draft
+            except fallback_exceptions as e:
+                print(f"SERVICE-LLM-ROUTER WARN: Tool-step model failed ({type(e).__name__}), using the answer model")
+            # Streamed so token callbacks (SSE chat) still fire for the final answer
+            return _collect(answer_model.stream(messages, config))
+
+        async def aroute_step(messages, config):
+            try:
+                draft = await draft_model.ainvoke(messages, config)
+                if draft.tool_calls:
+                    return draft
+            except fallback_exceptions as e:
+                print(f"SERVICE-LLM-ROUTER WARN: Tool-step model failed ({type(e).__name__}), using the answer model")
+            return await _acollect(answer_model.astream(messages, config))
+
+        return RunnableLambda(route_step, afunc=aroute_step, name="llm_router_step")
+
+    def build_agent(self, route: LLMRoute, tools: list, prompt):
+        """Tool-calling agent runnable (same shape as create_tool_calling_agent) with the route's models."""
+        model_step = self._model_chain([route.primary, *route.fallbacks], tools)
+        if route.tool_step:
+            model_step = self._cascade(self._model_chain([route.tool_step], tools), model_step)
+        return (
+            RunnablePassthrough.assign(agent_scratchpad=lambda x: format_to_tool_messages(x["intermediate_steps"]))
+            | prompt
+            | model_step
+            | ToolsAgentOutputParser()
+        )
+
+    def build_utility_llm(self, route: LLMRoute):
+        """Plain model for side tasks such as history summaries: the cheapest of the route, with fallbacks."""
+        specs = [route.tool_step] if route.tool_step else []
+        specs += [s for s in (route.primary, *route.fallbacks) if s not in specs]
+        return self._model_chain(specs)
+
+    def stats(self) -> dict:
+        return self._clients.stats()
+
+
+llm_router = LLMRouter(
+    max_clients=app_config.LLM_CLIENT_POOL_MAX,
+    idle_ttl_seconds=app_config.AGENT_CACHE_IDLE_TTL_SECONDS,
+    max_routes=app_config.SPACE_CONFIG_CACHE_MAX_SPACES,
+)
@@ -0,0 +1,124 @@
+# devspace/backend/services/prompt_assembly.py
+import os
+from typing import Optional
+
+from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
+
+from config import config as app_config
+from core.ttl_lru_cache import TTLLRUCache
+from services.space_config_cache import SpaceConfigSnapshot
+
+PROMPT_TEMPLATE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "prompts")
+DEVOPS_AGENT_PROMPT_FILE = os.path.join(PROMPT_TEMPLATE_DIR, "devops_agent_prompt_template.md")
+SPACE_CONTEXT_PROMPT_FILE = os.path.join(PROMPT_TEMPLATE_DIR, "devops_agent_space_context_template.md")
+
+
+def load_prompt_template_from_file(file_path: str, fallback: str) -> str:
+    try:
+        with open(file_path, 'r', encoding='utf-8') as f:
+            return f.read()
+    except FileNotFoundError:
+        print(f"ERROR: Prompt template file not found at {file_path}")
+        return fallback
+    except Exception as e:
+        print(f"Error loading prompt template: {e}")
+        return fallback
+
+
+# Static instructions: no variables, byte-identical for every space and every turn
+DEVOPS_AGENT_PROMPT_CONTENT = load_prompt_template_from_file(
+    DEVOPS_AGENT_PROMPT_FILE, "You are a helpful DevOps assistant. Use the available tools when they help."
+)
+# Space-specific section (str.format fields), rendered once per space config version
+SPACE_CONTEXT_TEMPLATE = load_prompt_template_from_file(
+    SPACE_CONTEXT_PROMPT_FILE, "Space ID: {space_id} ({space_type} space)"
+)
+CONVERSATION_SUMMARY_HEADER = "**Summary of Earlier Conversation (older turns not included in the chat history):**"
+
+
+def compile_agent_prompt() -> ChatPromptTemplate:
+    """
+    The agent prompt, ordered from most to least stable so provider-side prefix caching can reuse
+    as much as possible between calls:
+      1. static instructions (shared by all spaces and turns)
+      2. {space_context} (changes only when the space's configuration changes)
+      3. {conversation_summary} (changes when older turns are folded into it)
+      4. chat history, the user's {input} and the agent scratchpad (per turn / per step)
+    All of 1-3 is one system message: Gemini only accepts a system message in first position.
+    """
+    static_prefix = DEVOPS_AGENT_PROMPT_CONTENT.rstrip().replace("{", "{{").replace("}", "}}")
+    system_template = f"{static_prefix}\n\n{{space_context}}\n\n{CONVERSATION_SUMMARY_HEADER}\n{{conversation_summary}}"
+    return ChatPromptTemplate.from_messages([
+        ("system", system_template),
+        MessagesPlaceholder("chat_history", optional=True),
+        ("human", "{input}"),
+        MessagesPlaceholder("agent_scratchpad"),
+    ])
+
+
+# Parsed once per process and shared by every agent
+AGENT_PROMPT = compile_agent_prompt()
+
+
+def space_context_values(space_id: str, space_type: str, snapshot: Optional[SpaceConfigSnapshot]) -> dict:
+    """Formats space-specific details for the space context section."""
+    git_repo_url = "N/A"
+    k8s_environments_summary = "Not configured or N/A for this space type."
+    monitored_workloads_summary = "N/A"
+    aiops_skills_summary = "N/A"
+    app_blueprint_version = "N/A (no active blueprint)" # TODO: Get from space config or session
+
+    if space_type == "dev" and snapshot and snapshot.dev:
+        dev = snapshot.dev
+        git_repo_url = dev.git_repo_url or "Not configured"
+        if dev.k8s_environments_invalid:
+            k8s_environments_summary = "Error parsing K8s environment config."
+        elif dev.k8s_environments:
+            env_names = [val.get("name", key) for key, val in dev.k8s_environments.items()]
+            k8s_environments_summary = f"Configured for: {', '.join(env_names)}" if env_names else "No K8s environments defined."
+    elif space_type == "ops" and snapshot and snapshot.ops:
+        # TODO: Populate monitored_workloads_summary and aiops_skills_summary from the parsed ops config
+        monitored_workloads_summary = snapshot.ops.monitored_workloads_json or "Not specified"
+        aiops_skills_summary = snapshot.ops.aiops_skills_json or "Default skills"
+
+    return {
+        "space_id": space_id,
+        "space_type": space_type,
+        "git_repo_url": git_repo_url,
+        "k8s_environments_summary": k8s_environments_summary,
+        "monitored_workloads_summary": monitored_workloads_summary,
+        "aiops_skills_summary": aiops_skills_summary,
+        "app_blueprint_version": app_blueprint_version, # This needs to come from session or Space config
+        "current_task_context": "Currently focusing on general assistance." # TODO: Make this dynamic
+    }
+
+
+class SpacePromptSectionCache:
+    """
+    Rendered space context sections keyed by (space_id, space_type), tagged with the config version
+    they were rendered from. A turn whose snapshot carries another version re-renders and replaces the
+    entry, so config writes (which bump Space.config_version) are picked up without explicit invalidation.
+    """
+
+    def __init__(self, max_spaces: int, idle_ttl_seconds: float):
+        self._sections = TTLLRUCache("space_prompt_sections", max_entries=max_spaces, idle_ttl_seconds=idle_ttl_seconds)
+
+    def get(self, space_id: str, space_type: str, snapshot: Optional[SpaceConfigSnapshot]) -> str:
+        key = (str(space_id), space_type)
+        version = snapshot.version if snapshot else None
+        cached = self._sections.get(key)
+        if cached and cached[0] == version:
+            return cached[1]
+        section = SPACE_CONTEXT_TEMPLATE.format(**space_context_values(str(space_id), space_type, snapshot)).rstrip()
+        if snapshot is not None: # Unknown spaces are not cached; they may be created later
+            self._sections.put(key, (version, section))
+        return section
+
+    def stats(self) -> dict:
+        return self._sections.stats()
+
+
+space_prompt_sections = SpacePromptSectionCache(
+    max_spaces=app_config.SPACE_CONFIG_CACHE_MAX_SPACES,
+    idle_ttl_seconds=app_config.SPACE_CONFIG_CACHE_IDLE_TTL_SECONDS,
+)
@@ -0,0 +1,204 @@
+# devspace/backend/services/space_config_cache.py
+import json
+import threading
+import time
+import uuid
+from dataclasses import dataclass
+from types import MappingProxyType
+from typing import Mapping, Optional
+
+from sqlalchemy.orm import joinedload
+
+from config import config as app_config
+from core.ttl_lru_cache import TTLLRUCache
+from database.db_session import get_db_session
+from database.models import Space, SpaceTypeEnum
+
+_EMPTY = MappingProxyType({})
+
+
+def _freeze(value):
+    """Read-only view of parsed JSON: dicts become mappingproxies, lists become tuples."""
+    if isinstance(value, dict):
+        return MappingProxyType({k: _freeze(v) for k, v in value.items()})
+    if isinstance(value, list):
+        return tuple(_freeze(v) for v in value)
+    return value
+
+
+def _parse(json_text: Optional[str], space_id: str, field: str):
+    if not json_text:
+        return None
+    try:
+        return _freeze(json.loads(json_text))
+    except (TypeError, ValueError):
+        print(f"SERVICE-SPACE-CONFIG WARN: Invalid {field} for space {space_id}")
+        return None
+
+
+@dataclass(frozen=True, slots=True)
+class DevConfigSnapshot:
+    dev_config_id: Optional[int]
+    git_repo_url: Optional[str]
+    default_branch: Optional[str]
+    k8s_environments: Mapping # environment key -> env config (see k8s_client_pool.environment_context_key)
+    k8s_environments_invalid: bool # k8s_environments_json is set but not valid JSON
+
+
+@dataclass(frozen=True, slots=True)
+class OpsConfigSnapshot:
+    cmdb_config: Optional[Mapping]
+    k8s_cluster_configs: Optional[tuple]
+    monitored_workloads: Optional[object]
+    aiops_skills: Optional[Mapping]
+    # Raw JSON text, as the prompt shows it
+    monitored_workloads_json: Optional[str]
+    aiops_skills_json: Optional[str]
+
+
+@dataclass(frozen=True, slots=True)
+class SpaceConfigSnapshot:
+    space_id: str
+    version: int # Space.config_version when loaded
+    type: str # 'dev' | 'ops'
+    name: str
+    llm_source: Optional[str]
+    llm_model_name: Optional[str]
+    agent_config: Mapping
+    mcp_server_url: Optional[str]
+    dev: Optional[DevConfigSnapshot]
+    ops: Optional[OpsConfigSnapshot]
+
+
+def _build_snapshot(space: Space) -> SpaceConfigSnapshot:
+    space_id = str(space.id)
+    dev = ops = None
+    if space.type == SpaceTypeEnum.DEV:
+        dev_config = space.dev_config
+        envs_json = dev_config.k8s_environments_json if dev_config else None
+        envs = _parse(envs_json, space_id, "k8s_environments_json")
+        dev = DevConfigSnapshot(
+            dev_config_id=dev_config.id if dev_config else None,
+            git_repo_url=dev_config.git_repo_url if dev_config else None,
+            default_branch=dev_config.default_branch if dev_config else None,
+            k8s_environments=envs if isinstance(envs, Mapping) else _EMPTY,
+            k8s_environments_invalid=bool(envs_json) and not isinstance(envs, Mapping),
+        )
+    elif space.type == SpaceTypeEnum.OPS and space.ops_config:
+        ops_config = space.ops_config
+        ops = OpsConfigSnapshot(
+            cmdb_config=_parse(ops_config.cmdb_config_json, space_id, "cmdb_config_json"),
+            k8s_cluster_configs=_parse(ops_config.k8s_cluster_configs_json, space_id, "k8s_cluster_configs_json"),
+            monitored_workloads=_parse(ops_config.monitored_workloads_metadata_json, space_id, "monitored_workloads_metadata_json"),
+            aiops_skills=_parse(ops_config.aiops_skills_config_json, space_id, "aiops_skills_config_json"),
+            monitored_workloads_json=ops_config.monitored_workloads_metadata_json,
+            aiops_skills_json=ops_config.aiops_skills_config_json,
+        )
+    return SpaceConfigSnapshot(
+        space_id=space_id,
+        version=space.config_version or 0,
+        type=space.type.value,
+        name=space.name,
+        llm_source=space.llm_source.value if space.llm_source else None,
+        llm_model_name=space.llm_model_name,
+        agent_config=_parse(space.agent_config_json, space_id, "agent_config_json") or _EMPTY,
+        mcp_server_url=space.mcp_server_url,
+        dev=dev,
+        ops=ops,
+    )
+
+
+class SpaceConfigCache:
+    """
+    Process-level cache of immutable, pre-parsed space configuration snapshots. A hit is a dict
+    lookup: no session, no query, no json.loads. SpaceService bumps Space.config_version and calls
+    invalidate() after every config write (write-through). With several worker processes, set
+    SPACE_CONFIG_SYNC_INTERVAL_SECONDS so each worker compares its cached versions against the
+    database periodically and drops snapshots another worker made stale.
+    """
+
+    def __init__(self, max_spaces: int, idle_ttl_seconds: float, sync_interval_seconds: float = 0):
+        self._snapshots = TTLLRUCache("space_config_snapshots", max_entries=max_spaces, idle_ttl_seconds=idle_ttl_seconds)
+        self._generations = {} # space_id -> invalidation count; a load that raced an invalidation is not cached
+        self._lock = threading.Lock()
+        self.sync_interval_seconds = sync_interval_seconds
+        self._sync_thread = None
+
+    @staticmethod
+    def _key(space_id) -> Optional[str]:
+        try:
+            return str(uuid.UUID(str(space_id))) # Canonical form, however the caller spelled the id
+        except ValueError:
+            return None
+
+    def get(self, space_id) -> Optional[SpaceConfigSnapshot]:
+        """Snapshot for a space (None if the space does not exist or the id is malformed)."""
+        key = self._key(space_id)
+        if key is None:
+            return None
+        snapshot = self._snapshots.get(key)
+        if snapshot is not None:
+            return snapshot
+        self._ensure_sync_thread()
+        with self._lock:
+            generation = self._generations.get(key, 0)
+        snapshot = self._load(key)
+        if snapshot is not None:
+            with self._lock:
+                if self._generations.get(key, 0) == generation:
+                    self._snapshots.put(key, snapshot)
+        return snapshot
+
+    def _load(self, key: str) -> Optional[SpaceConfigSnapshot]:
+        with get_db_session() as db:
+            space = db.get(Space, uuid.UUID(key), options=[joinedload(Space.dev_config), joinedload(Space.ops_config)])
+            return _build_snapshot(space) if space else None
+
+    def invalidate(self, space_id) -> bool:
+        key = self._key(space_id)
+        if key is None:
+            return False
+        with self._lock:
+            self._generations[key] = self._generations.get(key, 0) + 1
+            return self._snapshots.pop(key) is not None
+
+    def sync_versions(self) -> int:
+        """Drops snapshots whose space changed (or was deleted) in the database. Returns how many."""
+        cached = {key: snapshot.version for key, snapshot in self._snapshots.items()}
+        if not cached:
+            return 0
+        with get_db_session() as db:
+            rows = db.query(Space.id, Space.config_version).filter(Space.id.in_([uuid.UUID(k) for k in cached])).all()
+        current = {str(space_id): version or 0 for space_id, version in rows}
+        stale = [key for key, version in cached.items() if current.get(key) != version]
+        for key in stale:
+            self.invalidate(key)
+        return len(stale)
+
+    def _ensure_sync_thread(self):
+        if self.sync_interval_seconds <= 0 or self._sync_thread is not None:
+            return
+        with self._lock:
+            if self._sync_thread is None:
+                self._sync_thread = threading.Thread(target=self._sync_loop, name="space-config-sync", daemon=True)
+                self._sync_thread.start()
+
+    def _sync_loop(self):
+        while True:
+            time.sleep(self.sync_interval_seconds)
+            try:
+                dropped = self.sync_versions()
+                if dropped:
+                    print(f"SERVICE-SPACE-CONFIG: Dropped {dropped} snapshots changed by another process")
+            except Exception as e:
+                print(f"SERVICE-SPACE-CONFIG ERROR: Version sync failed: {e}")
+
+    def stats(self) -> dict:
+        return self._snapshots.stats()
+
+
+space_config_cache = SpaceConfigCache(
+    max_spaces=app_config.SPACE_CONFIG_CACHE_MAX_SPACES,
+    idle_ttl_seconds=app_config.SPACE_CONFIG_CACHE_IDLE_TTL_SECONDS,
+    sync_interval_seconds=app_config.SPACE_CONFIG_SYNC_INTERVAL_SECONDS,
+)
@@ -2,9 +2,9 @@ from sqlalchemy.orm import joinedload
 from config import config as app_config # For default LLM model if needed
 import json # For handling JSON fields in config models
 from database.db_session import get_db_session, SessionLocal # Assuming SessionLocal for direct use
-from database.models import Space, DevSpaceConfig, OpsSpaceConfig, SpaceTypeEnum, LLMSourceEnum
-import subprocess # For git ls-remote validation
-import shlex    # For safe command construction
+from database.models import Space, DevSpaceConfig, GitTreeCache, OpsSpaceConfig, SpaceTypeEnum, LLMSourceEnum
+from services.git_ref_cache import git_ref_cache # For git ls-remote validation
+from services.space_config_cache import space_config_cache # Pre-parsed config snapshots, invalidated on writes
 import datetime
 from typing import Union, Optional # <--- ADD Union and Optional (Optional is Union[X, None])
 import uuid
@@ -17,54 +17,75 @@ class SpaceServiceError(Exception):
 
 class SpaceService:
 
+    @staticmethod
+    def _mark_config_changed(space):
+        # Call before commit; invalidate the snapshot cache after it (see space_config_cache)
+        space.config_version = (space.config_version or 0) + 1
+
+    def get_config_snapshot(self, space_id_str: str):
+        """Cached, pre-parsed and read-only configuration of a space (SpaceConfigSnapshot), or None."""
+        return space_config_cache.get(space_id_str)
+
+    def _get_space_for_config(self, db, space_id_str: str):
+        # Session.get() answers from the identity map when the space was already loaded in this
+        # request/turn scope, so repeated config lookups by tools and prompt building cost no query
+        return db.get(Space, uuid.UUID(str(space_id_str)),
+                      options=[joinedload(Space.dev_config), joinedload(Space.ops_config)])
+
     def get_dev_config_object(self, space_id_str: str) -> Union[DevSpaceConfig, None]: # <--- MODIFIED 
         print(f"SERVICE: get_dev_config_object for space {space_id_str}")
-        db = SessionLocal()
-        try:
-            space_id = uuid.UUID(space_id_str)
-            space = db.query(Space).filter(Space.id == space_id).first()
-            if space and space.type == SpaceTypeEnum.DEV:
-                if not space.dev_config: # Create if it doesn't exist for some reason
-                    print(f"SERVICE: DevSpaceConfig not found for DEV space {space_id_int}, creating one.")
-                    new_dev_config = DevSpaceConfig(space_id=space.id)
-                    db.add(new_dev_config)
-                    db.commit()
-                    db.refresh(new_dev_config)
-                    return new_dev_config
-                return space.dev_config
-            return None
-        except Exception as e:
-            print(f"SERVICE ERROR in get_dev_config_object: {e}")
-            return None
-        finally:
-            db.close()
+        with get_db_session() as db:
+            try:
+                space = self._get_space_for_config(db, space_id_str)
+                if space and space.type == SpaceTypeEnum.DEV:
+                    if not space.dev_config: # Create if it doesn't exist for some reason
+                        print(f"SERVICE: DevSpaceConfig not found for DEV space {space_id_str}, creating one.")
+                        new_dev_config = DevSpaceConfig(space_id=space.id)
+                        space.dev_config = new_dev_config
+                        self._mark_config_changed(space)
+                        db.commit()
+                        db.refresh(new_dev_config)
+                        space_config_cache.invalidate(space.id)
+                        return new_dev_config
+                    return space.dev_config
+                return None
+            except Exception as e:
+                db.rollback()
+                print(f"SERVICE ERROR in get_dev_config_object: {e}")
+                return None
+
+    def get_ops_config_object(self, space_id_str: str) -> Union[OpsSpaceConfig, None]:
+        print(f"SERVICE: get_ops_config_object for space {space_id_str}")
+        with get_db_session() as db:
+            try:
+                space = self._get_space_for_config(db, space_id_str)
+                if space and space.type == SpaceTypeEnum.OPS:
+                    return space.ops_config
+                return None
+            except Exception as e:
+                print(f"SERVICE ERROR in get_ops_config_object: {e}")
+                return None
+
+    @staticmethod
+    def is_supported_git_url(git_url: str) -> bool:
+        """Format check only: https/http, ssh:// or scp-style git@ URLs (never something git would read as an option)."""
+        return bool(git_url) and git_url.startswith(("https://", "http://", "ssh://", "git@")) \
+            and not any(ch.isspace() for ch in git_url)
 
     def _validate_git_url(self, git_url: str) -> bool:
         """
-        Validates a Git URL by attempting 'git ls-remote'.
+        Validates a Git URL by listing its refs ('git ls-remote' through the shared ref cache,
+        so the branch list the UI requests next is already warm).
         Returns True if valid, False otherwise.
         """
-        if not git_url or not (git_url.startswith("http") or git_url.startswith("git@")):
+        if not self.is_supported_git_url(git_url):
             return False # Basic URL format check
-        try:
-            # Use a timeout to prevent hanging on unresponsive URLs
-            # In a production environment, consider running this in a background task
-            # or using a library that handles git operations more robustly.
-            command = f"git ls-remote {shlex.quote(git_url)}"
-            print(f"SERVICE: Validating Git URL with command: {command}")
-            # Timeout is important for external calls
-            process = subprocess.run(command, shell=True, check=True, capture_output=True, text=True, timeout=30)
-            print(f"SERVICE: Git URL validation successful for {git_url}. Output: {process.stdout[:100]}...") # Log a snippet
+        refs = git_ref_cache.get_refs(git_url)
+        if refs["success"]:
+            print(f"SERVICE: Git URL validation successful for {git_url} ({len(refs['branches'])} branches).")
             return True
-        except subprocess.CalledProcessError as e:
-            print(f"SERVICE ERROR: 'git ls-remote' failed for URL {git_url}. Error: {e.stderr}")
-            return False
-        except subprocess.TimeoutExpired:
-            print(f"SERVICE ERROR: 'git ls-remote' timed out for URL {git_url}.")
-            return False
-        except Exception as e:
-            print(f"SERVICE ERROR: Unexpected error validating Git URL {git_url}: {e}")
-            return False
+        print(f"SERVICE ERROR: Git URL validation failed for {git_url}: {refs.get('error')}")
+        return False
 
     def update_dev_space_git_config(self, space_id_str: str, new_git_repo_url: str):
         print(f"SERVICE: update_dev_space_git_config for space {space_id_str} with URL {new_git_repo_url}")
@@ -89,11 +110,16 @@ class SpaceService:
                 dev_config = DevSpaceConfig(space_id=space.id)
                 db.add(dev_config)
             
+            if dev_config.id and dev_config.git_repo_url != new_git_repo_url:
+                # Cached trees belong to the old repository
+                db.query(GitTreeCache).filter_by(dev_config_id=dev_config.id).delete(synchronize_session=False)
             dev_config.git_repo_url = new_git_repo_url
             # You might want to reset/update default_branch here too if needed
             # dev_config.default_branch = "main" # Or fetch from repo if possible
+            self._mark_config_changed(space)
 
             db.commit()
+            space_config_cache.invalidate(space.id)
             db.refresh(dev_config) # Refresh to get updated state if needed
             print(f"SERVICE: Successfully updated git_repo_url for space {space_id_str} to {new_git_repo_url}")
             return {"success": True, "message": "Git repository URL updated.", "git_repo_url": new_git_repo_url}
@@ -210,7 +236,9 @@ class SpaceService:
                 if not space:
                     raise SpaceServiceError(f"Space with id {space_id} not found for update.", 404)
                 space.name = new_title
+                self._mark_config_changed(space)
                 db.commit()
+                space_config_cache.invalidate(space.id)
                 db.refresh(space)
                 return space
             except Exception as e:
@@ -227,6 +255,7 @@ class SpaceService:
                     raise SpaceServiceError(f"Space with id {space_id} not found for deletion.", 404)
                 db.delete(space)
                 db.commit()
+                space_config_cache.invalidate(space_id)
                 return True
             except Exception as e:
                 db.rollback()
@@ -248,47 +277,44 @@ class SpaceService:
     
     def get_space_by_id_with_details(self, space_id_str: str): # Renamed for clarity
         print(f"SERVICE: get_space_by_id_with_details called for: {space_id_str}")
-        db = SessionLocal() # Create a new session
-        try:
-            space_id_int = uuid.UUID(space_id_str) 
-            space = db.query(Space).filter(Space.id == space_id_int).first()
-            if space:
-                details = {
-                    "id": str(space.id),
-                    "name": space.name,
-                    "type": space.type.value, # 'dev' or 'ops'
-                    "description": space.description,
-                    # Add other common fields from Space model if needed by frontend
-                    "llm_source": space.llm_source.value if space.llm_source else None,
-                    "llm_model_name": space.llm_model_name,
-                }
-                if space.type == SpaceTypeEnum.DEV:
-                    if space.dev_config: # Check if dev_config relationship is loaded/exists
-                        details["git_repo_url"] = space.dev_config.git_repo_url
-                        details["default_branch"] = space.dev_config.default_branch
-                        # You might want to parse k8s_environments_json here if needed immediately
-                    else:
-                        # If it's a DEV space but has no dev_config row yet,
-                        # it implies no Git repo is configured.
-                        details["git_repo_url"] = None
-                        details["default_branch"] = "main" # Or some default
-                elif space.type == SpaceTypeEnum.OPS:
-                    if space.ops_config:
-                        # Add any quick-access ops config details if needed
-                        details["ops_config_summary"] = "Ops Config Present" # Placeholder
-                    else:
-                        details["ops_config_summary"] = "No Ops Config"
-                return details
-            return None
-        except ValueError:
-            print(f"SERVICE ERROR: Invalid space_id format: {space_id_str}")
-            return None
-        except Exception as e:
-            print(f"SERVICE ERROR in get_space_by_id_with_details: {e}")
-            db.rollback() # Good practice on error
-            return None
-        finally:
-            db.close()  
+        with get_db_session() as db:
+            try:
+                space = self._get_space_for_config(db, space_id_str)
+                if space:
+                    details = {
+                        "id": str(space.id),
+                        "name": space.name,
+                        "type": space.type.value, # 'dev' or 'ops'
+                        "description": space.description,
+                        # Add other common fields from Space model if needed by frontend
+                        "llm_source": space.llm_source.value if space.llm_source else None,
+                        "llm_model_name": space.llm_model_name,
+                    }
+                    if space.type == SpaceTypeEnum.DEV:
+                        if space.dev_config: # Check if dev_config relationship is loaded/exists
+                            details["git_repo_url"] = space.dev_config.git_repo_url
+                            details["default_branch"] = space.dev_config.default_branch
+                            # You might want to parse k8s_environments_json here if needed immediately
+                        else:
+                            # If it's a DEV space but has no dev_config row yet,
+                            # it implies no Git repo is configured.
+                            details["git_repo_url"] = None
+                            details["default_branch"] = "main" # Or some default
+                    elif space.type == SpaceTypeEnum.OPS:
+                        if space.ops_config:
+                            # Add any quick-access ops config details if needed
+                            details["ops_config_summary"] = "Ops Config Present" # Placeholder
+                        else:
+                            details["ops_config_summary"] = "No Ops Config"
+                    return details
+                return None
+            except ValueError:
+                print(f"SERVICE ERROR: Invalid space_id format: {space_id_str}")
+                return None
+            except Exception as e:
+                print(f"SERVICE ERROR in get_space_by_id_with_details: {e}")
+                db.rollback() # Good practice on error
+                return None
 
   
 
@@ -322,8 +348,10 @@ class SpaceService:
                     space.mcp_server_url = settings_data["mcpServerUrl"]
                 if "mcpServerApiKey" in settings_data and settings_data["mcpServerApiKey"]:
                     space.mcp_server_api_key_placeholder = f"ref_mcp_space_{space_id}"
-                
+                self._mark_config_changed(space)
+
                 db.commit()
+                space_config_cache.invalidate(space.id)
                 db.refresh(space)
                 return True
             except ValueError as ve: # For invalid enum conversion
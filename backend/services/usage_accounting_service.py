@@ -0,0 +1,224 @@
+# devspace/backend/services/usage_accounting_service.py
+import datetime
+import threading
+import time
+import uuid
+from typing import Optional
+
+from langchain_core.callbacks import BaseCallbackHandler
+from sqlalchemy import func, case
+from sqlalchemy.orm import Session
+
+from database.models import Space, ChatSession, ChatMessage, ChatMessageRoleEnum
+from database.types import json_path_text
+
+
+def usage_from_llm_result(response) -> dict:
+    """
+    Token counts of one LLM call. Prefers usage_metadata on the generated message (set by current
+    LangChain chat models, streaming included), else the provider's llm_output["token_usage"].
+    """
+    prompt_tokens = completion_tokens = cached_tokens = 0
+    found = False
+    for generations in response.generations or []:
+        for generation in generations:
+            usage = getattr(getattr(generation, "message", None), "usage_metadata", None)
+            if usage:
+                found = True
+                prompt_tokens += usage.get("input_tokens") or 0
+                completion_tokens += usage.get("output_tokens") or 0
+                cached_tokens += (usage.get("input_token_details") or {}).get("cache_read") or 0
+    if not found:
+        token_usage = (response.llm_output or {}).get("token_usage") or {}
+        prompt_tokens = token_usage.get("prompt_tokens") or 0
+        completion_tokens = token_usage.get("completion_tokens") or 0
+        cached_tokens = (token_usage.get("prompt_tokens_details") or {}).get("cached_tokens") or 0
+    return {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens, "cached_tokens": cached_tokens}
+
+
+class TurnUsageCallbackHandler(BaseCallbackHandler):
+    """
+    Records the LLM calls (model, tokens, latency) and tool runs (latency) of one agent turn.
+    Attached per invocation; LangChain may call it from executor threads, hence the lock.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._started = {} # run_id -> (monotonic start, model or tool name, tool input)
+        self.llm_calls = []
+        self.tool_runs = []
+
+    def _start(self, run_id, name, tool_input=None):
+        with self._lock:
+            self._started[str(run_id)] = (time.monotonic(), name, tool_input)
+
+    def _finish(self, run_id):
+        with self._lock:
+            started_at, name, tool_input = self._started.pop(str(run_id), (None, None, None))
+        latency_ms = int((time.monotonic() - started_at) * 1000) if started_at is not None else None
+        return name, tool_input, latency_ms
+
+    @staticmethod
+    def _model_name(serialized: dict, metadata: dict) -> Optional[str]:
+        model_kwargs = (serialized or {}).get("kwargs") or {}
+        return (metadata or {}).get("ls_model_name") or model_kwargs.get("model") or model_kwargs.get("model_name")
+
+    def on_chat_model_start(self, serialized: dict, messages, *, run_id=None, metadata=None, **kwargs):
+        self._start(run_id, self._model_name(serialized, metadata))
+
+    def on_llm_start(self, serialized: dict, prompts, *, run_id=None, metadata=None, **kwargs):
+        self._start(run_id, self._model_name(serialized, metadata))
+
+    def on_llm_end(self, response, *, run_id=None, **kwargs):
+        model, _input, latency_ms = self._finish(run_id)
+        call = {"model": model or (response.llm_output or {}).get("model_name"), **usage_from_llm_result(response), "latency_ms": latency_ms}
+        with self._lock:
+            self.llm_calls.append(call)
+
+    def on_llm_error(self, error: BaseException, *, run_id=None, **kwargs):
+        model, _input, latency_ms = self._finish(run_id)
+        with self._lock:
+            self.llm_calls.append({"model": model, "prompt_tokens": 0, "completion_tokens": 0, "cached_tokens": 0,
+                                   "latency_ms": latency_ms, "error": str(error)})
+
+    def on_tool_start(self, serialized: dict, input_str: str, *, run_id=None, inputs=None, **kwargs):
+        tool_name = (serialized or {}).get("name") or kwargs.get("name") or "unknown_tool"
+        self._start(run_id, tool_name, inputs if inputs is not None else input_str)
+
+    def _record_tool(self, run_id, status: str):
+        tool_name, tool_input, latency_ms = self._finish(run_id)
+        with self._lock:
+            self.tool_runs.append({"tool_name": tool_name, "input": tool_input, "latency_ms": latency_ms, "status": status})
+
+    def on_tool_end(self, output, *, run_id=None, **kwargs):
+        self._record_tool(run_id, "success")
+
+    def on_tool_error(self, error: BaseException, *, run_id=None, **kwargs):
+        self._record_tool(run_id, "error")
+
+    def take_tool_run(self, tool_name: str, tool_input) -> Optional[dict]:
+        """
+        Removes and returns the recorded run for an agent step: the first run of 'tool_name' with the
+        same input, else the first run of that tool (parallel tool calls may finish in any order).
+        """
+        with self._lock:
+            candidates = [r for r in self.tool_runs if r["tool_name"] == tool_name]
+            match = next((r for r in candidates if r["input"] == tool_input or r["input"] == str(tool_input)), None)
+            match = match or (candidates[0] if candidates else None)
+            if match:
+                self.tool_runs.remove(match)
+            return match
+
+    def turn_usage(self) -> dict:
+        """Totals for the turn's final assistant row: {"prompt_tokens", "completion_tokens", "cached_tokens", "latency_ms"}."""
+        with self._lock:
+            calls = list(self.llm_calls)
+        return {
+            "prompt_tokens": sum(c["prompt_tokens"] for c in calls),
+            "completion_tokens": sum(c["completion_tokens"] for c in calls),
+            "cached_tokens": sum(c["cached_tokens"] for c in calls),
+            "latency_ms": sum(c["latency_ms"] or 0 for c in calls),
+        }
+
+
+class UsageAccountingService:
+    """
+    Rolls persisted per-message usage up per session, per space and per tool. Every rollup is a single
+    aggregate query; 'since_days' limits it to recent messages.
+    """
+
+    def _totals_columns(self):
+        has_turn_usage = ChatMessage.prompt_tokens.isnot(None)
+        is_tool_result = ChatMessage.role == ChatMessageRoleEnum.TOOL_RESULT
+        return (
+            func.count(ChatMessage.prompt_tokens).label("turns"),
+            func.coalesce(func.sum(ChatMessage.prompt_tokens), 0).label("prompt_tokens"),
+            func.coalesce(func.sum(ChatMessage.completion_tokens), 0).label("completion_tokens"),
+            func.coalesce(func.sum(ChatMessage.cached_tokens), 0).label("cached_tokens"),
+            func.coalesce(func.sum(case((has_turn_usage, ChatMessage.latency_ms), else_=None)), 0).label("llm_latency_ms"),
+            func.count(case((is_tool_result, ChatMessage.latency_ms), else_=None)).label("tool_runs"),
+            func.coalesce(func.sum(case((is_tool_result, ChatMessage.latency_ms), else_=None)), 0).label("tool_latency_ms"),
+        )
+
+    @staticmethod
+    def _serialize_totals(row) -> dict:
+        totals = {key: int(getattr(row, key) or 0) for key in (
+            "turns", "prompt_tokens", "completion_tokens", "cached_tokens", "llm_latency_ms", "tool_runs", "tool_latency_ms")}
+        totals["total_tokens"] = totals["prompt_tokens"] + totals["completion_tokens"]
+        totals["avg_llm_latency_ms_per_turn"] = round(totals["llm_latency_ms"] / totals["turns"]) if totals["turns"] else None
+        return totals
+
+    @staticmethod
+    def _since_filter(query, since_days: Optional[float]):
+        if since_days:
+            since = datetime.datetime.now(datetime.timezone.utc) - datetime.timedelta(days=since_days)
+            query = query.filter(ChatMessage.timestamp >= since)
+        return query
+
+    def _tool_breakdown(self, query) -> list:
+        tool_name = json_path_text(ChatMessage.metadata_json, "tool_name")
+        rows = (
+            query.with_entities(
+                tool_name.label("tool_name"),
+                func.count(ChatMessage.id).label("runs"),
+                func.sum(ChatMessage.latency_ms).label("total_latency_ms"),
+                func.max(ChatMessage.latency_ms).label("max_latency_ms"),
+            )
+            .filter(ChatMessage.role == ChatMessageRoleEnum.TOOL_RESULT, ChatMessage.latency_ms.isnot(None))
+            .group_by(tool_name)
+            .order_by(func.sum(ChatMessage.latency_ms).desc())
+            .all()
+        )
+        return [{
+            "tool_name": r.tool_name,
+            "runs": r.runs,
+            "total_latency_ms": int(r.total_latency_ms or 0),
+            "avg_latency_ms": round((r.total_latency_ms or 0) / r.runs) if r.runs else None,
+            "max_latency_ms": r.max_latency_ms,
+        } for r in rows]
+
+    def get_session_usage(self, db: Session, session_id: str, since_days: float = None) -> Optional[dict]:
+        if not db.query(ChatSession.id).filter_by(id=session_id).first():
+            return None
+        base = self._since_filter(db.query(ChatMessage).filter(ChatMessage.session_id == session_id), since_days)
+        return {
+            "session_id": session_id,
+            "totals": self._serialize_totals(base.with_entities(*self._totals_columns()).one()),
+            "tools": self._tool_breakdown(base),
+        }
+
+    def get_space_usage(self, db: Session, space_id_str: str, since_days: float = None, top_sessions: int = 10) -> Optional[dict]:
+        space_uuid = uuid.UUID(str(space_id_str)) # ValueError on malformed ids
+        if not db.query(Space.id).filter(Space.id == space_uuid).first():
+            return None
+        base = self._since_filter(
+            db.query(ChatMessage).join(ChatSession, ChatSession.id == ChatMessage.session_id)
+            .filter(ChatSession.space_id == space_uuid),
+            since_days,
+        )
+        total_tokens = func.coalesce(func.sum(ChatMessage.prompt_tokens), 0) + func.coalesce(func.sum(ChatMessage.completion_tokens), 0)
+        sessions = (
+            base.with_entities(ChatSession.id, ChatSession.name, *self._totals_columns())
+            .group_by(ChatSession.id, ChatSession.name)
+            .order_by(total_tokens.desc())
+            .limit(top_sessions)
+            .all()
+        )
+        return {
+            "space_id": str(space_uuid),
+            "totals": self._serialize_totals(base.with_entities(*self._totals_columns()).one()),
+            "tools": self._tool_breakdown(base),
+            "top_sessions": [{"session_id": s.id, "name": s.name, **self._serialize_totals(s)} for s in sessions],
+        }
+
+    def get_spaces_usage(self, db: Session, since_days: float = None, limit: int = 50) -> list:
+        """Spaces ranked by total tokens, to see which ones drive cost."""
+        total_tokens = func.coalesce(func.sum(ChatMessage.prompt_tokens), 0) + func.coalesce(func.sum(ChatMessage.completion_tokens), 0)
+        query = self._since_filter(
+            db.query(Space.id, Space.name, Space.type, *self._totals_columns())
+            .join(ChatSession, ChatSession.space_id == Space.id)
+            .join(ChatMessage, ChatMessage.session_id == ChatSession.id),
+            since_days,
+        )
+        rows = query.group_by(Space.id, Space.name, Space.type).order_by(total_tokens.desc()).limit(limit).all()
+        return [{"space_id": str(r.id), "name": r.name, "type": r.type.value, **self._serialize_totals(r)} for r in rows]
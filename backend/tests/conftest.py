@@ -0,0 +1,35 @@
+# devspace/backend/tests/conftest.py
+import os
+import uuid
+
+import pytest
+
+# Never point tests at the development database file; set before config is first imported
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+from sqlalchemy.orm import sessionmaker
+
+from database.db_session import Base, create_db_engine
+from database.models import Space, SpaceTypeEnum, ChatSession
+
+
+@pytest.fixture
+def db():
+    """A session on a fresh in-memory database with every model table."""
+    engine = create_db_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine)()
+    try:
+        yield session
+    finally:
+        session.close()
+        engine.dispose()
+
+
+@pytest.fixture
+def chat_session(db):
+    space = Space(id=uuid.uuid4(), name="test space", type=SpaceTypeEnum.DEV)
+    session = ChatSession(id=str(uuid.uuid4()), space_id=space.id, name="test session")
+    db.add_all([space, session])
+    db.commit()
+    return session
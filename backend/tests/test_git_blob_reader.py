@@ -0,0 +1,78 @@
+# devspace/backend/tests/test_git_blob_reader.py
+import shutil
+import subprocess
+
+import pytest
+
+from services.git_blob_reader import CatFileProcessClosed, GitBlobReader
+
+pytestmark = pytest.mark.skipif(shutil.which("git") is None, reason="git is not installed")
+
+
+def make_repo(path, files: dict) -> str:
+    def git(*args):
+        return subprocess.run(["git", "-C", str(path), "-c", "user.name=test", "-c", "user.email=test@example.com", *args],
+                              check=True, capture_output=True, text=True).stdout.strip()
+
+    path.mkdir()
+    git("init", "-q")
+    for name, content in files.items():
+        (path / name).write_text(content)
+    git("add", ".")
+    git("commit", "-q", "-m", "init")
+    return git("rev-parse", "HEAD")
+
+
+@pytest.fixture
+def reader(tmp_path):
+    reader = GitBlobReader(str(tmp_path / "blob_cache"), memory_cache_bytes=1024 * 1024, disk_cache_bytes=1024 * 1024,
+                           max_cached_blob_bytes=16, max_processes=1)
+    yield reader
+    reader.processes.clear()
+
+
+def test_read_blob_windows_cached_and_streamed_blobs(reader, tmp_path):
+    commit = make_repo(tmp_path / "repo", {"small.txt": "hello", "big.txt": "0123456789" * 10})
+    git_dir = str(tmp_path / "repo" / ".git")
+
+    small = reader.read_blob(git_dir, commit, "small.txt", byte_offset=1, max_bytes=3)
+    assert (small["data"], small["size"], small["truncated"]) == (b"ell", 5, True)
+    assert reader.read_blob(git_dir, commit, "small.txt")["data"] == b"hello" # From the blob cache
+
+    big = reader.read_blob(git_dir, commit, "big.txt", byte_offset=95) # Larger than max_cached_blob_bytes: streamed
+    assert (big["data"], big["size"]) == (b"56789", 100)
+    assert reader.read_blob(git_dir, commit, "missing.txt")["not_found"] is True
+
+
+def test_evicted_process_refuses_to_restart(reader, tmp_path):
+    commit_a = make_repo(tmp_path / "a", {"f": "a"})
+    make_repo(tmp_path / "b", {"f": "b"})
+    git_dir_a, git_dir_b = str(tmp_path / "a" / ".git"), str(tmp_path / "b" / ".git")
+
+    held = reader._processes_for(git_dir_a)["check"] # e.g. a request still holding it
+    assert held.info(f"{commit_a}:f")[1] == "blob"
+    reader.resolve(git_dir_b, "HEAD") # max_processes=1: evicts and closes repo a's processes
+
+    with pytest.raises(CatFileProcessClosed):
+        held.info(f"{commit_a}:f")
+    assert held._process is None # Nothing was restarted behind the cache's back
+
+
+def test_reader_moves_to_a_fresh_process_after_eviction(reader, tmp_path, monkeypatch):
+    commit = make_repo(tmp_path / "repo", {"f": "content"})
+    git_dir = str(tmp_path / "repo" / ".git")
+    stale = reader._processes_for(git_dir)
+    reader.close_repo(git_dir)
+
+    # The lookup races with the eviction: the first attempt still gets the closed processes
+    calls = []
+    original = reader._processes_for
+
+    def racing_processes_for(mirror_path):
+        calls.append(mirror_path)
+        return stale if len(calls) == 1 else original(mirror_path)
+
+    monkeypatch.setattr(reader, "_processes_for", racing_processes_for)
+    assert reader.resolve(git_dir, f"{commit}:f")[2] == len("content")
+    assert len(calls) == 2
+    assert reader.processes.peek(git_dir)["check"] is not stale["check"]
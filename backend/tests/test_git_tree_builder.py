@@ -0,0 +1,112 @@
+# devspace/backend/tests/test_git_tree_builder.py
+import shutil
+import subprocess
+
+import pytest
+
+from services.git_service import GitService
+
+
+def ls_tree_record(mode, object_type, sha, size, path):
+    return f"{mode} {object_type} {sha} {size:>7}\t{path}".encode("utf-8") + b"\0"
+
+
+TREE, BLOB = "040000", "100644"
+SHA = "0" * 40
+
+
+@pytest.fixture
+def git_service():
+    return GitService()
+
+
+def names(nodes):
+    return [node["name"] for node in nodes]
+
+
+def test_nested_tree_with_folders_before_files(git_service):
+    raw = b"".join([
+        ls_tree_record(BLOB, "blob", SHA, 10, "README.md"),
+        ls_tree_record(TREE, "tree", "1" * 40, "-", "src"),
+        ls_tree_record(BLOB, "blob", SHA, 5, "src/app.py"),
+        ls_tree_record(TREE, "tree", "2" * 40, "-", "src/lib"),
+        ls_tree_record(BLOB, "blob", SHA, 7, "src/lib/util.py"),
+    ])
+    tree = git_service._build_tree_from_ls_tree(raw)
+    assert names(tree) == ["src", "README.md"]
+    src = tree[0]
+    assert src == {"id": "src", "name": "src", "type": "folder", "sha": "1" * 40, "children": src["children"]}
+    assert names(src["children"]) == ["lib", "app.py"]
+    assert src["children"][1]["size"] == 5
+    assert src["children"][0]["children"][0]["id"] == "src/lib/util.py"
+    assert tree[1]["size"] == 10
+
+
+def test_implicit_parent_folders_are_created(git_service):
+    # Without -t, git lists only blobs; parents are made up from the paths
+    raw = ls_tree_record(BLOB, "blob", SHA, 1, "a/b/c.txt")
+    tree = git_service._build_tree_from_ls_tree(raw)
+    assert names(tree) == ["a"]
+    assert names(tree[0]["children"]) == ["b"]
+    assert tree[0]["children"][0]["children"][0]["id"] == "a/b/c.txt"
+    assert "sha" not in tree[0]
+
+
+def test_submodules_symlinks_and_unicode_names(git_service):
+    raw = b"".join([
+        ls_tree_record("160000", "commit", SHA, "-", "vendor/lib"),
+        ls_tree_record("120000", "blob", SHA, 9, "link"),
+        ls_tree_record(BLOB, "blob", SHA, 3, "déjà vu.txt"),
+    ])
+    tree = git_service._build_tree_from_ls_tree(raw)
+    by_name = {node["name"]: node for node in tree + tree[0]["children"]}
+    assert by_name["lib"]["submodule"] is True and by_name["lib"]["size"] is None
+    assert by_name["link"]["symlink"] is True
+    assert "déjà vu.txt" in by_name
+
+
+def test_max_depth_marks_unloaded_folders_and_drops_deeper_entries(git_service):
+    raw = b"".join([
+        ls_tree_record(TREE, "tree", "1" * 40, "-", "src"),
+        ls_tree_record(TREE, "tree", "2" * 40, "-", "src/lib"),
+        ls_tree_record(BLOB, "blob", SHA, 7, "src/lib/util.py"),
+        ls_tree_record(BLOB, "blob", SHA, 5, "src/app.py"),
+    ])
+    tree = git_service._build_tree_from_ls_tree(raw, max_depth=1)
+    assert tree == [{"id": "src", "name": "src", "type": "folder", "sha": "1" * 40, "children": [], "children_loaded": False}]
+
+    tree = git_service._build_tree_from_ls_tree(raw, max_depth=2)
+    lib = tree[0]["children"][0]
+    assert lib["children"] == [] and lib["children_loaded"] is False
+    assert "children_loaded" not in tree[0]
+
+
+def test_base_path_prefixes_ids(git_service):
+    raw = ls_tree_record(BLOB, "blob", SHA, 1, "util.py")
+    assert git_service._build_tree_from_ls_tree(raw, base_path="src/lib")[0]["id"] == "src/lib/util.py"
+
+
+def test_empty_listing(git_service):
+    assert git_service._build_tree_from_ls_tree(b"") == []
+
+
+@pytest.mark.skipif(shutil.which("git") is None, reason="git is not installed")
+def test_matches_real_git_output(git_service, tmp_path):
+    def git(*args):
+        return subprocess.run(["git", "-C", str(tmp_path), "-c", "user.name=test", "-c", "user.email=test@example.com", *args],
+                              check=True, capture_output=True).stdout
+
+    git("init", "-q")
+    (tmp_path / "src" / "lib").mkdir(parents=True)
+    (tmp_path / "src" / "lib" / "util.py").write_text("print('hi')\n")
+    (tmp_path / "src" / "app.py").write_text("")
+    (tmp_path / "with space.txt").write_text("x")
+    git("add", ".")
+    git("commit", "-q", "-m", "init")
+
+    tree = git_service._build_tree_from_ls_tree(git("ls-tree", "-r", "-t", "-z", "--long", "HEAD"))
+    assert names(tree) == ["src", "with space.txt"]
+    assert names(tree[0]["children"]) == ["lib", "app.py"]
+    util = tree[0]["children"][0]["children"][0]
+    assert util["id"] == "src/lib/util.py" and util["size"] == len("print('hi')\n")
+    assert tree[0]["children"][1]["size"] == 0
@@ -0,0 +1,111 @@
+# devspace/backend/tests/test_history_budget.py
+import pytest
+from sqlalchemy.orm import sessionmaker
+
+from config import config as app_config
+from core.token_budget import TRUNCATION_MARKER, estimate_message_tokens, truncate_to_tokens
+
+pytest.importorskip("langchain.memory")
+from langchain_core.messages import AIMessage, HumanMessage
+
+from services import conversation_history_service
+from services.chat_session_service import ChatSessionService
+from services.conversation_history_service import ConversationHistoryService, TokenBudgetChatMemory
+
+# 36 chars: 10 estimated tokens + 4 per-message overhead at 4 chars/token
+TEXT = "x" * 36
+MESSAGE_TOKENS = 14
+
+
+@pytest.fixture(autouse=True)
+def small_budgets(monkeypatch):
+    monkeypatch.setattr(app_config, "HISTORY_CHARS_PER_TOKEN", 4.0)
+    monkeypatch.setattr(app_config, "HISTORY_MAX_TOKENS", 5 * MESSAGE_TOKENS)
+    monkeypatch.setattr(app_config, "HISTORY_MAX_TOKENS_PER_MESSAGE", 1000)
+    monkeypatch.setattr(app_config, "HISTORY_SUMMARY_MIN_FOLD_TOKENS", 3 * MESSAGE_TOKENS)
+    monkeypatch.setattr(app_config, "HISTORY_SUMMARY_MAX_FOLD_MESSAGES", 200)
+    monkeypatch.setattr(app_config, "HISTORY_SUMMARY_MAX_TOKENS", 800)
+
+
+@pytest.fixture
+def history(db, monkeypatch):
+    # refresh_summary opens its own session; point it at the test database
+    monkeypatch.setattr(conversation_history_service, "SessionLocal", sessionmaker(bind=db.get_bind()))
+    return ConversationHistoryService()
+
+
+def add_messages(db, session_id, count, role="user", prefix="m"):
+    messages = [{"role": role, "content": f"{prefix}{i:03d}" + TEXT[3 + len(prefix):]} for i in range(count)]
+    ChatSessionService().add_messages_to_session(db, session_id, messages)
+    return messages
+
+
+def test_truncate_keeps_head_and_tail():
+    text = "HEAD" + "x" * 1000 + "TAIL"
+    short = truncate_to_tokens(text, 10)
+    assert short.startswith("HEAD") and short.endswith("TAIL")
+    assert TRUNCATION_MARKER.format(omitted=len(text) - 40) in short
+    assert truncate_to_tokens("short", 10) == "short"
+
+
+def test_window_packs_newest_messages_into_the_budget(db, chat_session, history):
+    add_messages(db, chat_session.id, 8)
+    window = history.get_budgeted_history(db, chat_session.id, include_unfolded_overflow=False)
+    assert [m["content"][:4] for m in window["messages"]] == ["m003", "m004", "m005", "m006", "m007"]
+    assert window["window_start_id"] == window["messages"][0]["id"]
+    assert sum(estimate_message_tokens(m["content"]) for m in window["messages"]) <= app_config.HISTORY_MAX_TOKENS
+
+
+def test_tool_messages_are_not_replayed(db, chat_session, history):
+    add_messages(db, chat_session.id, 2)
+    add_messages(db, chat_session.id, 3, role="tool", prefix="t")
+    window = history.get_budgeted_history(db, chat_session.id, include_unfolded_overflow=False)
+    assert [m["role"] for m in window["messages"]] == ["user", "user"]
+
+
+def test_unfolded_overflow_stays_in_the_window(db, chat_session, history):
+    add_messages(db, chat_session.id, 8)
+    window = history.get_budgeted_history(db, chat_session.id)
+    # Nothing is summarized yet, so the three messages past the budget are kept rather than dropped
+    assert len(window["messages"]) == 8
+    assert window["summary"] is None
+
+
+def test_refresh_summary_waits_for_enough_overflow(db, chat_session, history):
+    add_messages(db, chat_session.id, 7) # Two messages past the budget, fold threshold is three
+    assert history.refresh_summary(chat_session.id, ConversationHistoryService.extractive_summary) is False
+
+
+def test_refresh_summary_folds_overflow_and_moves_the_watermark(db, chat_session, history):
+    add_messages(db, chat_session.id, 8)
+    assert history.refresh_summary(chat_session.id, ConversationHistoryService.extractive_summary) is True
+    db.expire_all() # The fold was committed through another session
+
+    summary, watermark = history.get_summary_state(db, chat_session.id)
+    assert [line[:len("- user: m00x")] for line in summary.splitlines()] == ["- user: m000", "- user: m001", "- user: m002"]
+    window = history.get_budgeted_history(db, chat_session.id)
+    assert window["summary_through_message_id"] == watermark
+    assert window["messages"][0]["id"] == watermark + 1
+    assert [m["content"][:4] for m in window["messages"]] == ["m003", "m004", "m005", "m006", "m007"]
+
+
+def test_summary_state_of_unknown_session(db, history):
+    assert history.get_summary_state(db, "missing") == (None, None)
+    assert history.get_budgeted_history(db, "missing")["messages"] == []
+
+
+def test_extractive_summary_keeps_the_newest_part(monkeypatch):
+    monkeypatch.setattr(app_config, "HISTORY_SUMMARY_MAX_TOKENS", 10)
+    messages = [{"role": "user", "content": f"line {i}"} for i in range(20)]
+    summary = ConversationHistoryService.extractive_summary("previous", messages)
+    assert len(summary) == 40
+    assert summary.endswith("- user: line 19")
+
+
+def test_memory_prunes_oldest_messages_past_its_token_limit():
+    memory = TokenBudgetChatMemory(memory_key="chat_history", return_messages=True, max_token_limit=3 * MESSAGE_TOKENS)
+    for i in range(2):
+        memory.save_context({"input": f"q{i}" + TEXT[2:]}, {"output": f"a{i}" + TEXT[2:]})
+    messages = memory.chat_memory.messages
+    assert [type(m) for m in messages] == [AIMessage, HumanMessage, AIMessage]
+    assert messages[0].content.startswith("a0")
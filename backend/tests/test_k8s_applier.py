@@ -0,0 +1,191 @@
+# devspace/backend/tests/test_k8s_applier.py
+import threading
+import time
+
+import pytest
+
+pytest.importorskip("kubernetes")
+import yaml
+
+from services import k8s_applier
+from services.k8s_applier import K8sApplier, object_diff, parse_manifest, render_apply_result
+
+
+# --- manifests ---
+def test_parse_manifest_splits_documents_and_flattens_lists():
+    manifest = """
+apiVersion: v1
+kind: Namespace
+metadata: {name: shop}
+---
+---
+apiVersion: v1
+kind: ConfigMapList
+items:
+  - {apiVersion: v1, kind: ConfigMap, metadata: {name: a}}
+  - null
+  - {apiVersion: v1, kind: ConfigMap, metadata: {name: b}}
+"""
+    objects = parse_manifest(manifest)
+    assert [(o["kind"], o["metadata"]["name"]) for o in objects] == [("Namespace", "shop"), ("ConfigMap", "a"), ("ConfigMap", "b")]
+
+
+def test_parse_manifest_keeps_list_kinds_without_items():
+    assert parse_manifest("kind: List\nitems: not-a-list\n") == [{"kind": "List", "items": "not-a-list"}]
+
+
+def test_parse_manifest_raises_on_invalid_yaml():
+    with pytest.raises(yaml.YAMLError):
+        parse_manifest("kind: [unclosed")
+
+
+# --- diffs ---
+def test_object_diff_reports_leaf_changes_in_path_order():
+    before = {"spec": {"replicas": 2, "template": {"spec": {"containers": [{"image": "web:1"}]}}}, "metadata": {"labels": {"a": "1"}}}
+    after = {"spec": {"replicas": 3, "template": {"spec": {"containers": [{"image": "web:2"}]}}}, "metadata": {"labels": {"b": "2"}}}
+    assert object_diff(before, after) == [
+        {"path": "metadata.labels.a", "before": "1", "after": None},
+        {"path": "metadata.labels.b", "before": None, "after": "2"},
+        {"path": "spec.replicas", "before": 2, "after": 3},
+        {"path": "spec.template.spec.containers", "before": [{"image": "web:1"}], "after": [{"image": "web:2"}]},
+    ]
+
+
+def test_object_diff_ignores_server_bookkeeping():
+    before = {"metadata": {"name": "web", "resourceVersion": "1", "generation": 1, "managedFields": [{}],
+                           "annotations": {"kubectl.kubernetes.io/last-applied-configuration": "{}"}},
+              "status": {"readyReplicas": 1}}
+    after = {"metadata": {"name": "web", "resourceVersion": "2", "generation": 2, "managedFields": [{}, {}],
+                          "annotations": {"kubectl.kubernetes.io/last-applied-configuration": "{...}"}},
+             "status": {"readyReplicas": 3}}
+    assert object_diff(before, after) == []
+
+
+def test_object_diff_of_a_new_object():
+    assert object_diff(None, {"data": {"k": "v"}}) == [{"path": "data.k", "before": None, "after": "v"}]
+
+
+def test_object_diff_treats_empty_dicts_as_values():
+    assert object_diff({"data": {}}, {"data": {"k": "v"}}) == [
+        {"path": "data", "before": {}, "after": None},
+        {"path": "data.k", "before": None, "after": "v"},
+    ]
+
+
+# --- discovery ---
+class FakeResources:
+    """Fails the test if two threads use it at once, like the dynamic client's unsynchronized resource cache."""
+
+    def __init__(self, log):
+        self.log = log
+        self.busy = threading.Lock()
+
+    def get(self, api_version, kind):
+        assert self.busy.acquire(blocking=False), "concurrent discovery on one DynamicClient"
+        try:
+            time.sleep(0.01)
+            self.log.append((api_version, kind))
+            return f"{api_version}/{kind}"
+        finally:
+            self.busy.release()
+
+
+def make_discovery(monkeypatch):
+    built, lookups = [], []
+
+    class FakeDynamicClient:
+        def __init__(self, api_client):
+            built.append(api_client)
+            self.resources = FakeResources(lookups)
+
+    monkeypatch.setattr(k8s_applier.dynamic, "DynamicClient", FakeDynamicClient)
+    applier = K8sApplier(field_manager="test", mapping_ttl_seconds=60, crd_wait_seconds=0, apply_timeout_seconds=5)
+    return applier, built, lookups
+
+
+def test_concurrent_lookups_share_one_serialized_discovery(monkeypatch):
+    applier, built, lookups = make_discovery(monkeypatch)
+    clients = {"context_key": "ctx", "generation": 1, "api_client": object()}
+    kinds = [("apps/v1", "Deployment"), ("v1", "Service"), ("v1", "ConfigMap")] * 4
+    results, errors = [], []
+
+    def resolve(api_version, kind):
+        try:
+            results.append(applier._resource_for(clients, api_version, kind))
+        except AssertionError as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=resolve, args=kind) for kind in kinds]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    assert len(built) == 1
+    assert sorted(lookups) == sorted(set(kinds)) # Each kind is discovered once, later callers hit the cache
+    assert len(results) == len(kinds)
+
+
+def test_a_rebuilt_client_gets_its_own_discovery(monkeypatch):
+    applier, built, lookups = make_discovery(monkeypatch)
+    api_client = object() # Same object identity, new credentials generation
+    applier._resource_for({"context_key": "ctx", "generation": 1, "api_client": api_client}, "v1", "Service")
+    applier._resource_for({"context_key": "ctx", "generation": 2, "api_client": api_client}, "v1", "Service")
+    assert len(built) == 2 and len(lookups) == 2
+
+
+# --- apply ordering ---
+class RecordingApplier(K8sApplier):
+    """Replaces the API calls with a log of which objects were applied in which phase."""
+
+    def __init__(self):
+        super().__init__(field_manager="test", mapping_ttl_seconds=60, crd_wait_seconds=5, apply_timeout_seconds=5)
+        self.applied = []
+        self._applied_lock = threading.Lock()
+
+    def _apply_one(self, clients, obj, default_namespace, dry_run, force_conflicts, wait_seconds):
+        with self._applied_lock:
+            self.applied.append((obj["kind"], wait_seconds))
+        if obj["metadata"]["name"] == "bad":
+            raise RuntimeError("boom")
+        return {"kind": obj["kind"], "name": obj["metadata"]["name"], "namespace": default_namespace, "action": "created", "diff": []}
+
+
+def manifest_object(kind, name):
+    return {"apiVersion": "v1", "kind": kind, "metadata": {"name": name}}
+
+
+def test_apply_runs_crds_and_namespaces_first_and_keeps_manifest_order():
+    applier = RecordingApplier()
+    objects = [manifest_object("Deployment", "web"), manifest_object("Namespace", "shop"),
+               manifest_object("CustomResourceDefinition", "widgets"), manifest_object("Widget", "bad")]
+    result = applier.apply({}, objects, "default")
+
+    assert applier.applied[:2] == [("CustomResourceDefinition", 0), ("Namespace", 0)]
+    # New CRDs in this apply: the last phase waits for their kinds to show up in discovery
+    assert sorted(applier.applied[2:]) == [("Deployment", 5), ("Widget", 5)]
+    assert [r["name"] for r in result["results"]] == ["web", "shop", "widgets", "bad"]
+    assert result["results"][3]["action"] == "error" and result["results"][3]["error"] == "boom"
+    assert result["counts"] == {"created": 3, "error": 1}
+    assert result["success"] is False
+
+
+def test_dry_run_does_not_wait_for_crds():
+    applier = RecordingApplier()
+    applier.apply({}, [manifest_object("CustomResourceDefinition", "widgets"), manifest_object("Widget", "w")], "default", dry_run=True)
+    assert ("Widget", 0) in applier.applied
+
+
+def test_render_apply_result():
+    result = {"dry_run": True, "counts": {"configured": 1, "error": 1}, "results": [
+        {"kind": "Deployment", "name": "web", "namespace": "shop", "action": "configured",
+         "diff": [{"path": "spec.replicas", "before": 2, "after": 3}]},
+        {"kind": "Widget", "name": "w", "namespace": None, "action": "error", "error": "Unknown kind v1/Widget."},
+    ]}
+    assert render_apply_result(result).splitlines() == [
+        "Dry run: 1 configured, 1 error",
+        "- Deployment/web (ns shop): would be configured",
+        "    spec.replicas: 2 -> 3",
+        "- Widget/w: ERROR Unknown kind v1/Widget.",
+    ]
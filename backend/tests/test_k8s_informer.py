@@ -0,0 +1,157 @@
+# devspace/backend/tests/test_k8s_informer.py
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("kubernetes")
+from kubernetes import client
+
+from services import k8s_informer_cache
+from services.k8s_informer_cache import (K8sInformer, fields_match, labels_match, parse_field_selector,
+                                         parse_label_selector)
+
+
+# --- selectors ---
+def test_parse_label_selector_operators():
+    assert parse_label_selector("app=web, tier!=db,env in (prod, staging),track notin (canary),owner,!legacy,x==y") == [
+        ("app", "=", {"web"}),
+        ("tier", "!=", {"db"}),
+        ("env", "in", {"prod", "staging"}),
+        ("track", "notin", {"canary"}),
+        ("owner", "exists", set()),
+        ("legacy", "!exists", set()),
+        ("x", "=", {"y"}),
+    ]
+
+
+@pytest.mark.parametrize("selector", [None, "", " , "])
+def test_empty_label_selector_matches_everything(selector):
+    assert parse_label_selector(selector) == []
+    assert labels_match({"app": "web"}, parse_label_selector(selector))
+
+
+@pytest.mark.parametrize("selector,labels,expected", [
+    ("app=web", {"app": "web"}, True),
+    ("app=web", {"app": "api"}, False),
+    ("app=web", {}, False),
+    ("app!=web", {}, True), # != and notin also match objects without the label
+    ("env in (a,b)", {"env": "b"}, True),
+    ("env notin (a,b)", {"env": "b"}, False),
+    ("env notin (a,b)", {}, True),
+    ("owner", {"owner": ""}, True),
+    ("!owner", {"owner": "x"}, False),
+    ("app=web,env in (prod)", {"app": "web", "env": "dev"}, False),
+])
+def test_labels_match(selector, labels, expected):
+    assert labels_match(labels, parse_label_selector(selector)) is expected
+
+
+def test_field_selectors():
+    requirements = parse_field_selector("status.phase!=Running,spec.nodeName==node-1")
+    assert requirements == [("status.phase", "!=", "Running"), ("spec.nodeName", "=", "node-1")]
+    assert fields_match({"status": "Pending", "nodeName": "node-1"}, requirements)
+    assert not fields_match({"status": "Running", "nodeName": "node-1"}, requirements)
+    assert not fields_match({"status": "Pending", "nodeName": None}, requirements)
+
+
+# --- list/watch loop ---
+def obj(name, rv, **labels):
+    return {"namespace": "default", "name": name, "labels": labels, "resourceVersion": rv}
+
+
+def page(items, resource_version, continue_token=None):
+    return SimpleNamespace(items=items, metadata=SimpleNamespace(_continue=continue_token, resource_version=resource_version))
+
+
+class FakeWatch:
+    """Plays one scripted step per stream() call: a list of events, or an exception to raise."""
+
+    def __init__(self, script, informer):
+        self.script, self.informer = script, informer
+
+    def __call__(self):
+        return self
+
+    def stream(self, list_fn, **kwargs):
+        if not self.script:
+            self.informer._stop.set()
+            return
+        step = self.script.pop(0)
+        if isinstance(step, Exception):
+            raise step
+        yield from step
+
+    def stop(self):
+        pass
+
+
+def make_informer(monkeypatch, pages, watch_script):
+    calls = []
+
+    def list_fn(**kwargs):
+        calls.append(kwargs)
+        return pages[len(calls) - 1] if len(calls) <= len(pages) else pages[-1]
+
+    informer = K8sInformer("test", list_fn, "default", project=lambda item: item, resync_seconds=3600,
+                           watch_timeout_seconds=1, max_objects=100)
+    monkeypatch.setattr(k8s_informer_cache.watch, "Watch", FakeWatch(watch_script, informer))
+    return informer, calls
+
+
+def test_relist_follows_continue_tokens_and_indexes_labels(monkeypatch):
+    pages = [page([obj("a", "1", app="web")], "5", continue_token="next"), page([obj("b", "2", app="api")], "5")]
+    informer, calls = make_informer(monkeypatch, pages, [])
+    informer._relist()
+    assert calls[1]["_continue"] == "next"
+    assert informer.resource_version == "5"
+    assert [o["name"] for o in informer.list("app=web")] == ["a"]
+    assert [o["name"] for o in informer.list("app!=web")] == ["b"]
+
+
+def test_watch_events_update_the_store(monkeypatch):
+    events = [
+        {"type": "ADDED", "object": obj("c", "6", app="web"), "raw_object": {}},
+        {"type": "MODIFIED", "object": obj("a", "7", app="api"), "raw_object": {}},
+        {"type": "DELETED", "object": obj("b", "8"), "raw_object": {}},
+        {"type": "BOOKMARK", "object": None, "raw_object": {"metadata": {"resourceVersion": "9"}}},
+    ]
+    informer, _ = make_informer(monkeypatch, [page([obj("a", "1", app="web"), obj("b", "2")], "5")], [events])
+    informer._run()
+    assert [o["name"] for o in informer.list("app=web")] == ["c"]
+    assert [o["name"] for o in informer.list()] == ["a", "c"]
+    assert informer.resource_version == "9"
+    assert informer.stats()["events"] == 3
+
+
+def test_410_error_event_triggers_a_relist(monkeypatch):
+    gone = [{"type": "ERROR", "object": None, "raw_object": {"code": 410, "message": "too old resource version"}}]
+    pages = [page([obj("a", "1")], "5"), page([obj("a", "1"), obj("b", "12")], "12")]
+    informer, calls = make_informer(monkeypatch, pages, [gone, []])
+    informer._run()
+    assert len(calls) == 2
+    assert informer.stats()["relists"] == 2 and informer.stats()["errors"] == 0
+    assert informer.resource_version == "12"
+    assert [o["name"] for o in informer.list()] == ["a", "b"]
+
+
+def test_410_api_exception_triggers_a_relist_without_backoff(monkeypatch):
+    pages = [page([obj("a", "1")], "5"), page([], "20")]
+    informer, calls = make_informer(monkeypatch, pages, [client.ApiException(status=410, reason="Gone"), []])
+    informer._run()
+    assert len(calls) == 2
+    assert informer.stats()["errors"] == 0
+    assert informer.list() == []
+    assert informer.usable is False # Stopped by the fake watch
+
+
+def test_unauthorized_disables_the_informer(monkeypatch):
+    informer, _ = make_informer(monkeypatch, [page([], "5")], [client.ApiException(status=401, reason="Unauthorized")])
+    informer._run()
+    assert informer.unauthorized is True
+    assert informer.last_error.endswith("(Status: 401)")
+
+
+def test_overflow_disables_the_informer(monkeypatch):
+    informer, _ = make_informer(monkeypatch, [page([obj(str(i), "1") for i in range(101)], "5")], [])
+    informer._run()
+    assert informer.overflowed is True and informer.usable is False
@@ -0,0 +1,142 @@
+# devspace/backend/tests/test_k8s_log_streamer.py
+import re
+
+import pytest
+
+pytest.importorskip("kubernetes")
+
+from services.k8s_log_streamer import (LogLineFilter, _timestamp_key, format_entry, merge_log_streams,
+                                       open_log_streams, render_log_tail, tail_within_budget)
+
+
+class FakeLogResponse:
+    """Streams 'text' in small chunks that split lines, like a urllib3 response with _preload_content=False."""
+
+    def __init__(self, text: str, chunk_size: int = 7):
+        self.data = text.encode("utf-8")
+        self.chunk_size = chunk_size
+        self.released = False
+        self.closed = False
+
+    def stream(self, amt, decode_content=True):
+        for start in range(0, len(self.data), self.chunk_size):
+            yield self.data[start:start + self.chunk_size]
+
+    def release_conn(self):
+        self.released = True
+
+    def close(self):
+        self.closed = True
+
+
+# --- filtering ---
+def test_filter_by_regex_and_level():
+    line_filter = LogLineFilter(pattern=r"timeout|refused", min_level="warn")
+    assert line_filter.matches("ERROR connection refused")
+    assert line_filter.matches("level=warning msg=\"read timeout\"")
+    assert not line_filter.matches("INFO connection refused") # Below the minimum level
+    assert not line_filter.matches("ERROR disk full") # No regex match
+    assert not line_filter.matches("connection refused") # No recognizable level
+
+
+def test_filter_level_words_need_word_boundaries():
+    line_filter = LogLineFilter(min_level="error")
+    assert line_filter.matches("[FATAL] boom")
+    assert not line_filter.matches("terrorist INFO") # 'error' inside a word does not count
+
+
+def test_empty_filter_matches_everything():
+    assert LogLineFilter().matches("")
+
+
+def test_filter_rejects_unknown_level_and_bad_regex():
+    with pytest.raises(ValueError):
+        LogLineFilter(min_level="loud")
+    with pytest.raises(re.error):
+        LogLineFilter(pattern="(")
+
+
+# --- merging ---
+def test_timestamp_key_orders_trimmed_fractions():
+    stamps = ["2025-05-20T10:00:00.5Z", "2025-05-20T10:00:00Z", "2025-05-20T10:00:00.123456789Z", "2025-05-20T10:00:00.05Z"]
+    assert sorted(stamps, key=_timestamp_key) == [
+        "2025-05-20T10:00:00Z", "2025-05-20T10:00:00.05Z", "2025-05-20T10:00:00.123456789Z", "2025-05-20T10:00:00.5Z",
+    ]
+
+
+def test_finished_logs_are_merged_by_timestamp():
+    web = FakeLogResponse("2025-05-20T10:00:01Z INFO web 1\n2025-05-20T10:00:03.5Z ERROR web 2\n")
+    api = FakeLogResponse("2025-05-20T10:00:00.9Z INFO api 1\n2025-05-20T10:00:03.25Z INFO api 2") # No trailing newline
+    entries = list(merge_log_streams([("web-0", "app", web), ("api-0", "app", api)], LogLineFilter()))
+    assert [e["message"] for e in entries] == ["INFO api 1", "INFO web 1", "INFO api 2", "ERROR web 2"]
+    assert entries[0]["pod"] == "api-0" and entries[0]["ts"] == "2025-05-20T10:00:00.9Z"
+    assert web.released and api.released
+
+
+def test_merge_applies_the_filter_per_line():
+    response = FakeLogResponse("2025-05-20T10:00:01Z INFO ok\n2025-05-20T10:00:02Z ERROR bad\n")
+    entries = list(merge_log_streams([("p", "c", response)], LogLineFilter(min_level="error")))
+    assert [e["message"] for e in entries] == ["ERROR bad"]
+
+
+def test_follow_mode_interleaves_all_streams_and_ends_with_them():
+    streams = [(f"pod-{i}", "app", FakeLogResponse(f"2025-05-20T10:00:0{i}Z line {i}\n" * 3)) for i in range(3)]
+    entries = list(merge_log_streams(streams, LogLineFilter(), follow=True))
+    assert sorted(e["message"] for e in entries) == sorted(f"line {i}" for i in range(3) for _ in range(3))
+    assert all(response.closed for _, _, response in streams)
+
+
+def test_follow_mode_reports_a_broken_stream():
+    class Broken(FakeLogResponse):
+        def stream(self, amt, decode_content=True):
+            yield b"2025-05-20T10:00:00Z first\n"
+            raise IOError("connection reset")
+
+    entries = list(merge_log_streams([("p", "c", Broken(""))], LogLineFilter(), follow=True))
+    assert [e["message"] for e in entries] == ["first", "[log stream error: connection reset]"]
+
+
+def test_open_log_streams_collects_per_container_errors():
+    class FakeCoreV1:
+        def __init__(self):
+            self.calls = []
+
+        def read_namespaced_pod_log(self, **kwargs):
+            self.calls.append(kwargs)
+            if kwargs["name"] == "broken":
+                raise RuntimeError("container not found")
+            return FakeLogResponse("")
+
+    core_v1 = FakeCoreV1()
+    result = open_log_streams(core_v1, "default", [("web-0", "app"), ("broken", "app")], tail_lines=50, limit_bytes=1024)
+    assert [(pod, container) for pod, container, _ in result["streams"]] == [("web-0", "app")]
+    assert result["errors"] == [{"pod": "broken", "container": "app", "error": "container not found"}]
+    call = next(c for c in core_v1.calls if c["name"] == "web-0")
+    assert call["timestamps"] is True and call["_preload_content"] is False
+    assert call["tail_lines"] == 50 and call["limit_bytes"] == 1024 and "since_seconds" not in call
+
+
+# --- output budget ---
+def entry(i):
+    return {"ts": f"2025-05-20T10:00:{i:02d}Z", "pod": "p", "container": "c", "message": f"message {i}"}
+
+
+def test_tail_within_budget_keeps_the_newest_lines():
+    line_bytes = len(format_entry(entry(0))) + 1
+    result = tail_within_budget((entry(i) for i in range(10)), max_bytes=3 * line_bytes)
+    assert result["lines"] == [format_entry(entry(i)) for i in (7, 8, 9)]
+    assert result["matched"] == 10 and result["dropped"] == 7
+
+
+def test_tail_within_budget_smaller_than_one_line():
+    result = tail_within_budget([entry(1)], max_bytes=5)
+    assert result == {"lines": [], "matched": 1, "dropped": 1}
+
+
+def test_render_log_tail_notes():
+    text = render_log_tail({"lines": [], "dropped": 2, "errors": [{"pod": "p", "container": "c", "error": "gone"}]})
+    assert text.splitlines() == [
+        "[2 older matching lines omitted to fit the output budget]",
+        "[could not read p/c: gone]",
+        "[no matching log lines]",
+    ]
@@ -0,0 +1,113 @@
+# devspace/backend/tests/test_llm_router.py
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("langchain_google_genai")
+
+from config import config as app_config
+from services.llm_router import LLMRoute, LLMRouter, ModelSpec, parse_model_spec
+
+
+@pytest.fixture(autouse=True)
+def providers(monkeypatch):
+    """Gemini and ChatGPT configured, no OpenAI-compatible endpoint, no global routing."""
+    monkeypatch.setattr(app_config, "GOOGLE_API_KEY", "test-key")
+    monkeypatch.setattr(app_config, "OPENAI_API_KEY", "test-key")
+    monkeypatch.setattr(app_config, "OPENAI_COMPATIBLE_BASE_URL", "")
+    monkeypatch.setattr(app_config, "DEFAULT_LLM_SOURCE", "gemini")
+    monkeypatch.setattr(app_config, "DEFAULT_LLM_MODEL", "gemini-default")
+    monkeypatch.setattr(app_config, "OPENAI_DEFAULT_MODEL", "gpt-default")
+    monkeypatch.setattr(app_config, "LLM_SOURCE_OVERRIDE", None)
+    monkeypatch.setattr(app_config, "LLM_FALLBACK_MODELS", "")
+    monkeypatch.setattr(app_config, "LLM_TOOL_STEP_MODEL", "")
+
+
+@pytest.fixture
+def router():
+    return LLMRouter(max_clients=4, idle_ttl_seconds=60, max_routes=16)
+
+
+def snapshot(llm_source=None, llm_model_name=None, routing=None, space_id="space-1", version=1):
+    return SimpleNamespace(space_id=space_id, version=version, llm_source=llm_source, llm_model_name=llm_model_name,
+                           agent_config={"llm_routing": routing} if routing else {})
+
+
+# --- model specs ---
+@pytest.mark.parametrize("text,expected", [
+    ("gemini", ModelSpec("gemini", "gemini-default")),
+    (" ChatGPT : gpt-4o ", ModelSpec("chatgpt", "gpt-4o")),
+    ("other:llama3.1:8b", ModelSpec("other", "llama3.1:8b")), # Only the first colon separates the source
+    ("chatgpt:", ModelSpec("chatgpt", "gpt-default")),
+])
+def test_parse_model_spec(text, expected):
+    assert parse_model_spec(text) == expected
+
+
+@pytest.mark.parametrize("text", [None, "", "   "])
+def test_parse_empty_model_spec(text):
+    assert parse_model_spec(text) is None
+
+
+def test_parse_model_spec_rejects_unknown_sources():
+    with pytest.raises(ValueError):
+        parse_model_spec("claude:whatever")
+
+
+def test_model_spec_str():
+    assert str(ModelSpec("other", "llama3.1:8b")) == "other:llama3.1:8b"
+
+
+# --- routes ---
+def test_global_defaults_without_a_space(router):
+    assert router._resolve_route(None) == LLMRoute(ModelSpec("gemini", "gemini-default"), None, ())
+
+
+def test_space_model_is_the_primary(router):
+    route = router._resolve_route(snapshot("chatgpt", "gpt-4o"))
+    assert route == LLMRoute(ModelSpec("chatgpt", "gpt-4o"), None, ())
+
+
+def test_fallbacks_and_tool_step_from_config(router, monkeypatch):
+    monkeypatch.setattr(app_config, "LLM_FALLBACK_MODELS", "chatgpt:gpt-4o, gemini:gemini-default, other:local, bogus:x")
+    monkeypatch.setattr(app_config, "LLM_TOOL_STEP_MODEL", "gemini:gemini-flash-lite")
+    route = router._resolve_route(snapshot("gemini"))
+    assert route.primary == ModelSpec("gemini", "gemini-default")
+    # The primary itself, unconfigured sources and unknown sources are left out
+    assert route.fallbacks == (ModelSpec("chatgpt", "gpt-4o"),)
+    assert route.tool_step == ModelSpec("gemini", "gemini-flash-lite")
+
+
+def test_space_routing_overrides_the_global_config(router, monkeypatch):
+    monkeypatch.setattr(app_config, "LLM_FALLBACK_MODELS", "chatgpt:gpt-4o")
+    monkeypatch.setattr(app_config, "LLM_TOOL_STEP_MODEL", "gemini:gemini-flash-lite")
+    route = router._resolve_route(snapshot("gemini", routing={"fallbacks": [], "tool_step_model": ""}))
+    assert route == LLMRoute(ModelSpec("gemini", "gemini-default"), None, ())
+
+
+def test_tool_step_equal_to_the_primary_is_dropped(router):
+    route = router._resolve_route(snapshot("chatgpt", "gpt-4o-mini", routing={"tool_step_model": "chatgpt:gpt-4o-mini"}))
+    assert route.tool_step is None
+
+
+def test_unconfigured_primary_falls_through_to_the_first_fallback(router):
+    route = router._resolve_route(snapshot("other", routing={"fallbacks": ["chatgpt:gpt-4o", "gemini"]}))
+    assert route.primary == ModelSpec("chatgpt", "gpt-4o")
+    assert route.fallbacks == (ModelSpec("gemini", "gemini-default"),)
+
+
+def test_unconfigured_primary_without_fallbacks_is_kept(router):
+    # Reported when the client is created rather than silently rerouted
+    assert router._resolve_route(snapshot("other")).primary.source == "other"
+
+
+def test_source_override_wins(router, monkeypatch):
+    monkeypatch.setattr(app_config, "LLM_SOURCE_OVERRIDE", "other:stand-in")
+    monkeypatch.setattr(app_config, "LLM_TOOL_STEP_MODEL", "gemini")
+    assert router._resolve_route(snapshot("chatgpt", "gpt-4o")) == LLMRoute(ModelSpec("other", "stand-in"), None, ())
+
+
+def test_routes_are_cached_per_config_version(router):
+    first = router.resolve_route(snapshot("chatgpt", "gpt-4o", version=1))
+    assert router.resolve_route(snapshot("gemini", version=1)) is first # Same version: cached route
+    assert router.resolve_route(snapshot("gemini", version=2)).primary == ModelSpec("gemini", "gemini-default")
@@ -0,0 +1,71 @@
+# devspace/backend/tests/test_message_cursor.py
+import pytest
+
+from services.chat_session_service import ChatSessionService
+
+
+@pytest.fixture
+def service():
+    return ChatSessionService()
+
+
+def add_turns(service, db, session_id, count):
+    # One bulk insert: every row shares the same server timestamp, so only the id orders them
+    messages = [{"role": "user" if i % 2 == 0 else "assistant", "content": f"message {i}"} for i in range(count)]
+    assert service.add_messages_to_session(db, session_id, messages) == count
+
+
+def collect_pages(service, db, session_id, limit, newest_first=False):
+    contents, cursor, pages = [], None, 0
+    while True:
+        page, cursor = service.get_messages_page(db, session_id, limit=limit, cursor=cursor, newest_first=newest_first)
+        contents.extend(message.content for message in page)
+        pages += 1
+        if not cursor:
+            return contents, pages
+
+
+def test_cursor_round_trip():
+    cursor = ChatSessionService._encode_message_cursor("2025-05-20 10:00:00.123456", 42, True)
+    assert "=" not in cursor # Padding is stripped so the cursor is query-string safe
+    assert ChatSessionService._decode_message_cursor(cursor) == {"ts": "2025-05-20 10:00:00.123456", "id": 42, "desc": True}
+
+
+@pytest.mark.parametrize("cursor", ["not-base64!", "bm90IGpzb24", "eyJ0cyI6IngifQ"]) # junk, "not json", {"ts":"x"}
+def test_malformed_cursor_raises_value_error(cursor):
+    with pytest.raises(ValueError):
+        ChatSessionService._decode_message_cursor(cursor)
+
+
+def test_pages_cover_every_message_once_in_order(service, db, chat_session):
+    add_turns(service, db, chat_session.id, 7)
+    contents, pages = collect_pages(service, db, chat_session.id, limit=3)
+    assert contents == [f"message {i}" for i in range(7)]
+    assert pages == 3
+
+
+def test_newest_first_pages(service, db, chat_session):
+    add_turns(service, db, chat_session.id, 5)
+    contents, _ = collect_pages(service, db, chat_session.id, limit=2, newest_first=True)
+    assert contents == [f"message {i}" for i in reversed(range(5))]
+
+
+def test_exact_multiple_of_limit_has_no_empty_last_page(service, db, chat_session):
+    add_turns(service, db, chat_session.id, 4)
+    page, cursor = service.get_messages_page(db, chat_session.id, limit=4)
+    assert len(page) == 4 and cursor is None
+
+
+def test_cursor_for_the_other_order_is_rejected(service, db, chat_session):
+    add_turns(service, db, chat_session.id, 3)
+    _, cursor = service.get_messages_page(db, chat_session.id, limit=1)
+    with pytest.raises(ValueError):
+        service.get_messages_page(db, chat_session.id, limit=1, cursor=cursor, newest_first=True)
+
+
+def test_messages_added_after_a_page_appear_on_the_next_one(service, db, chat_session):
+    add_turns(service, db, chat_session.id, 2)
+    _, cursor = service.get_messages_page(db, chat_session.id, limit=1)
+    service.add_message_to_session(db, chat_session.id, "user", "late")
+    page, _ = service.get_messages_page(db, chat_session.id, limit=10, cursor=cursor)
+    assert [message.content for message in page] == ["message 1", "late"]
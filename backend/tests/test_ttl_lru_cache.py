@@ -0,0 +1,171 @@
+# devspace/backend/tests/test_ttl_lru_cache.py
+import pytest
+
+from core import ttl_lru_cache
+from core.ttl_lru_cache import TTLLRUCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeClock()
+    monkeypatch.setattr(ttl_lru_cache.time, "monotonic", fake)
+    return fake
+
+
+def make_cache(evicted=None, **kwargs):
+    on_evict = (lambda key, value, reason: evicted.append((key, value, reason))) if evicted is not None else None
+    return TTLLRUCache("test", on_evict=on_evict, **kwargs)
+
+
+def test_lru_eviction_drops_least_recently_used():
+    evicted = []
+    cache = make_cache(evicted, max_entries=2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == 1 # 'a' is now the most recently used
+    cache.put("c", 3)
+    assert cache.keys() == ["a", "c"]
+    assert evicted == [("b", 2, "lru")]
+
+
+def test_weight_bound_evicts_until_under_max_weight():
+    evicted = []
+    cache = make_cache(evicted, max_entries=10, max_weight=10, weigher=len)
+    cache.put("a", b"xxxx")
+    cache.put("b", b"yyyy")
+    cache.put("c", b"zzzz") # 12 > 10: 'a' goes
+    assert cache.keys() == ["b", "c"]
+    assert evicted == [("a", b"xxxx", "lru")]
+    assert cache.stats()["weight"] == 8
+
+
+def test_single_value_heavier_than_max_weight_is_kept_alone():
+    cache = make_cache(max_entries=10, max_weight=4, weigher=len)
+    cache.put("a", b"xx")
+    cache.put("big", b"x" * 100)
+    assert cache.keys() == ["big"]
+    assert cache.stats()["weight"] == 100
+
+
+def test_replacing_a_value_updates_weight_and_reports_replaced():
+    evicted = []
+    cache = make_cache(evicted, max_entries=10, max_weight=100, weigher=len)
+    cache.put("a", b"xxxx")
+    cache.put("a", b"xx")
+    assert cache.stats()["weight"] == 2
+    assert evicted == [("a", b"xxxx", "replaced")]
+
+
+def test_idle_ttl_expires_on_access(clock):
+    evicted = []
+    cache = make_cache(evicted, idle_ttl_seconds=10)
+    cache.put("a", 1)
+    clock.now += 5
+    assert cache.get("a") == 1 # Reading refreshes the idle timer
+    clock.now += 9
+    assert cache.get("a") == 1
+    clock.now += 11
+    assert cache.get("a") is None
+    assert evicted == [("a", 1, "ttl")]
+    assert cache.stats()["evictions_ttl"] == 1
+
+
+def test_sweep_drops_only_expired_entries(clock):
+    evicted = []
+    cache = make_cache(evicted, idle_ttl_seconds=10)
+    cache.put("old", 1)
+    clock.now += 8
+    cache.put("new", 2)
+    clock.now += 5
+    assert cache.sweep() == 1
+    assert cache.keys() == ["new"]
+    assert evicted == [("old", 1, "ttl")]
+
+
+def test_peek_does_not_refresh_lru_position_or_count(clock):
+    cache = make_cache(max_entries=2, idle_ttl_seconds=10)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.peek("a") == 1
+    cache.put("c", 3) # 'a' was only peeked, so it is still the LRU entry
+    assert cache.keys() == ["b", "c"]
+    stats = cache.stats()
+    assert stats["hits"] == 0 and stats["misses"] == 0
+    clock.now += 11
+    assert cache.peek("b") is None
+    assert "b" not in cache
+
+
+def test_pop_and_pop_where_report_invalidated():
+    evicted = []
+    cache = make_cache(evicted, max_entries=10)
+    for key in ("repo1:a", "repo1:b", "repo2:a"):
+        cache.put(key, key.upper())
+    assert cache.pop("repo2:a") == "REPO2:A"
+    assert cache.pop("missing", "default") == "default"
+    assert cache.pop_where(lambda key, value: key.startswith("repo1:")) == 2
+    assert len(cache) == 0
+    assert sorted(evicted) == [("repo1:a", "REPO1:A", "invalidated"), ("repo1:b", "REPO1:B", "invalidated"),
+                               ("repo2:a", "REPO2:A", "invalidated")]
+    assert cache.stats()["invalidations"] == 3
+
+
+def test_get_or_create_builds_once_and_counts_hits():
+    calls = []
+    cache = make_cache(max_entries=10)
+    factory = lambda: calls.append(1) or "value"
+    assert cache.get_or_create("k", factory) == "value"
+    assert cache.get_or_create("k", factory) == "value"
+    assert len(calls) == 1
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["hit_rate"]) == (1, 1, 0.5)
+
+
+def test_get_or_create_race_keeps_first_insert():
+    evicted = []
+    cache = make_cache(evicted, max_entries=10)
+
+    def factory(): # Another thread inserts while this factory runs
+        cache.put("k", "winner")
+        return "loser"
+
+    assert cache.get_or_create("k", factory) == "winner"
+    assert evicted == [("k", "loser", "duplicate")]
+
+
+def test_on_evict_errors_do_not_break_the_cache():
+    def on_evict(key, value, reason):
+        raise RuntimeError("boom")
+
+    cache = TTLLRUCache("test", max_entries=1, on_evict=on_evict)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.keys() == ["b"]
+
+
+def test_stats_shape():
+    cache = make_cache(max_entries=3)
+    assert cache.stats()["hit_rate"] is None
+    assert "weight" not in cache.stats()
+    cache.put("a", 1)
+    cache.get("a")
+    cache.get("b")
+    assert cache.stats() == {
+        "name": "test", "size": 1, "max_entries": 3, "idle_ttl_seconds": None,
+        "hits": 1, "misses": 1, "evictions_lru": 0, "evictions_ttl": 0, "invalidations": 0, "hit_rate": 0.5,
+    }
+
+
+def test_invalid_configuration():
+    with pytest.raises(ValueError):
+        TTLLRUCache("test", max_entries=0)
+    with pytest.raises(ValueError):
+        TTLLRUCache("test", max_weight=10)
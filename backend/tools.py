@@ -61,49 +61,25 @@ def git_pull_updates(repo_id: str, branch_name: str = "main") -> str:
 
 # --- K8s Tool Example ---
 @tool
-def k8s_apply_manifest(manifest_content: str, namespace: str = "default") -> str:
+def k8s_apply_manifest(manifest_content: str, namespace: str = "default", dry_run: bool = False) -> str:
     """
-    Applies a Kubernetes manifest provided as a string using kubectl apply.
-    The manifest content should be a valid Kubernetes YAML or JSON string.
-    Returns the output of the kubectl command or an error message.
-    Security Note: This tool executes kubectl apply with the provided manifest.
-    Ensure the execution environment has appropriate, least-privilege RBAC permissions.
-    The manifest content itself is not deeply validated here beyond kubectl's own checks.
+    Applies a Kubernetes manifest provided as a string using server-side apply (current kubeconfig context).
+    The manifest content should be a valid Kubernetes YAML or JSON string, one or more documents.
+    Set 'dry_run' to see what would change without changing anything.
+    Returns a per-object summary (created / configured / unchanged / error) or an error message.
+    Security Note: Ensure the execution environment has appropriate, least-privilege RBAC permissions.
     """
-    # Use a temporary file for kubectl apply -f - (stdin can be tricky with subprocess)
-    import tempfile
-    tmp_file = None
+    from services.k8s_service import K8sService
+    from services.k8s_applier import render_apply_result
+    k8s_service = K8sService()
     try:
-        # Create a temporary file to hold the manifest content
-        with tempfile.NamedTemporaryFile(mode='w', delete=False, suffix=".yaml") as tmp_file:
-            tmp_file.write(manifest_content)
-            tmp_file_path = tmp_file.name
-
-        # Prepare kubectl command
-        ns_flag = f"-n {shlex.quote(namespace)}" if namespace else "-n default" # Always specify ns for safety
-        command = f"kubectl apply -f {shlex.quote(tmp_file_path)} {ns_flag}"
-        print(f"Executing command: {command}")
-
-        # Execute command
-        result = subprocess.run(command, shell=True, check=True, capture_output=True, text=True, timeout=60)
-        output = result.stdout.strip()
-        if not output:
-            output = f"kubectl apply successful for manifest in namespace '{namespace}' (no specific resource changes reported)."
-        return f"kubectl apply result in namespace '{namespace}':\n{output}"
-
-    except subprocess.TimeoutExpired:
-        return f"Error: kubectl apply command timed out in namespace '{namespace}'."
-    except subprocess.CalledProcessError as e:
-        error_message = e.stderr.strip()
-        if not error_message:
-            error_message = e.stdout.strip()
-        return f"Error running kubectl apply in namespace '{namespace}':\n{error_message}"
-    except Exception as e:
-        return f"An unexpected error occurred during kubectl apply in namespace '{namespace}': {str(e)}"
-    finally:
-        # Clean up the temporary file
-        if tmp_file_path and os.path.exists(tmp_file_path):
-            os.remove(tmp_file_path)
+        clients = k8s_service.get_clients_for_context(None)
+    except ConnectionError as e:
+        return f"Error: {e}"
+    result = k8s_service.apply_manifest(clients, namespace or "default", manifest_content, dry_run=bool(dry_run))
+    if "results" not in result:
+        return f"Error applying manifest in namespace '{namespace}': {result.get('error')}"
+    return render_apply_result(result)
 
 
 # --- Add more tools as needed ---
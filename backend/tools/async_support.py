@@ -0,0 +1,44 @@
+# devspace/backend/tools/async_support.py
+import asyncio
+import contextvars
+import functools
+from concurrent.futures import ThreadPoolExecutor
+
+from langchain_core.tools import StructuredTool
+
+from config import config as app_config
+
+# Dedicated pool for blocking tool bodies awaited from the async agent path. Kept separate from the
+# loop's default executor (used for DB work via asyncio.to_thread) so slow tools cannot starve it.
+_tool_executor = ThreadPoolExecutor(max_workers=app_config.ASYNC_TOOL_MAX_WORKERS, thread_name_prefix="agent-tool")
+
+
+def _make_coroutine(func):
+    @functools.wraps(func)
+    async def _run(*args, **kwargs):
+        loop = asyncio.get_running_loop()
+        ctx = contextvars.copy_context() # Carry request-scoped context into the worker thread
+        return await loop.run_in_executor(_tool_executor, functools.partial(ctx.run, func, *args, **kwargs))
+    return _run
+
+
+def with_async_support(tools: list) -> list:
+    """
+    Returns the tools with a coroutine attached, so AgentExecutor.ainvoke awaits them instead of
+    blocking the event loop. Tools that already have a coroutine (or are not StructuredTools) are
+    returned unchanged; the sync 'func' is kept, so the blocking invoke() path behaves as before.
+    """
+    async_tools = []
+    for t in tools:
+        if not isinstance(t, StructuredTool) or t.coroutine is not None or t.func is None:
+            async_tools.append(t)
+            continue
+        async_tools.append(StructuredTool.from_function(
+            func=t.func,
+            coroutine=_make_coroutine(t.func),
+            name=t.name,
+            description=t.description,
+            args_schema=t.args_schema,
+            return_direct=t.return_direct,
+        ))
+    return async_tools
@@ -4,38 +4,31 @@ import json
 
 from services.git_service import GitService
 from services.k8s_service import K8sService
+from services.k8s_applier import render_apply_result
+from services.k8s_log_streamer import render_log_tail
 from services.space_service import SpaceService
 from services.mcp_service import MCPService # <--- IMPORT MCPService
+from config import config as app_config
 
 git_service_instance = GitService()
 k8s_service_instance = K8sService()
 mcp_service_instance = MCPService() # Instantiate globally or per call
 space_service_instance = SpaceService()
 
-# --- Helper Functions (keep _get_git_url_from_space_id and _get_k8s_env_config as before) ---
+# --- Helper Functions: read the space's cached config snapshot (no DB session, no json.loads) ---
 def _get_git_url_from_space_id(space_id: str) -> str:
     if not space_id: return None
-    dev_config = space_service_instance.get_dev_config_object(space_id)
-    return dev_config.git_repo_url if dev_config and hasattr(dev_config, 'git_repo_url') else (dev_config.get('git_repo_url') if isinstance(dev_config, dict) else None)
+    snapshot = space_service_instance.get_config_snapshot(space_id)
+    return snapshot.dev.git_repo_url if snapshot and snapshot.dev else None
 
-def _get_k8s_env_config_for_space(space_id: str, environment_key: str) -> dict : # Renamed for clarity
+def _get_k8s_env_config_for_space(space_id: str, environment_key: str): # Read-only mapping, or None
     if not space_id: return None
-    dev_config = space_service_instance.get_dev_config_object(space_id) # Assumes this returns the ORM object or a dict
-    
-    k8s_envs_json_str = None
-    if hasattr(dev_config, 'k8s_environments_json'):
-        k8s_envs_json_str = dev_config.k8s_environments_json
-    elif isinstance(dev_config, dict):
-        k8s_envs_json_str = dev_config.get('k8s_environments_json')
-
-    if k8s_envs_json_str:
-        try:
-            envs = json.loads(k8s_envs_json_str)
-            return envs.get(environment_key)
-        except json.JSONDecodeError:
-            print(f"DEV_TOOLS: Error decoding k8s_environments_json for space {space_id}")
-            return None
-    return None
+    snapshot = space_service_instance.get_config_snapshot(space_id)
+    if not snapshot or not snapshot.dev:
+        return None
+    if snapshot.dev.k8s_environments_invalid:
+        print(f"DEV_TOOLS: Error decoding k8s_environments_json for space {space_id}")
+    return snapshot.dev.k8s_environments.get(environment_key)
 
 @tool
 def git_commit_and_push_via_mcp(space_id: str, branch: str, commit_message: str) -> str:
@@ -76,12 +69,53 @@ def get_repository_file_tree(space_id: str, branch: str) -> str:
     Returns the tree structure as a JSON string, or an error message if the operation fails.
     The JSON will represent a list of nodes, where each node has 'id', 'name', 'type' ('file' or 'folder'),
     and 'children' (for folders, a list of child nodes).
+    For large repositories use get_repository_subtree instead; this returns the entire tree.
     """
     if not space_id or not branch: return "Error: space_id and branch are required."
     result = git_service_instance.get_file_tree(space_id_str=space_id, branch=branch, force_refresh=False)
     if result.get("success"): return json.dumps({"tree": result.get("tree", []), "from_cache": result.get("from_cache", False)})
     return f"Error fetching file tree: {result.get('error', 'Unknown error')}. Details: {result.get('details','')}"
 
+def _compact_tree_nodes(nodes: list) -> list:
+    # Only what the model needs to navigate: no ids (derivable from names) and no object SHAs
+    compact = []
+    for node in nodes:
+        item = {"name": node["name"], "type": node["type"]}
+        if node.get("size") is not None: item["size"] = node["size"]
+        if node["type"] == "folder":
+            if node.get("children_loaded") is False: item["children"] = "not loaded"
+            else: item["children"] = _compact_tree_nodes(node.get("children", []))
+            if node.get("children_truncated"): item["children_total"] = node.get("children_total")
+        compact.append(item)
+    return compact
+
+@tool
+def get_repository_subtree(space_id: str, branch: str, path: str = "", depth: int = 2, max_entries: int = 100, offset: int = 0,
+                           commit_sha: str = "") -> str:
+    """
+    Lists part of the repository tree for 'space_id' on 'branch': the folder 'path' (relative to the
+    repo root, "" for the root), 'depth' levels deep (1-5 by default), at most 'max_entries' entries per folder.
+    Prefer this over get_repository_file_tree for large repositories, e.g. path="src", depth=2.
+    Folders deeper than 'depth' show "children": "not loaded"; call again with that folder as 'path'.
+    If the result has 'next_offset', call again with offset=<next_offset> and the returned 'commit_sha'
+    as 'commit_sha' so every page comes from the same commit.
+    Returns a JSON string, or an error message.
+    """
+    if not space_id or not branch: return "Error: space_id and branch are required."
+    depth = max(1, min(int(depth or 1), app_config.GIT_SUBTREE_MAX_DEPTH))
+    max_entries = max(1, min(int(max_entries or 100), app_config.GIT_SUBTREE_MAX_LIMIT))
+    result = git_service_instance.get_subtree(space_id, branch, path=path, depth=depth, offset=max(0, int(offset or 0)),
+                                              limit=max_entries, commit_sha=commit_sha or None)
+    if not result.get("success"):
+        return f"Error fetching subtree: {result.get('error', 'Unknown error')}"
+    return json.dumps({
+        "path": result["path"] or "/",
+        "commit_sha": result["commit_sha"],
+        "total_entries": result["total"],
+        "next_offset": result["next_offset"],
+        "entries": _compact_tree_nodes(result["entries"]),
+    }, separators=(",", ":"))
+
 @tool
 def list_repository_branches(space_id: str) -> str:
     """
@@ -98,10 +132,13 @@ def list_repository_branches(space_id: str) -> str:
     return f"Error listing branches: {result.get('error', 'Unknown error')}. Details: {result.get('stderr','')}"
 
 @tool
-def read_file_content_from_repo(space_id: str, branch: str, file_path: str) -> str:
+def read_file_content_from_repo(space_id: str, branch: str, file_path: str, start_line: int = None, end_line: int = None, byte_offset: int = 0, max_bytes: int = None) -> str:
     """
     Reads the content of a specific file from the Git repository associated with the 'space_id',
     on the given 'branch', at the specified 'file_path' (relative to the repo root).
+    Optionally pass 'start_line'/'end_line' (1-based, inclusive) to read only those lines, or
+    'byte_offset'/'max_bytes' to read a byte window of a large file. Long output is truncated;
+    a note at the end says which part was returned.
     Returns the file content as a string or an error message.
     """
     if not all([space_id, branch, file_path]):
@@ -110,14 +147,24 @@ def read_file_content_from_repo(space_id: str, branch: str, file_path: str) -> s
     if not git_repo_url:
         return f"Error: No Git repository URL configured for space ID '{space_id}'."
 
-    # GitService needs a method like get_file_content(git_repo_url, branch, file_path)
-    # This method would likely use a temporary shallow clone or 'git show <branch>:<file_path>'
-    # result = git_service_instance.get_file_content(git_repo_url, branch, file_path)
-    # if result.get("success"):
-    #     return result.get("content", "")
-    # return f"Error reading file '{file_path}': {result.get('error', 'Unknown error')}"
     print(f"TOOL: read_file_content_from_repo called for space '{space_id}', branch '{branch}', path '{file_path}'")
-    return f"Mock Content for '{file_path}' in branch '{branch}' of repo for space '{space_id}':\n\n# This is mock content.\nprint('Hello from {file_path}')"
+    result = git_service_instance.read_file_content(
+        git_repo_url, branch, file_path, start_line=start_line, end_line=end_line,
+        byte_offset=byte_offset or 0, max_bytes=max_bytes,
+    )
+    if not result.get("success"):
+        return f"Error reading file '{file_path}': {result.get('error', 'Unknown error')}"
+    if result.get("binary"):
+        return f"'{file_path}' is a binary file ({result['size']} bytes); its content cannot be shown."
+    content = result.get("content", "")
+    if result.get("truncated"):
+        if "start_line" in result:
+            total = result.get("total_lines", "?")
+            content += f"\n\n[Showing lines {result['start_line']}-{result['end_line']} of {total}.]"
+        else:
+            shown_end = (byte_offset or 0) + len(content.encode("utf-8"))
+            content += f"\n\n[Truncated: showing bytes {byte_offset or 0}-{shown_end} of {result['size']}. Use start_line/end_line or byte_offset to read more.]"
+    return content
 
 @tool
 def git_pull_changes(space_id: str, branch: str) -> str:
@@ -151,13 +198,20 @@ def git_commit_and_push(space_id: str, branch: str, commit_message: str, stage_a
 
 # --- Kubernetes Tools specific to Dev Space workflow (often environment-specific) ---
 @tool
-def k8s_list_resources_in_dev_env(space_id: str, environment_key: str, resource_type: str, namespace: str = None, label_selector: str = None) -> str:
+def k8s_list_resources_in_dev_env(space_id: str, environment_key: str, resource_type: str, namespace: str = None, label_selector: str = None,
+                                  field_selector: str = None, fields: str = None, summary: bool = False, limit: int = 50, continue_token: str = None) -> str:
     """
-    Lists Kubernetes resources (e.g., 'pods', 'deployments', 'services') for a DEV space's specific environment.
+    Lists Kubernetes resources ('pods', 'deployments' or 'services') for a DEV space's specific environment.
     'space_id' identifies the dev space.
     'environment_key' specifies the target environment ('test', 'grayscale', 'production').
     'namespace' is the K8s namespace. If not provided, uses the default for the environment from space config.
     'label_selector' (optional) can filter resources, e.g., 'app=my-app,tier=frontend'.
+    'field_selector' (optional), e.g. 'status.phase!=Running' or 'spec.nodeName=node-1'.
+    'fields' (optional) comma-separated keys to return per item, e.g. 'status,restarts' (pods),
+    'replicas,readyReplicas' (deployments), 'type,ports' (services); name/namespace are always included.
+    'summary'=true returns counts instead of items (pods by phase, restart histogram, top offenders);
+    use it first for large namespaces.
+    Returns at most 'limit' items; if the result has 'continue', call again with continue_token=<continue>.
     Returns a JSON string of resources or an error message.
     """
     if not all([space_id, environment_key, resource_type]):
@@ -169,23 +223,34 @@ def k8s_list_resources_in_dev_env(space_id: str, environment_key: str, resource_
     effective_namespace = namespace or env_config.get("namespace") 
     if not effective_namespace: return f"Error: Namespace must be provided or configured for env '{environment_key}'."
 
-    # K8sService.list_resources should now accept label_selector
-    # result = k8s_service_instance.list_resources(space_id, environment_key, resource_type, effective_namespace, label_selector)
-    # For now, simulate based on prior mock from K8sService
-    print(f"TOOL: k8s_list_resources_in_dev_env: space='{space_id}', env='{environment_key}', type='{resource_type}', ns='{effective_namespace}', labels='{label_selector}'")
-    mock_items = []
-    if resource_type == "pods": mock_items = [{"name": f"{space_id}-pod1", "status": "Running"}, {"name": f"{space_id}-pod2", "status": "Pending"}]
-    elif resource_type == "deployments": mock_items = [{"name": f"{space_id}-app-deploy", "replicas": 2, "ready": 2}]
-    return json.dumps({"resources": mock_items}) if mock_items else f"No {resource_type} found with given criteria (mock)."
+    print(f"TOOL: k8s_list_resources_in_dev_env: space='{space_id}', env='{environment_key}', type='{resource_type}', ns='{effective_namespace}', labels='{label_selector}', fields='{field_selector}'")
+    if summary:
+        result = k8s_service_instance.summarize_resources(space_id, environment_key, resource_type, effective_namespace, label_selector, field_selector)
+        if not result.get("success"): return f"Error summarizing K8s {resource_type}: {result.get('error', 'Unknown error')}"
+        return json.dumps({"summary": result["summary"], "truncated": result["truncated"]}, separators=(",", ":"))
+
+    field_list = [f.strip() for f in fields.split(",") if f.strip()] if fields else None
+    result = k8s_service_instance.list_resources(space_id, environment_key, resource_type, effective_namespace, label_selector,
+                                                 field_selector=field_selector, limit=max(1, min(int(limit or 50), 200)),
+                                                 continue_token=continue_token, fields=field_list)
+    if not result.get("success"): return f"Error listing K8s {resource_type}: {result.get('error', 'Unknown error')}"
+    if not result["resources"]: return f"No {resource_type} found with given criteria."
+    resources = result["resources"] if field_list else [
+        {k: v for k, v in item.items() if k not in ("uid", "resourceVersion", "labels", "creationTimestamp")} for item in result["resources"]
+    ] # Bookkeeping keys only cost context unless asked for
+    response = {"resources": resources, "continue": result["continue"]}
+    if result.get("total") is not None: response["total"] = result["total"]
+    return json.dumps(response, separators=(",", ":"))
 
 
 @tool
-def k8s_apply_yaml_to_dev_env(space_id: str, environment_key: str, yaml_content: str, namespace: str = None) -> str:
+def k8s_apply_yaml_to_dev_env(space_id: str, environment_key: str, yaml_content: str, namespace: str = None, dry_run: bool = False) -> str:
     """
-    Applies a Kubernetes configuration (from 'yaml_content' string)
-    to the specified 'namespace' of the 'environment_key' for the 'space_id'.
+    Applies a Kubernetes configuration (from 'yaml_content' string, one or more documents) with
+    server-side apply to the specified 'namespace' of the 'environment_key' for the 'space_id'.
     If 'namespace' is not provided, a default from the space's environment config might be used.
-    Returns a success or error message.
+    Set 'dry_run'=true to validate and see what would change (per-object diff) without changing anything.
+    Returns a per-object summary (created / configured / unchanged / error) or an error message.
     """
     if not all([space_id, environment_key, yaml_content]):
         return "Error: space_id, environment_key, and yaml_content are required."
@@ -196,33 +261,43 @@ def k8s_apply_yaml_to_dev_env(space_id: str, environment_key: str, yaml_content:
     effective_namespace = namespace or env_config.get("namespace")
     if not effective_namespace: return f"Error: Namespace must be provided or configured for env '{environment_key}'."
 
-    # result = k8s_service_instance.apply_yaml_string(space_id, environment_key, effective_namespace, yaml_content)
-    # if result.get("success"): return result.get("message", "YAML applied.")
-    # return f"Error applying K8s YAML: {result.get('error', 'Unknown error')}"
-    print(f"TOOL: k8s_apply_yaml_to_dev_env: space='{space_id}', env='{environment_key}', ns='{effective_namespace}' with YAML:\n{yaml_content[:100]}...")
-    return f"Mock Success: YAML applied to '{environment_key}' env in namespace '{effective_namespace}' for space '{space_id}'."
+    print(f"TOOL: k8s_apply_yaml_to_dev_env: space='{space_id}', env='{environment_key}', ns='{effective_namespace}', dry_run={dry_run} with YAML:\n{yaml_content[:100]}...")
+    result = k8s_service_instance.apply_yaml_string(space_id, environment_key, effective_namespace, yaml_content, dry_run=bool(dry_run))
+    if "results" not in result: return f"Error applying K8s YAML: {result.get('error', 'Unknown error')}"
+    return render_apply_result(result)
 
 
 @tool
-def k8s_get_pod_logs_for_dev_env(space_id: str, environment_key: str, pod_name: str, namespace: str = None, container_name: str = None, tail_lines: int = 100) -> str:
+def k8s_get_pod_logs_for_dev_env(space_id: str, environment_key: str, pod_name: str = None, namespace: str = None, container_name: str = None,
+                                 tail_lines: int = 100, since_seconds: int = None, grep: str = None, min_level: str = None,
+                                 label_selector: str = None, max_bytes: int = None) -> str:
     """
-    Fetches logs for a specific 'pod_name' in a 'namespace' of a DEV space's 'environment_key'.
-    If 'namespace' is not provided, uses default from environment config.
-    'container_name' is optional. 'tail_lines' defaults to 100.
+    Fetches logs for 'pod_name' (several pods: comma-separated) or for all pods matching 'label_selector',
+    in a 'namespace' of a DEV space's 'environment_key'. If 'namespace' is not provided, uses default from
+    environment config. All containers are included unless 'container_name' is given; lines of several
+    pods/containers are merged by timestamp and prefixed with [pod/container].
+    'tail_lines' (per container, default 100) and 'since_seconds' limit what is read; 'grep' (a regex) and
+    'min_level' ('debug', 'info', 'warn', 'error', 'fatal') keep only matching lines. Only the most recent
+    matching lines within 'max_bytes' are returned.
     Returns logs as a string or an error message.
     """
-    if not all([space_id, environment_key, pod_name]):
-        return "Error: space_id, environment_key, and pod_name are required."
-    env_config = _get_k8s_env_config_for_space(space_id, environment_key)
-    if not env_config: return f"Error: K8s config for env '{environment_key}' not found."
-    effective_namespace = namespace or env_config.get("namespace")
+    if not all([space_id, environment_key]) or not (pod_name or label_selector):
+        return "Error: space_id, environment_key, and pod_name or label_selector are required."
+    try:
+        environment = k8s_service_instance.get_environment(space_id, environment_key)
+    except (ValueError, ConnectionError) as e:
+        return f"Error: {e}"
+    effective_namespace = namespace or environment["namespace"]
     if not effective_namespace: return f"Error: Namespace required for pod logs."
 
-    print(f"TOOL: k8s_get_pod_logs_for_dev_env: space='{space_id}', env='{environment_key}', pod='{pod_name}', ns='{effective_namespace}'")
-    # result = k8s_service_instance.get_pod_logs(space_id, environment_key, effective_namespace, pod_name, container_name, tail_lines)
-    # if result.get("success"): return result.get("logs")
-    # return f"Error getting logs: {result.get('error')}"
-    return f"Mock logs for {pod_name} in {effective_namespace}:\nLog line 1...\nLog line 2 (env: {environment_key})"
+    print(f"TOOL: k8s_get_pod_logs_for_dev_env: space='{space_id}', env='{environment_key}', pod='{pod_name}', ns='{effective_namespace}', grep='{grep}', level='{min_level}'")
+    result = k8s_service_instance.tail_pod_logs(
+        environment["clients"], effective_namespace, max_bytes=max_bytes,
+        pod_names=[p.strip() for p in pod_name.split(",") if p.strip()] if pod_name else None, label_selector=label_selector,
+        container=container_name, tail_lines=tail_lines, since_seconds=since_seconds, pattern=grep, min_level=min_level,
+    )
+    if not result.get("success"): return f"Error getting logs: {result.get('error')}"
+    return render_log_tail(result)
 
 @tool
 def k8s_restart_deployment_for_dev_env(space_id: str, environment_key: str, deployment_name: str, namespace: str = None) -> str:
@@ -269,6 +344,7 @@ def k8s_scale_deployment_for_dev_env(space_id: str, environment_key: str, deploy
 def get_all_dev_tools():
     return [
         get_repository_file_tree,
+        get_repository_subtree,
         list_repository_branches,
         read_file_content_from_repo,
         git_pull_changes,
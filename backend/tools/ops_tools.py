@@ -3,6 +3,7 @@ from langchain_core.tools import tool
 import json
 
 from services.k8s_service import K8sService
+from services.k8s_log_streamer import render_log_tail
 # from services.space_service import SpaceService # If ops tools need space-specific K8s contexts
 # from plugins.skill_manager import skill_manager # If AIOps skills are centrally managed
 
@@ -10,20 +11,30 @@ k8s_service_instance = K8sService()
 # space_service_instance = SpaceService()
 
 @tool
-def k8s_get_pod_logs(namespace: str, pod_name: str, container_name: str = None, tail_lines: int = 100, k8s_context_name: str = None) -> str:
+def k8s_get_pod_logs(namespace: str, pod_name: str = None, container_name: str = None, tail_lines: int = 100, k8s_context_name: str = None,
+                     since_seconds: int = None, grep: str = None, min_level: str = None, label_selector: str = None, max_bytes: int = None) -> str:
     """
-    Fetches logs for a specific 'pod_name' in a given 'namespace'.
-    Optionally, specify a 'container_name' and 'tail_lines'.
+    Fetches logs for 'pod_name' (several pods: comma-separated) or all pods matching 'label_selector' in a given 'namespace'.
+    Optionally, specify a 'container_name' (default: all containers, merged by timestamp) and 'tail_lines' per container.
+    'since_seconds' limits how far back to read; 'grep' (a regex) and 'min_level' ('debug', 'info', 'warn', 'error', 'fatal')
+    keep only matching lines; only the most recent matching lines within 'max_bytes' are returned.
     'k8s_context_name' can specify which Kubernetes cluster context to use if multiple are configured.
     Returns logs as a string or an error message.
     """
-    if not namespace or not pod_name:
-        return "Error: 'namespace' and 'pod_name' are required."
-    print(f"TOOL: k8s_get_pod_logs: pod='{pod_name}', ns='{namespace}', context='{k8s_context_name}'")
-    # result = k8s_service_instance.get_pod_logs(namespace, pod_name, container_name, tail_lines, k8s_context_name)
-    # if result.get("success"): return result.get("logs")
-    # return f"Error getting logs: {result.get('error')}"
-    return f"Mock Logs for {pod_name} in {namespace} (context: {k8s_context_name}):\nOPS Log line 1...\nOPS Log line 2..."
+    if not namespace or not (pod_name or label_selector):
+        return "Error: 'namespace' and 'pod_name' or 'label_selector' are required."
+    print(f"TOOL: k8s_get_pod_logs: pod='{pod_name}', ns='{namespace}', context='{k8s_context_name}', grep='{grep}', level='{min_level}'")
+    try:
+        clients = k8s_service_instance.get_clients_for_context(k8s_context_name)
+    except ConnectionError as e:
+        return f"Error: {e}"
+    result = k8s_service_instance.tail_pod_logs(
+        clients, namespace, max_bytes=max_bytes,
+        pod_names=[p.strip() for p in pod_name.split(",") if p.strip()] if pod_name else None, label_selector=label_selector,
+        container=container_name, tail_lines=tail_lines, since_seconds=since_seconds, pattern=grep, min_level=min_level,
+    )
+    if not result.get("success"): return f"Error getting logs: {result.get('error')}"
+    return render_log_tail(result)
 
 @tool
 def k8s_restart_deployment(namespace: str, deployment_name: str, k8s_context_name: str = None) -> str: